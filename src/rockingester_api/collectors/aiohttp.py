@@ -1,4 +1,5 @@
 import logging
+from typing import Dict
 
 # Class for an aiohttp client.
 from rockingester_api.aiohttp_client import AiohttpClient
@@ -33,6 +34,16 @@ class Aiohttp:
         """"""
         return await self.__send_protocolj("report_health")
 
+    # ----------------------------------------------------------------------------------------
+    async def report_metrics(self) -> str:
+        """"""
+        return await self.__send_protocolj("report_metrics")
+
+    # ----------------------------------------------------------------------------------------
+    async def reindex(self) -> Dict:
+        """"""
+        return await self.__send_protocolj("reindex")
+
     # ----------------------------------------------------------------------------------------
     async def __send_protocolj(self, function, *args, **kwargs):
         """"""
@@ -70,6 +70,11 @@ class Collectors(Things):
 
             return DirectPoll
 
+        if class_type == Types.DIRECT_INOTIFY:
+            from rockingester_lib.collectors.direct_inotify import DirectInotify
+
+            return DirectInotify
+
         raise NotFound(
             f"unable to get rockingester collector class for type {class_type}"
         )
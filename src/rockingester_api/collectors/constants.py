@@ -10,3 +10,4 @@ class Commands:
 class Types:
     AIOHTTP = "rockingester_lib.collectors.aiohttp"
     DIRECT = "rockingester_lib.collectors.direct_poll"
+    DIRECT_INOTIFY = "rockingester_lib.collectors.direct_inotify"
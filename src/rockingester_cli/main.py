@@ -8,6 +8,10 @@ import multiprocessing
 from dls_mainiac_lib.mainiac import Mainiac
 
 # The subcommands.
+from rockingester_cli.subcommands.backfill import Backfill
+from rockingester_cli.subcommands.benchmark import Benchmark
+from rockingester_cli.subcommands.ftrix_sqlite import FtrixSqlite
+from rockingester_cli.subcommands.reindex import Reindex
 from rockingester_cli.subcommands.service import Service
 
 # The package version.
@@ -29,6 +33,18 @@ class Main(Mainiac):
         if self._args.subcommand == "service":
             Service(self._args, self).run()
 
+        elif self._args.subcommand == "backfill":
+            Backfill(self._args, self).run()
+
+        elif self._args.subcommand == "benchmark":
+            Benchmark(self._args, self).run()
+
+        elif self._args.subcommand == "ftrix_sqlite":
+            FtrixSqlite(self._args, self).run()
+
+        elif self._args.subcommand == "reindex":
+            Reindex(self._args, self).run()
+
         else:
             raise RuntimeError("unhandled subcommand %s" % (self._args.subcommand))
 
@@ -64,6 +80,34 @@ class Main(Mainiac):
         subparser = subparsers.add_parser("service", help="Start service (blocking).")
         Service.add_arguments(subparser)
 
+        # --------------------------------------------------------------------
+        subparser = subparsers.add_parser(
+            "backfill",
+            help="Ingest a backlog of plates as fast as possible.",
+        )
+        Backfill.add_arguments(subparser)
+
+        # --------------------------------------------------------------------
+        subparser = subparsers.add_parser(
+            "benchmark",
+            help="Measure ingest speed with simulated imagers.",
+        )
+        Benchmark.add_arguments(subparser)
+
+        # --------------------------------------------------------------------
+        subparser = subparsers.add_parser(
+            "ftrix_sqlite",
+            help="Make an SQLite stand-in for the Formulatrix database.",
+        )
+        FtrixSqlite.add_arguments(subparser)
+
+        # --------------------------------------------------------------------
+        subparser = subparsers.add_parser(
+            "reindex",
+            help="Rebuild xchembku records from the plates already copied to the visits.",
+        )
+        Reindex.add_arguments(subparser)
+
         return parser
 
     # --------------------------------------------------------------------------
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+# Use standard logging in this module.
+import logging
+import sys
+
+# Base class for cli subcommands.
+from rockingester_cli.subcommands.base import ArgKeywords, Base
+
+# Ingests a backlog of plates as fast as possible.
+from rockingester_lib.backfill import Backfill as BackfillRunner
+
+logger = logging.getLogger()
+
+
+# --------------------------------------------------------------
+class Backfill(Base):
+    """
+    Ingest the backlog of plates in the collector's plates directories as fast as possible,
+    then print a throughput report as json.
+
+    Run it instead of the service, not alongside it, since both would ingest the same plates.
+    """
+
+    def __init__(self, args, mainiac):
+        super().__init__(args)
+
+    # ----------------------------------------------------------------------------------------
+    def run(self):
+        """ """
+
+        report = asyncio.run(self.__run_coro())
+
+        print(json.dumps(report, indent=4))
+
+    # ----------------------------------------------------------
+    async def __run_coro(self):
+        """"""
+
+        # Load the configuration.
+        multiconf = self.get_multiconf(vars(self._args))
+        configuration = await multiconf.load()
+
+        specification = {
+            "workers": self._args.workers,
+            "lookup_batch": self._args.lookup_batch,
+            "checkpoint_filename": self._args.checkpoint,
+            "progress_stream": None if self._args.no_progress else sys.stderr,
+        }
+
+        return await BackfillRunner(
+            self.get_direct_collector_settings(configuration), specification
+        ).run()
+
+    # ----------------------------------------------------------
+    def add_arguments(parser):
+
+        parser.add_argument(
+            "--configuration",
+            "-c",
+            help="Configuration file.",
+            type=str,
+            metavar="yaml filename",
+            default=None,
+            dest=ArgKeywords.CONFIGURATION,
+        )
+
+        parser.add_argument(
+            "--workers",
+            help="Plates ingested at the same time.",
+            type=int,
+            default=8,
+            dest="workers",
+        )
+
+        parser.add_argument(
+            "--lookup_batch",
+            help="Barcodes looked up together.",
+            type=int,
+            default=200,
+            dest="lookup_batch",
+        )
+
+        parser.add_argument(
+            "--checkpoint",
+            help="Journal recording finished plates, to resume from, instead of the configured one.",
+            type=str,
+            metavar="filename",
+            default=None,
+            dest="checkpoint",
+        )
+
+        parser.add_argument(
+            "--no_progress",
+            help="Don't draw the progress bar.",
+            action="store_true",
+            dest="no_progress",
+        )
+
+        return parser
@@ -10,6 +10,9 @@ from dls_multiconf_lib.multiconfs import Multiconfs, multiconfs_set_default
 # Utilities.
 from dls_utilpack.visit import get_visit_year
 
+# Collector types.
+from rockingester_lib.collectors.constants import Types as CollectorTypes
+
 # Environment variables with some extra functionality.
 from rockingester_lib.envvar import Envvar
 
@@ -67,6 +70,23 @@ class Base:
 
         return rockingester_multiconf
 
+    # ----------------------------------------------------------------------------------------
+    def get_direct_collector_settings(self, configuration: dict) -> dict:
+        """
+        The DirectPoll collector's type_specific_tbd from the loaded configuration.
+
+        A service configuration wraps the direct collector in the aiohttp one.
+        """
+
+        collector_specification = configuration["rockingester_collector_specification"]
+
+        if collector_specification["type"] == CollectorTypes.AIOHTTP:
+            collector_specification = collector_specification["type_specific_tbd"][
+                "direct_collector_specification"
+            ]
+
+        return collector_specification["type_specific_tbd"]
+
     # ----------------------------------------------------------------------------------------
     def build_object_from_environment(
         self,
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+# Use standard logging in this module.
+import logging
+import tempfile
+
+# Base class for cli subcommands.
+from rockingester_cli.subcommands.base import Base
+
+# Measures ingest speed with simulated imagers.
+from rockingester_lib.ingest_benchmark import IngestBenchmark
+
+logger = logging.getLogger()
+
+
+# --------------------------------------------------------------
+class Benchmark(Base):
+    """
+    Measure how fast plates from simulated imagers are ingested, and print the measurements as json.
+
+    Everything is made locally, including the Formulatrix and xchembku databases.
+    """
+
+    def __init__(self, args, mainiac):
+        super().__init__(args)
+
+    # ----------------------------------------------------------------------------------------
+    def run(self):
+        """ """
+
+        if self._args.directory is None:
+            with tempfile.TemporaryDirectory() as directory:
+                report = asyncio.run(self.__run_coro(directory))
+        else:
+            report = asyncio.run(self.__run_coro(self._args.directory))
+
+        print(json.dumps(report, indent=4))
+
+    # ----------------------------------------------------------
+    async def __run_coro(self, directory):
+        """"""
+
+        specification = {
+            "directory": directory,
+            "plate_count": self._args.plate_count,
+            "imager_count": self._args.imager_count,
+            "timeout_seconds": self._args.timeout_seconds,
+            "imager_specification": {
+                "plates_per_minute": self._args.plates_per_minute,
+                "plate_types": self._args.plate_types.split(","),
+                "image_count": self._args.image_count,
+                "image_width": self._args.image_width,
+                "image_height": self._args.image_height,
+                "image_bytes": self._args.image_bytes,
+                "image_interval_seconds": self._args.image_interval_seconds,
+            },
+            "collector_settings": {
+                "ingest_mode": self._args.ingest_mode,
+                "tick_seconds": self._args.tick_seconds,
+                "max_concurrent_plates": self._args.max_concurrent_plates,
+            },
+        }
+
+        return await IngestBenchmark(specification).run()
+
+    # ----------------------------------------------------------
+    def add_arguments(parser):
+
+        parser.add_argument(
+            "--directory",
+            help="Empty working directory, a temporary one if not given.",
+            type=str,
+            metavar="directory",
+            default=None,
+            dest="directory",
+        )
+
+        for name, value_type, default, description in [
+            ("plate_count", int, 20, "Plates written by each imager."),
+            ("imager_count", int, 1, "Imagers writing at the same time."),
+            (
+                "plates_per_minute",
+                float,
+                6.0,
+                "Plates started per minute by each imager.",
+            ),
+            (
+                "plate_types",
+                str,
+                "3drop",
+                "Comma-separated plate types the imagers make in turn, 3drop, 2drop or 1drop.",
+            ),
+            (
+                "image_count",
+                int,
+                None,
+                "Images in each plate, a full plate if not given.",
+            ),
+            ("image_width", int, 1024, "Width given in each image header."),
+            ("image_height", int, 1024, "Height given in each image header."),
+            ("image_bytes", int, 65536, "Size of each image file."),
+            ("image_interval_seconds", float, 0.0, "Pause between images of a plate."),
+            ("ingest_mode", str, "plate", "Collector ingest mode, plate or streaming."),
+            ("tick_seconds", float, 1.0, "Collector tick."),
+            ("max_concurrent_plates", int, 1, "Plates the collector scrapes at once."),
+            ("timeout_seconds", float, 600.0, "Longest to wait for all plates."),
+        ]:
+            parser.add_argument(
+                f"--{name}",
+                help=description,
+                type=value_type,
+                default=default,
+                dest=name,
+            )
+
+        return parser
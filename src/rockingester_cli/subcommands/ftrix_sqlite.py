@@ -0,0 +1,80 @@
+# Use standard logging in this module.
+import logging
+
+# Base class for cli subcommands.
+from rockingester_cli.subcommands.base import Base
+
+# Generator of the SQLite stand-in for the Formulatrix database.
+from rockingester_lib.ftrix_sqlite import generate
+
+logger = logging.getLogger()
+
+
+# --------------------------------------------------------------
+class FtrixSqlite(Base):
+    """
+    Make an SQLite stand-in for the Formulatrix database, filled with generated plates.
+
+    Point a Formulatrix client at it with server "sqlite" and the file as the database.
+    """
+
+    def __init__(self, args, mainiac):
+        super().__init__(args)
+
+    # ----------------------------------------------------------------------------------------
+    def run(self):
+        """ """
+
+        summary = generate(
+            self._args.filename,
+            self._args.plate_count,
+            seed=self._args.seed,
+            plates_per_experiment=self._args.plates_per_experiment,
+        )
+
+        logger.info(
+            f"made {summary['filename']} with {summary['plate_count']} plates,"
+            f" {summary['xchem_plate_count']} of them findable,"
+            f" in {'%0.3f' % summary['seconds']} seconds"
+        )
+
+    # ----------------------------------------------------------
+    def add_arguments(parser):
+
+        parser.add_argument(
+            "--filename",
+            help="SQLite file to make, which must not already exist.",
+            type=str,
+            metavar="filename",
+            required=True,
+            dest="filename",
+        )
+
+        parser.add_argument(
+            "--plate_count",
+            help="Number of plates to make.",
+            type=int,
+            metavar="integer",
+            default=100000,
+            dest="plate_count",
+        )
+
+        parser.add_argument(
+            "--plates_per_experiment",
+            help="Number of plates in each experiment (visit).",
+            type=int,
+            metavar="integer",
+            default=20,
+            dest="plates_per_experiment",
+        )
+
+        parser.add_argument(
+            "--seed",
+            help="Seed for the random barcodes.",
+            type=int,
+            metavar="integer",
+            default=0,
+            dest="seed",
+        )
+
+        return parser
@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+# Use standard logging in this module.
+import logging
+
+# Client context for a running collector service.
+from rockingester_api.collectors.context import Context as CollectorClientContext
+
+# Base class for cli subcommands.
+from rockingester_cli.subcommands.base import ArgKeywords, Base
+
+# Rebuilds xchembku records from the plates already in the visits.
+from rockingester_lib.reindexer import reindex_visits
+
+logger = logging.getLogger()
+
+
+# --------------------------------------------------------------
+class Reindex(Base):
+    """
+    Rebuild the xchembku plate and well records from the plates already copied to the visits,
+    and print the report as json.
+
+    By default the reindexing is done here, with the collector settings from the configuration.
+    With --service, the running collector service is asked to do it.
+    """
+
+    def __init__(self, args, mainiac):
+        super().__init__(args)
+
+    # ----------------------------------------------------------------------------------------
+    def run(self):
+        """ """
+
+        report = asyncio.run(self.__run_coro())
+
+        print(json.dumps(report, indent=4))
+
+    # ----------------------------------------------------------
+    async def __run_coro(self):
+        """"""
+
+        # Load the configuration.
+        multiconf = self.get_multiconf(vars(self._args))
+        configuration = await multiconf.load()
+
+        if self._args.service:
+            async with CollectorClientContext(
+                configuration["rockingester_collector_specification"]
+            ) as collector:
+                return await collector.reindex()
+
+        return await reindex_visits(self.get_direct_collector_settings(configuration))
+
+    # ----------------------------------------------------------
+    def add_arguments(parser):
+
+        parser.add_argument(
+            "--configuration",
+            "-c",
+            help="Configuration file.",
+            type=str,
+            metavar="yaml filename",
+            default=None,
+            dest=ArgKeywords.CONFIGURATION,
+        )
+
+        parser.add_argument(
+            "--service",
+            help="Ask the running collector service to do the reindexing.",
+            action="store_true",
+            dest="service",
+        )
+
+        return parser
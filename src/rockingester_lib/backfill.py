@@ -0,0 +1,291 @@
+import asyncio
+import copy
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+
+from dls_utilpack.explain import explain2
+
+# Things which make the collector.
+from rockingester_lib.collectors.collectors import Collectors
+
+# Collector types.
+from rockingester_lib.collectors.constants import Types
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------
+def _list_plate_directories(plates_directory: Path) -> List[Path]:
+    """
+    Blocking listing of the plate directories in a plates directory, sorted by name.
+    """
+
+    if not plates_directory.is_dir():
+        return []
+
+    with os.scandir(plates_directory) as entries:
+        return sorted(
+            Path(entry.path)
+            for entry in entries
+            if entry.is_dir() and not entry.name.startswith(".")
+        )
+
+
+class ProgressBar:
+    """
+    One line of text showing how far through the plates we are, redrawn in place.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(
+        self,
+        total: int,
+        stream: Optional[TextIO] = None,
+        width: int = 40,
+        interval_seconds: float = 0.5,
+    ):
+        self.__total = total
+        self.__stream = stream if stream is not None else sys.stderr
+        self.__width = width
+        self.__interval_seconds = interval_seconds
+
+        self.__time0 = time.time()
+        self.__last_draw_time = 0.0
+
+    # ----------------------------------------------------------------------------------------
+    def update(self, done: int, is_final: bool = False) -> None:
+        now = time.time()
+        if not is_final and now - self.__last_draw_time < self.__interval_seconds:
+            return
+        self.__last_draw_time = now
+
+        fraction = done / self.__total if self.__total > 0 else 1.0
+        filled = int(fraction * self.__width)
+        elapsed = now - self.__time0
+        rate = 60.0 * done / elapsed if elapsed > 0 else 0.0
+
+        self.__stream.write(
+            f"\r[{'#' * filled}{'.' * (self.__width - filled)}]"
+            f" {done}/{self.__total} plates, {'%0.1f' % rate} plates/min"
+        )
+        if is_final:
+            self.__stream.write("\n")
+        self.__stream.flush()
+
+
+class Backfill:
+    """
+    Ingests a backlog of plates as fast as possible, using the DirectPoll collector's ingest.
+
+    Unlike the service, there is no polling and no waiting for images to arrive,
+    since the plates are taken to be complete.
+
+    The plates go through a bounded pipeline:
+    their barcodes are looked up in batches, a chunk ahead of the workers,
+    then each worker probes, upserts and copies one plate at a time, all of a plate's wells in one upsert.
+
+    The collector's ingest journal is the checkpoint:
+    plates it records as finished are skipped, so an interrupted backfill resumes where it stopped.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, type_specific_tbd: Dict, specification: Optional[Dict] = None):
+        """
+        Constructor.
+
+        Args:
+            type_specific_tbd (Dict): the DirectPoll collector's settings
+            specification (Optional[Dict]): may contain
+                "workers" (default 8), plates ingested at the same time,
+                "lookup_batch" (default 200), barcodes looked up together,
+                "checkpoint_filename", ingest journal to use instead of the collector's,
+                "progress_stream", where to draw the progress bar, none if not given.
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__workers = max(1, int(specification.get("workers", 8)))
+        self.__lookup_batch = max(1, int(specification.get("lookup_batch", 200)))
+        self.__progress_stream = specification.get("progress_stream")
+
+        # Ingest whole plates, straight away.
+        self.__type_specific_tbd = copy.deepcopy(type_specific_tbd)
+        self.__type_specific_tbd["ingest_mode"] = "plate"
+        self.__type_specific_tbd["max_wait_seconds"] = 0.0
+
+        checkpoint_filename = specification.get("checkpoint_filename")
+        if checkpoint_filename is not None:
+            self.__type_specific_tbd["journal_filename"] = checkpoint_filename
+
+        if self.__type_specific_tbd.get("journal_filename") is None:
+            logger.warning(
+                "[BACKFILL] there is no journal filename, so an interrupted backfill will start again"
+            )
+
+    # ----------------------------------------------------------------------------------------
+    async def run(self) -> Dict:
+        """
+        Ingest all the plates not yet finished in the collector's plates directories.
+
+        Returns:
+            Dict: throughput report, see __report()
+        """
+
+        time0 = time.time()
+
+        collector = Collectors().build_object(
+            {
+                "type": Types.DIRECT_POLL,
+                "type_specific_tbd": self.__type_specific_tbd,
+            }
+        )
+
+        await collector.connect()
+        try:
+            # Blocking work goes to the collector's pools, like its own.
+            executors = collector.executors()
+            listings = await asyncio.gather(
+                *[
+                    executors.run_in_thread(
+                        _list_plate_directories, Path(plates_directory)
+                    )
+                    for plates_directory in self.__type_specific_tbd[
+                        "plates_directories"
+                    ]
+                ]
+            )
+            plate_directories = [
+                plate_directory for listing in listings for plate_directory in listing
+            ]
+
+            pending = [
+                plate_directory
+                for plate_directory in plate_directories
+                if not collector.is_handled(plate_directory.name)
+            ]
+
+            logger.info(
+                f"[BACKFILL] {len(pending)} out of {len(plate_directories)} plates"
+                f" are still to be ingested"
+            )
+
+            outcomes = await self.__run_pipeline(collector, pending)
+        finally:
+            await collector.deactivate()
+
+        return self.__report(
+            collector, len(plate_directories), len(pending), outcomes, time0
+        )
+
+    # ----------------------------------------------------------------------------------------
+    async def __run_pipeline(self, collector, pending: List[Path]) -> Dict[str, int]:
+        """
+        Look up the plates a batch ahead while the workers ingest them.
+
+        Returns:
+            Dict[str, int]: counts of the plates "finished", "deferred" because their
+                barcode isn't in Formulatrix yet, and "failed" with an unexpected error
+        """
+
+        outcomes = {"finished": 0, "deferred": 0, "failed": 0}
+
+        progress_bar = None
+        if self.__progress_stream is not None:
+            progress_bar = ProgressBar(len(pending), self.__progress_stream)
+            progress_bar.update(0, is_final=len(pending) == 0)
+
+        # Bounded, so the lookups only run a batch or so ahead of the workers.
+        queue: asyncio.Queue = asyncio.Queue(
+            maxsize=max(self.__lookup_batch, self.__workers)
+        )
+
+        async def look_up():
+            for index in range(0, len(pending), self.__lookup_batch):
+                batch = pending[index : index + self.__lookup_batch]
+                await collector.prefetch_plates(batch)
+                for plate_directory in batch:
+                    await queue.put(plate_directory)
+            for _ in range(self.__workers):
+                await queue.put(None)
+
+        async def ingest():
+            while True:
+                plate_directory = await queue.get()
+                if plate_directory is None:
+                    return
+                try:
+                    next_time = await collector.scrape_plate_directory(plate_directory)
+                    if next_time is None:
+                        outcomes["finished"] += 1
+                    else:
+                        outcomes["deferred"] += 1
+                except Exception as exception:
+                    outcomes["failed"] += 1
+                    # Just log the error, tag as anomaly for reporting, carry on with the others.
+                    logger.error(
+                        "[ANOMALY] "
+                        + explain2(
+                            exception,
+                            f"backfilling plate directory {str(plate_directory)}",
+                        ),
+                        exc_info=exception,
+                    )
+
+                if progress_bar is not None:
+                    done = sum(outcomes.values())
+                    progress_bar.update(done, is_final=done == len(pending))
+
+        await asyncio.gather(look_up(), *[ingest() for _ in range(self.__workers)])
+
+        return outcomes
+
+    # ----------------------------------------------------------------------------------------
+    def __report(
+        self,
+        collector,
+        plate_count: int,
+        pending_count: int,
+        outcomes: Dict[str, int],
+        time0: float,
+    ) -> Dict:
+        """
+        Summarize what was done and how fast.
+        """
+
+        metrics = collector.metrics()
+
+        seconds = time.time() - time0
+        well_count = int(metrics.counter("wells_ingested"))
+        byte_count = int(metrics.counter("bytes_copied"))
+
+        report = {
+            "plate_count": plate_count,
+            "already_finished_count": plate_count - pending_count,
+            "ingested_count": int(metrics.counter("plates_ingested")),
+            "errored_count": int(metrics.counter("plates_errored")),
+            "deferred_count": outcomes["deferred"],
+            "failed_count": outcomes["failed"],
+            "well_count": well_count,
+            "byte_count": byte_count,
+            "seconds": seconds,
+            "plates_per_minute": 60.0 * outcomes["finished"] / seconds
+            if seconds > 0
+            else None,
+            "images_per_second": well_count / seconds if seconds > 0 else None,
+            "megabytes_per_second": byte_count / 1e6 / seconds if seconds > 0 else None,
+        }
+
+        logger.info(
+            f"[BACKFILL] ingested {report['ingested_count']} plates"
+            f" ({report['well_count']} images, {report['byte_count']} bytes)"
+            f" in {'%0.3f' % seconds} seconds,"
+            f" {report['errored_count']} errored, {report['deferred_count']} deferred"
+            f" and {report['failed_count']} failed"
+        )
+
+        return report
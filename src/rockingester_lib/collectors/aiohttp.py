@@ -2,6 +2,8 @@ import logging
 import multiprocessing
 import threading
 
+import aiohttp
+
 # Utilities.
 from dls_utilpack.callsign import callsign
 from dls_utilpack.require import require
@@ -9,15 +11,15 @@ from dls_utilpack.require import require
 # Base class which maps flask tasks to methods.
 from dls_utilpack.thing import Thing
 
+# Collector protocolj things, the same ones the api client sends.
+from rockingester_api.collectors.constants import Commands, Keywords
+
 # Base class for an aiohttp server.
 from rockingester_lib.base_aiohttp import BaseAiohttp
 
 # Factory to make a Collector.
 from rockingester_lib.collectors.collectors import Collectors
 
-# Collector protocolj things.
-from rockingester_lib.collectors.constants import Commands, Keywords
-
 logger = logging.getLogger(__name__)
 
 thing_type = "rockingester_lib.collectors.aiohttp"
@@ -139,6 +141,23 @@ class Aiohttp(Thing, BaseAiohttp):
         # Let the base class stop the server listener.
         await self.base_direct_shutdown()
 
+    # ----------------------------------------------------------------------------------------
+    async def _route_get_file(self, request):
+        """
+        Serve the collector's metrics at GET /metrics for Prometheus to scrape.
+
+        The base class routes every GET to its static file handler,
+        so the metrics url is picked off here rather than given as its own route.
+        """
+
+        if request.match_info.get("url") == "metrics":
+            text = await self.__direct_collector.report_metrics()
+            return aiohttp.web.Response(
+                text=text, content_type="text/plain", charset="utf-8"
+            )
+
+        return await BaseAiohttp._route_get_file(self, request)
+
     # ----------------------------------------------------------------------------------------
     async def __do_locally(self, function, args, kwargs):
         """"""
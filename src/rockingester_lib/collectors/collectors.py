@@ -116,6 +116,11 @@ class Collectors(Things):
 
             return DirectPoll
 
+        elif class_type == Types.DIRECT_INOTIFY:
+            from rockingester_lib.collectors.direct_inotify import DirectInotify
+
+            return DirectInotify
+
         # Not the nickname of a class type?
         else:
             try:
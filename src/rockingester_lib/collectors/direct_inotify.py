@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from dls_utilpack.callsign import callsign
+from dls_utilpack.explain import explain2
+from dls_utilpack.require import require
+
+# Base class which does the actual scraping.
+from rockingester_lib.collectors.direct_poll import DirectPoll
+
+# Wrapper around the Linux inotify system calls.
+from rockingester_lib.inotify import (
+    IN_ATTRIB,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MOVED_TO,
+    IN_ONLYDIR,
+    IN_Q_OVERFLOW,
+    Inotify,
+)
+
+logger = logging.getLogger(__name__)
+
+thing_type = "rockingester_lib.collectors.direct_inotify"
+
+# Events on a plates directory which mean a new plate directory has appeared.
+PLATES_DIRECTORY_MASK = IN_CREATE | IN_MOVED_TO | IN_ONLYDIR
+
+# Events on a plate directory which mean an image has arrived or changed.
+PLATE_DIRECTORY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_ATTRIB | IN_ONLYDIR
+
+
+# ------------------------------------------------------------------------------------------
+class DirectInotify(DirectPoll):
+    """
+    Object representing an image collector which is driven by inotify events.
+
+    The plates directories are watched for new plate directories,
+    and each plate directory not yet handled is watched for arriving images.
+    A new plate directory is due in the scheduler straight away,
+    otherwise plates are scraped when the scheduler says they are due.
+
+    Image events are debounced: a plate directory becomes due debounce_seconds after its first event,
+    and further events before then are merged into the same scrape.
+
+    A full rescan is still done every rescan_seconds, since inotify can overflow
+    and does not report changes made by other hosts on a network filesystem.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification, predefined_uuid=None):
+        DirectPoll.__init__(self, specification, predefined_uuid=predefined_uuid)
+
+        s = f"{callsign(self)} specification", self.specification()
+
+        type_specific_tbd = require(s, self.specification(), "type_specific_tbd")
+
+        # The directories to watch for new plate directories.
+        self.__plates_directories = [
+            Path(directory)
+            for directory in require(s, type_specific_tbd, "plates_directories")
+        ]
+
+        # Time between full rescans of the plates directories.
+        self.__rescan_seconds = float(type_specific_tbd.get("rescan_seconds", 60.0))
+
+        # Time to let image events settle before scraping the plate directory.
+        self.__debounce_seconds = float(type_specific_tbd.get("debounce_seconds", 2.0))
+
+        self.__inotify: Optional[Inotify] = None
+
+        # Watch descriptors to the directories they watch.
+        self.__watched_plates_directories: Dict[int, Path] = {}
+        self.__watched_plate_directories: Dict[int, Path] = {}
+        self.__plate_directory_watches: Dict[Path, int] = {}
+
+        # Time of the last full rescan, zero so the first tick does one.
+        self.__last_rescan_time = 0.0
+
+    # ----------------------------------------------------------------------------------------
+    async def activate(self) -> None:
+        """
+        Start watching the plates directories, then let the base class start ticking.
+        """
+
+        self.__inotify = Inotify()
+
+        for plates_directory in self.__plates_directories:
+            self.__watch_plates_directory(plates_directory)
+
+        asyncio.get_event_loop().add_reader(
+            self.__inotify.fileno(), self.__handle_inotify_readable
+        )
+
+        await DirectPoll.activate(self)
+
+    # ----------------------------------------------------------------------------------------
+    async def deactivate(self) -> None:
+        """
+        Stop ticking, then stop watching.
+        """
+
+        await DirectPoll.deactivate(self)
+
+        if self.__inotify is not None:
+            asyncio.get_event_loop().remove_reader(self.__inotify.fileno())
+            self.__inotify.close()
+            self.__inotify = None
+
+        self.__watched_plates_directories.clear()
+        self.__watched_plate_directories.clear()
+        self.__plate_directory_watches.clear()
+
+    # ----------------------------------------------------------------------------------------
+    async def scrape_plates_directories(self) -> None:
+        """
+        Look for new plate directories only when the rescan is due.
+
+        Between rescans, new plate directories are found by their inotify events.
+        """
+
+        now = time.time()
+
+        # Pick up any plates directory which did not exist when we started.
+        for plates_directory in self.__plates_directories:
+            if plates_directory not in self.__watched_plates_directories.values():
+                if self.__watch_plates_directory(plates_directory):
+                    # Rescan since it may already have plate directories in it.
+                    self.__last_rescan_time = 0.0
+
+        if now - self.__last_rescan_time >= self.__rescan_seconds:
+            self.__last_rescan_time = now
+
+            await DirectPoll.scrape_plates_directories(self)
+
+    # ----------------------------------------------------------------------------------------
+    async def scrape_plate_directory(
+        self,
+        plate_directory: Path,
+    ) -> Optional[float]:
+        """
+        Keep a watch on the plate directory for as long as it is waiting for images.
+
+        The watch is added before scraping so that no image can arrive unnoticed in between.
+        """
+
+        if self.is_handled(plate_directory.name):
+            self.__unwatch_plate_directory(plate_directory)
+            return None
+
+        self.__watch_plate_directory(plate_directory)
+
+        next_time = await DirectPoll.scrape_plate_directory(self, plate_directory)
+
+        if next_time is None:
+            self.__unwatch_plate_directory(plate_directory)
+
+        return next_time
+
+    # ----------------------------------------------------------------------------------------
+    def __handle_inotify_readable(self) -> None:
+        """
+        Called by the event loop when inotify has events for us.
+        """
+
+        inotify = self.__inotify
+        if inotify is None:
+            return
+
+        try:
+            events = inotify.read_events()
+        except Exception as exception:
+            logger.error(
+                "[ANOMALY] " + explain2(exception, "reading inotify events"),
+                exc_info=exception,
+            )
+            return
+
+        should_wake = False
+        for wd, mask, cookie, name in events:
+            # Kernel dropped events, so only a full rescan can be trusted.
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("[INOTIFY] event queue overflowed, forcing rescan")
+                self.__last_rescan_time = 0.0
+                should_wake = True
+                continue
+
+            if mask & IN_IGNORED:
+                self.__forget_watch(wd)
+                continue
+
+            plates_directory = self.__watched_plates_directories.get(wd)
+            if plates_directory is not None:
+                if mask & IN_ISDIR:
+                    self.expedite(plates_directory / name)
+                    should_wake = True
+                continue
+
+            # Images arrive in bursts, so don't scrape on every one of them.
+            # The scheduler keeps the earlier due time so a steady stream of events cannot postpone the scrape.
+            plate_directory = self.__watched_plate_directories.get(wd)
+            if plate_directory is not None:
+                self.expedite(plate_directory, delay_seconds=self.__debounce_seconds)
+
+        if should_wake:
+            self.wake()
+
+    # ----------------------------------------------------------------------------------------
+    def __watch_plates_directory(self, plates_directory: Path) -> bool:
+        if self.__inotify is None or not plates_directory.is_dir():
+            return False
+
+        wd = self.__inotify.add_watch(str(plates_directory), PLATES_DIRECTORY_MASK)
+        self.__watched_plates_directories[wd] = plates_directory
+
+        return True
+
+    # ----------------------------------------------------------------------------------------
+    def __watch_plate_directory(self, plate_directory: Path) -> None:
+        if self.__inotify is None or plate_directory in self.__plate_directory_watches:
+            return
+
+        try:
+            wd = self.__inotify.add_watch(str(plate_directory), PLATE_DIRECTORY_MASK)
+        except OSError as exception:
+            # Probably out of watches, the deadline and the rescan will still find the images.
+            logger.warning(f"[INOTIFY] unable to watch {plate_directory}: {exception}")
+            return
+
+        self.__watched_plate_directories[wd] = plate_directory
+        self.__plate_directory_watches[plate_directory] = wd
+
+    # ----------------------------------------------------------------------------------------
+    def __unwatch_plate_directory(self, plate_directory: Path) -> None:
+        wd = self.__plate_directory_watches.pop(plate_directory, None)
+        if wd is not None:
+            self.__watched_plate_directories.pop(wd, None)
+            if self.__inotify is not None:
+                self.__inotify.remove_watch(wd)
+
+    # ----------------------------------------------------------------------------------------
+    def __forget_watch(self, wd: int) -> None:
+        """
+        The kernel removed the watch, typically because the directory was deleted.
+        """
+
+        self.__watched_plates_directories.pop(wd, None)
+
+        plate_directory = self.__watched_plate_directories.pop(wd, None)
+        if plate_directory is not None:
+            self.__plate_directory_watches.pop(plate_directory, None)
@@ -1,16 +1,14 @@
 import asyncio
 import logging
 import os
-import shutil
 import time
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 
 from dls_utilpack.callsign import callsign
 from dls_utilpack.explain import explain2
 from dls_utilpack.require import require
 from dls_utilpack.visit import get_xchem_directory
-from PIL import Image
 
 # Crystal plate object interface.
 from xchembku_api.crystal_plate_objects.interface import (
@@ -32,22 +30,163 @@ from xchembku_lib.crystal_plate_objects.crystal_plate_objects import CrystalPlat
 # Base class for collector instances.
 from rockingester_lib.collectors.base import Base as CollectorBase
 
+# Pools for running blocking work off the event loop.
+from rockingester_lib.executors import Executors, ExecutorsShare
+
 # Object able to talk to the formulatrix database.
 from rockingester_lib.ftrix_client import FtrixClient
 
+# Set of plates which have been finished with.
+from rockingester_lib.handled_index import HandledIndex
+
+# Fast image width/height reading.
+from rockingester_lib.image_probe import ProbeResult, probe_image_sizes_parallel
+
+# On-disk record of each plate's ingestion state.
+from rockingester_lib.ingest_journal import FINAL_STATES, IngestJournal, JournalStates
+
+# Counters, gauges and latencies for the metrics endpoint.
+from rockingester_lib.metrics import Metrics, TimedProxy
+
+# Barcodes not found in Formulatrix, with when to look again.
+from rockingester_lib.negative_cache import NegativeCache
+
+# Cache of plate models so waiting plates don't cost a database round trip.
+from rockingester_lib.plate_cache import PlateCache
+
+# Parallel copier of plate directories.
+from rockingester_lib.plate_copier import PlateCopier
+
 # Object which can inject new xchembku plate records discovered while looking in subwell images.
 from rockingester_lib.plate_injector import PlateInjector
 
+# Queue of plates waiting for images, ordered by when each is next due.
+from rockingester_lib.plate_scheduler import PlateScheduler, estimate_completion_time
+
+# Rebuilds xchembku records from the plates already in the visits.
+from rockingester_lib.reindexer import Reindexer
+
+# Time spent in each stage of ingesting a plate.
+from rockingester_lib.stage_timer import Stages, StageTimings
+
 logger = logging.getLogger(__name__)
 
 thing_type = "rockingester_lib.collectors.direct_poll"
 
 
+class IngestModes:
+    # Ingest all wells of a plate at once, when the plate is complete.
+    PLATE = "plate"
+    # Ingest each well as soon as its image is stable.
+    STREAMING = "streaming"
+
+
+# ------------------------------------------------------------------------------------------
+def _list_plate_names(
+    plates_directory: Path,
+    after: Optional[str] = None,
+    is_handled: Optional[Callable[[str], bool]] = None,
+) -> Tuple[List[str], Optional[float]]:
+    """
+    Blocking listing of the plate subdirectories in a plates directory.
+
+    Args:
+        plates_directory: directory to list
+        after: if given, names which sort up to this are returned only if not handled
+        is_handled: tells if a plate name is handled, names up to after are all taken as handled if None
+
+    Returns:
+        Tuple[List[str], Optional[float]]: the plate names, and the mtime of the plates directory
+            from just before it was listed, or None if it doesn't exist
+    """
+
+    try:
+        mtime = os.stat(plates_directory).st_mtime
+    except FileNotFoundError:
+        return [], None
+
+    plate_names = []
+    with os.scandir(plates_directory) as entries:
+        for entry in entries:
+            # Comparing names is cheap, so do it before asking if it is a directory.
+            # Names up to the cursor are nearly all handled, but a plate can still arrive late.
+            if after is not None and entry.name <= after:
+                if is_handled is None or is_handled(entry.name):
+                    continue
+            if entry.is_dir():
+                plate_names.append(entry.name)
+
+    return plate_names, mtime
+
+
+# ------------------------------------------------------------------------------------------
+def _get_mtime(path: Path) -> Optional[float]:
+    """
+    Blocking get of a file's mtime, or None if it doesn't exist.
+    """
+
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+
+# ------------------------------------------------------------------------------------------
+def _scan_plate_directory(
+    plate_directory: Path,
+) -> Tuple[List[Tuple[str, float]], float]:
+    """
+    Blocking listing of the subwell images in a plate directory.
+
+    Returns:
+        Tuple[List[Tuple[str, float]], float]: subwell image names with their mtimes,
+            and the mtime of the directory
+    """
+
+    directory_mtime = os.stat(plate_directory).st_mtime
+
+    with os.scandir(plate_directory) as entries:
+        subwell_entries = [(entry.name, entry.stat().st_mtime) for entry in entries]
+
+    return subwell_entries, directory_mtime
+
+
+# ------------------------------------------------------------------------------------------
+def _list_file_mtimes(directory: Path) -> Dict[str, float]:
+    """
+    Blocking listing of the files in a directory with their mtimes, empty if the directory does not exist.
+
+    Hidden files, such as partial copies left by a process which died, are not included.
+    """
+
+    if not directory.is_dir():
+        return {}
+
+    with os.scandir(directory) as entries:
+        return {
+            entry.name: entry.stat().st_mtime
+            for entry in entries
+            if entry.is_file() and not entry.name.startswith(".")
+        }
+
+
+# ------------------------------------------------------------------------------------------
+def _complete_marker(target: Path) -> Path:
+    """
+    The file which marks a plate as completely ingested in streaming mode.
+
+    It sits beside the target rather than in it, so the target holds only images.
+    """
+
+    return target.parent / f".{target.name}.complete"
+
+
 # ------------------------------------------------------------------------------------------
 class DirectPoll(CollectorBase):
     """
     Object representing an image collector.
     The behavior is to start a coro task to waken every few seconds and scan for newly created plate directories.
+    Plates still waiting for images are kept in a scheduler and only scraped again when they are next due.
     Image files are pushed to xchembku.
     Plates for the image files are also pushed to xchembku the first time they are wanted.
     """
@@ -86,6 +225,43 @@ class DirectPoll(CollectorBase):
         # Maximum time to wait for final image to arrive, relative to time of last arrived image.
         self.__max_wait_seconds = require(s, type_specific_tbd, "max_wait_seconds")
 
+        # Time between scrapes of the plates directories.
+        self.__tick_seconds = float(type_specific_tbd.get("tick_seconds", 1.0))
+
+        # Whether to ingest whole plates or each well as it arrives.
+        self.__ingest_mode = type_specific_tbd.get("ingest_mode", IngestModes.PLATE)
+        if self.__ingest_mode not in (IngestModes.PLATE, IngestModes.STREAMING):
+            raise RuntimeError(f"{s[0]} has invalid ingest_mode {self.__ingest_mode}")
+
+        # In streaming mode, how long an image must be unchanged before it is ingested.
+        self.__stable_seconds = float(type_specific_tbd.get("stable_seconds", 2.0))
+
+        # How many plate directories may be scraped at the same time from each plates directory.
+        self.__max_concurrent_plates = int(
+            type_specific_tbd.get("max_concurrent_plates", 1)
+        )
+
+        # Pools where filesystem and image work is done, off the event loop.
+        self.__executors = Executors(type_specific_tbd.get("executors_specification"))
+
+        # Each plates directory gets an equal share of the pool threads, made when first needed,
+        # so that calls hung on one imager's mount cannot hold all of them.
+        self.__executors_shares: Dict[Path, ExecutorsShare] = {}
+        if self.__executors.thread_workers() < len(self.__plates_directories):
+            logger.warning(
+                f"[ROCKINGESTER POLL] only {self.__executors.thread_workers()} thread workers"
+                f" for {len(self.__plates_directories)} plates directories,"
+                " a hung mount may hold threads needed by the others"
+            )
+
+        # Copies plate directories to the visit.
+        self.__plate_copier = PlateCopier(
+            type_specific_tbd.get("plate_copier_specification")
+        )
+
+        # Chunk sizes for rebuilding xchembku records from the visits, see reindex().
+        self.__reindex_specification = type_specific_tbd.get("reindex_specification")
+
         # Database where we will get plate barcodes and add new wells.
         self.__xchembku_client_context = None
         self.__xchembku = None
@@ -93,12 +269,103 @@ class DirectPoll(CollectorBase):
         # Object able to talk to the formulatrix database.
         self.__ftrix_client = None
 
+        # Plate models recently found or injected, keyed by barcode.
+        self.__plate_cache = PlateCache(
+            type_specific_tbd.get("plate_cache_specification")
+        )
+
+        # Barcodes not yet in Formulatrix, looked up again less and less often, if enabled.
+        # Otherwise they are inserted into xchembku with an error the first time they aren't found.
+        negative_cache_specification = type_specific_tbd.get(
+            "negative_cache_specification"
+        )
+        if negative_cache_specification is None:
+            negative_cache_specification = {}
+        self.__negative_cache: Optional[NegativeCache] = None
+        if negative_cache_specification.get("enabled", False):
+            self.__negative_cache = NegativeCache(negative_cache_specification)
+
         # This flag will stop the ticking async task.
         self.__keep_ticking = True
         self.__tick_future = None
 
-        # The plate names which we have already finished handling within the current instance.
-        self.__handled_plate_names = []
+        # This event awakens the ticking async task before its period is up.
+        self.__tick_event = None
+
+        # The plate names which we have already finished handling.
+        self.__handled_index = HandledIndex(
+            type_specific_tbd.get("handled_index_specification")
+        )
+
+        # How often to forget handled plates which are no longer in the plates directories.
+        self.__handled_prune_seconds = float(
+            type_specific_tbd.get("handled_prune_seconds", 3600.0)
+        )
+        self.__last_handled_prune_time = time.time()
+
+        # How often to list every plate in the plates directories, ignoring the cursors and mtimes.
+        # This catches a plates directory whose mtime is not kept up to date, as on some network filesystems.
+        self.__full_listing_seconds = float(
+            type_specific_tbd.get("full_listing_seconds", 3600.0)
+        )
+        self.__last_full_listing_time = 0.0
+
+        # The mtime of each plates directory and the time when it was last listed.
+        self.__plates_directory_listings: Dict[Path, Tuple[float, float]] = {}
+
+        # Record of plate states which survives restarts, in memory only if no filename is configured.
+        self.__ingest_journal = IngestJournal(type_specific_tbd.get("journal_filename"))
+
+        # The journal is the only place the checksums are kept, so don't make them for nothing.
+        if (
+            self.__plate_copier.is_checksummed()
+            and type_specific_tbd.get("journal_filename") is None
+        ):
+            raise RuntimeError(
+                f"{s[0]} has plate copier checksums but no journal_filename to keep them in"
+            )
+
+        # Plate directories not yet handled, keyed by when they are next due to be scraped.
+        self.__plate_scheduler = PlateScheduler()
+
+        # Tasks still running for each plates directory being listed, and when they started.
+        self.__plates_directory_tasks: Dict[Path, asyncio.Task] = {}
+        self.__plates_directory_task_times: Dict[Path, float] = {}
+
+        # Tasks still running for each plate directory being scraped.
+        self.__plate_tasks: Dict[Path, asyncio.Task] = {}
+
+        # Limits the plates being scraped at once from each plates directory.
+        self.__plates_directory_semaphores: Dict[Path, asyncio.Semaphore] = {}
+
+        # In streaming mode, the subwell images already ingested for each plate still arriving,
+        # with the mtimes they arrived with, since a rename takes them out of the plate directory.
+        self.__ingested_subwell_mtimes: Dict[str, Dict[str, float]] = {}
+
+        # What the collector has done and how long it took, see report_metrics().
+        self.__metrics = Metrics()
+        self.__metrics.describe("tick", "Time spent working in each tick.")
+        self.__metrics.describe("pending_plates", "Plates found but not yet finished.")
+        self.__metrics.describe(
+            "plates_ingested", "Plates whose images were all copied."
+        )
+        self.__metrics.describe("plates_errored", "Plates which could not be ingested.")
+        self.__metrics.describe("wells_ingested", "Well images upserted into xchembku.")
+        self.__metrics.describe(
+            "bytes_copied", "Bytes of well images copied to visits."
+        )
+        self.__metrics.describe("copy", "Time taken by each copy to a visit.")
+        self.__metrics.describe(
+            "copy_bytes_per_second", "Throughput of the most recent copy to a visit."
+        )
+        self.__metrics.describe("ftrix_query", "Formulatrix database queries.")
+        self.__metrics.describe("xchembku_call", "Calls to the xchembku dataface.")
+        self.__metrics.describe("scrape_errors", "Unexpected errors while scraping.")
+
+        # Time spent in each stage of each plate, with histograms kept in the metrics.
+        self.__stage_timings = StageTimings(
+            type_specific_tbd.get("stage_timings_specification"), self.__metrics
+        )
 
     # ----------------------------------------------------------------------------------------
     async def activate(self) -> None:
@@ -108,6 +375,21 @@ class DirectPoll(CollectorBase):
         Then it starts the coro task to awaken every few seconds to scrape the directories.
         """
 
+        await self.connect()
+
+        # Poll periodically.
+        self.__tick_event = asyncio.Event()
+        self.__tick_future = asyncio.get_event_loop().create_task(self.tick())
+
+    # ----------------------------------------------------------------------------------------
+    async def connect(self) -> None:
+        """
+        Open the connections to xchembku and Formulatrix, and the journal, without polling.
+
+        Used on its own when plates are scraped from outside, as the backfill does.
+        deactivate() closes them again.
+        """
+
         # Make the xchembku client context.
         s = require(
             f"{callsign(self)} specification",
@@ -125,20 +407,38 @@ class DirectPoll(CollectorBase):
         await self.__xchembku_client_context.aenter()
 
         # Get a reference to the xchembku interface provided by the context.
-        self.__xchembku = self.__xchembku_client_context.get_interface()
+        # Each call made to it is timed for the metrics.
+        self.__xchembku = TimedProxy(
+            self.__xchembku_client_context.get_interface(),
+            self.__metrics.latency_recorder("xchembku_call"),
+        )
 
         # Object able to talk to the formulatrix database.
         self.__ftrix_client = FtrixClient(
             self.__ftrix_client_specification,
         )
+        # Connections are pooled for the life of the collector.
+        await self.__ftrix_client.connect()
+        self.__metrics.add_latency_recorder(
+            "ftrix_query", self.__ftrix_client.latency_recorder()
+        )
 
         # Object which can inject new xchembku plate records discovered while looking in subwell images.
         self.__plate_injector = PlateInjector(
             self.__ftrix_client,
             self.__xchembku,
+            self.__plate_cache,
+            self.__negative_cache,
+        )
+        self.__executors.start()
+
+        # Plates finished in earlier runs don't need to be looked at again.
+        plate_states = await self.__executors.run_in_thread(self.__ingest_journal.open)
+        self.__handled_index.update(
+            plate_name
+            for plate_name, state in plate_states.items()
+            if state in FINAL_STATES
         )
-        # Poll periodically.
-        self.__tick_future = asyncio.get_event_loop().create_task(self.tick())
 
     # ----------------------------------------------------------------------------------------
     async def deactivate(self) -> None:
@@ -153,9 +453,28 @@ class DirectPoll(CollectorBase):
         if self.__tick_future is not None:
             # Set flag to stop the periodic ticking.
             self.__keep_ticking = False
+            self.wake()
             # Wait for the ticking to stop.
             await self.__tick_future
 
+        # Don't wait for scrapes which may be hung on a mount.
+        tasks = list(self.__plates_directory_tasks.values()) + list(
+            self.__plate_tasks.values()
+        )
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # The copier waits for its threads, so don't block the event loop while it does.
+        await self.__executors.run_in_thread(self.__plate_copier.shutdown)
+        self.__executors.shutdown()
+        self.__ingest_journal.close()
+        self.__stage_timings.dump_histograms()
+
+        if self.__ftrix_client is not None:
+            await self.__ftrix_client.disconnect()
+            self.__ftrix_client = None
+
         # Forget we have an xchembku client reference.
         self.__xchembku = None
 
@@ -170,15 +489,90 @@ class DirectPoll(CollectorBase):
 
         Stops when flag has been set by other tasks.
 
-        # TODO: Use an event to awaken ticker early to handle stop requests sooner.
+        Looks for new plate directories every tick_seconds, unless awakened early by wake().
+        In between, wakes when the soonest waiting plate is due.
         """
 
+        tick_latency_recorder = self.__metrics.latency_recorder("tick")
+
+        last_discovery_time = None
         while self.__keep_ticking:
-            # Scrape all the configured plates directories.
-            await self.scrape_plates_directories()
+            now = time.time()
+
+            # Look in all the configured plates directories for new plates.
+            if (
+                last_discovery_time is None
+                or self.__tick_event.is_set()
+                or now - last_discovery_time >= self.__tick_seconds
+            ):
+                self.__tick_event.clear()
+                last_discovery_time = now
+                await self.scrape_plates_directories()
+
+            # Scrape the plates which are now due.
+            await self.scrape_due_plate_directories()
 
-            # TODO: Make periodic tick period to be configurable.
-            await asyncio.sleep(1.0)
+            tick_latency_recorder.record(time.time() - now)
+
+            # Sleep until the next look for new plates, or until a waiting plate is due.
+            timeout = last_discovery_time + self.__tick_seconds - time.time()
+            next_due_time = self.__plate_scheduler.next_due_time()
+            if next_due_time is not None:
+                timeout = min(timeout, next_due_time - time.time())
+
+            try:
+                await asyncio.wait_for(
+                    self.__tick_event.wait(), timeout=max(0.0, timeout)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    # ----------------------------------------------------------------------------------------
+    def wake(self) -> None:
+        """
+        Awaken the ticking task now instead of at the end of its period.
+        """
+
+        if self.__tick_event is not None:
+            self.__tick_event.set()
+
+    # ----------------------------------------------------------------------------------------
+    def expedite(self, plate_directory: Path, delay_seconds: float = 0.0) -> None:
+        """
+        Make the plate directory due now, or after a delay, for example because something changed in it.
+
+        A plate which is already due sooner is left as it is.
+        """
+
+        if not self.is_handled(plate_directory.name):
+            self.__plate_scheduler.schedule(
+                plate_directory, time.time() + delay_seconds
+            )
+
+    # ----------------------------------------------------------------------------------------
+    def __executors_share(self, plates_directory: Path) -> ExecutorsShare:
+        """
+        The share of the pools for work on the plates directory and the plates in it.
+        """
+
+        executors_share = self.__executors_shares.get(plates_directory)
+        if executors_share is None:
+            executors_share = ExecutorsShare(
+                self.__executors,
+                self.__executors.thread_workers()
+                // max(1, len(self.__plates_directories)),
+            )
+            self.__executors_shares[plates_directory] = executors_share
+
+        return executors_share
+
+    # ----------------------------------------------------------------------------------------
+    def is_handled(self, plate_name: str) -> bool:
+        """
+        Tell if the plate has already been finished with by this instance.
+        """
+
+        return plate_name in self.__handled_index
 
     # ----------------------------------------------------------------------------------------
     async def scrape_plates_directories(self) -> None:
@@ -186,75 +580,364 @@ class DirectPoll(CollectorBase):
         Scrape all the configured directories looking in each one for new plate directories.
 
         Normally there is only one in the configured list of these places where plates arrive.
+
+        Each plates directory is scraped in its own task, so a slow or hung mount doesn't hold up the others.
+        The tasks are given one tick to finish, and one still running then is left to carry on.
+        A plates directory isn't scraped again while its previous task is still running.
         """
 
-        # TODO: Use asyncio tasks to paralellize scraping plates directories.
+        now = time.time()
+
+        # Normally only plate names above each directory's cursor are listed.
+        full_listing = (
+            now - self.__last_full_listing_time >= self.__full_listing_seconds
+        )
+        if full_listing:
+            self.__last_full_listing_time = now
+
+        tasks: Dict[asyncio.Task, Path] = {}
         for directory in self.__plates_directories:
-            try:
-                await self.scrape_plates_directory(Path(directory))
-            except Exception as exception:
-                # Just log the error, tag as anomaly for reporting, don't die.
-                logger.error(
-                    "[ANOMALY] "
-                    + explain2(exception, f"scraping plates directory {directory}"),
-                    exc_info=exception,
+            plates_directory = Path(directory)
+
+            task = self.__plates_directory_tasks.get(plates_directory)
+            if task is not None:
+                logger.warning(
+                    f"[ROCKINGESTER POLL] still scraping {str(plates_directory)}"
+                    f" after {'%0.1f' % (now - self.__plates_directory_task_times[plates_directory])} seconds"
                 )
+                continue
+
+            self.__plates_directory_task_times[plates_directory] = now
+            task = asyncio.get_event_loop().create_task(
+                self.__scrape_plates_directory_task(plates_directory, full_listing)
+            )
+            self.__plates_directory_tasks[plates_directory] = task
+            tasks[task] = plates_directory
+
+        if len(tasks) > 0:
+            await asyncio.wait(list(tasks.keys()), timeout=self.__tick_seconds)
+
+        # All plate names on disk, or None if any plates directory could not be listed in time.
+        all_plate_names: Optional[List[str]] = []
+        if len(tasks) < len(self.__plates_directories):
+            all_plate_names = None
+
+        for task in tasks.keys():
+            if not task.done() or task.result() is None:
+                all_plate_names = None
+            elif all_plate_names is not None:
+                all_plate_names.extend(task.result())
+
+        # Periodically forget handled plates which have been removed from disk.
+        # This needs the full listing, and is skipped when the listing looks wrong,
+        # since forgotten plates would be looked at again.
+        if (
+            full_listing
+            and all_plate_names
+            and now - self.__last_handled_prune_time >= self.__handled_prune_seconds
+        ):
+            self.__last_handled_prune_time = now
+            count = self.__handled_index.retain(all_plate_names)
+            if count > 0:
+                logger.debug(
+                    f"[ROCKINGESTER POLL] forgot {count} handled plates no longer on disk,"
+                    f" {len(self.__handled_index)} remain"
+                )
+
+    # ----------------------------------------------------------------------------------------
+    async def __scrape_plates_directory_task(
+        self,
+        plates_directory: Path,
+        full_listing: bool,
+    ) -> Optional[List[str]]:
+        """
+        Scrape one plates directory as its own task.
+
+        Returns:
+            Optional[List[str]]: plate names found, or None if there was an error
+        """
+
+        try:
+            plate_names = await self.scrape_plates_directory(
+                plates_directory, full_listing=full_listing
+            )
+
+            seconds = time.time() - self.__plates_directory_task_times[plates_directory]
+            logger.debug(
+                f"[ROCKINGESTER POLL] scraped {str(plates_directory)}"
+                f" in {'%0.3f' % seconds} seconds"
+            )
+
+            return plate_names
+        except Exception as exception:
+            self.__metrics.increment("scrape_errors")
+            # Just log the error, tag as anomaly for reporting, don't die.
+            logger.error(
+                "[ANOMALY] "
+                + explain2(
+                    exception, f"scraping plates directory {str(plates_directory)}"
+                ),
+                exc_info=exception,
+            )
+            return None
+        finally:
+            self.__plates_directory_tasks.pop(plates_directory, None)
 
     # ----------------------------------------------------------------------------------------
     async def scrape_plates_directory(
         self,
         plates_directory: Path,
-    ) -> None:
+        full_listing: bool = True,
+    ) -> List[str]:
         """
         Scrape a single directory looking for subdirectories which correspond to plates.
-        """
 
-        if not plates_directory.is_dir():
-            return
+        New plates are scheduled to be scraped straight away.
+        Plates already in the scheduler keep their due times.
+
+        Plate names sort in barcode order, which is the same as date order.
+        So the directory keeps a cursor, the name up to which every plate is handled,
+        and unless a full listing is asked for only names after the cursor are looked at.
+        The plates still pending after the cursor are kept in the scheduler.
+
+        A plate directory which arrives late, with a name below the cursor, is still found
+        since names below the cursor are checked against the handled index before being skipped.
+
+        The listing is skipped altogether when the plates directory's mtime shows nothing has been added.
+
+        Args:
+            plates_directory: directory to scrape
+            full_listing: list every plate, ignoring the cursor and the mtime
 
-        plate_names = [
-            entry.name for entry in os.scandir(plates_directory) if entry.is_dir()
-        ]
+        Returns:
+            List[str]: names of the plate directories found, all of them if full_listing
+        """
+
+        journal_key = str(plates_directory)
+        cursor = self.__ingest_journal.cursor(journal_key)
+
+        if not full_listing:
+            # Nothing has been added or removed since the last listing?
+            # The mtime is only trusted once the listing was a clear second after it,
+            # in case a plate directory arrived within the filesystem's timestamp resolution.
+            previous = self.__plates_directory_listings.get(plates_directory)
+            if previous is not None:
+                mtime = await self.__executors_share(plates_directory).run_in_thread(
+                    _get_mtime, plates_directory
+                )
+                previous_mtime, previous_listing_time = previous
+                if mtime == previous_mtime and previous_listing_time > mtime + 1.0:
+                    return []
+
+        # The handled index is only read in the thread, membership tests are safe alongside the updates.
+        listing_time = time.time()
+        plate_names, mtime = await self.__executors_share(
+            plates_directory
+        ).run_in_thread(
+            _list_plate_names,
+            plates_directory,
+            None if full_listing else cursor,
+            self.is_handled,
+        )
+        if mtime is not None:
+            self.__plates_directory_listings[plates_directory] = (mtime, listing_time)
 
         # Make sure we scrape the plate directories in barcode-order, which is the same as date order.
         plate_names.sort()
 
         logger.debug(
-            f"[ROCKINGESTER POLL] found {len(plate_names)} plate directories in {plates_directory}"
+            f"[ROCKINGESTER POLL] found {len(plate_names)} plate directories"
+            f" {'in' if full_listing or cursor is None else f'unhandled or after {cursor} in'}"
+            f" {plates_directory}"
         )
 
+        now = time.time()
+        new_cursor = cursor
+        advancing = True
         for plate_name in plate_names:
-            try:
-                await self.scrape_plate_directory(plates_directory / plate_name)
-            except Exception as exception:
-                # Just log the error, tag as anomaly for reporting, don't die.
-                logger.error(
-                    "[ANOMALY] "
-                    + explain2(
-                        exception,
-                        f"scraping plate directory {str(plates_directory / plate_name)}",
-                    ),
-                    exc_info=exception,
+            is_handled = self.is_handled(plate_name)
+
+            # Move the cursor past the handled plates, up to the first one still pending.
+            if advancing and (new_cursor is None or plate_name > new_cursor):
+                if is_handled:
+                    new_cursor = plate_name
+                else:
+                    advancing = False
+
+            if is_handled:
+                continue
+
+            plate_directory = plates_directory / plate_name
+            if plate_directory in self.__plate_scheduler:
+                continue
+            if plate_directory in self.__plate_tasks:
+                continue
+            self.__plate_scheduler.schedule(plate_directory, now)
+
+        if new_cursor is not None and new_cursor != cursor:
+            await self.__executors.run_in_thread(
+                self.__ingest_journal.record_cursor, journal_key, new_cursor
+            )
+
+        return plate_names
+
+    # ----------------------------------------------------------------------------------------
+    async def scrape_due_plate_directories(self) -> None:
+        """
+        Scrape the plate directories whose time has come.
+        """
+
+        plate_directories = self.__plate_scheduler.pop_due(time.time())
+
+        if len(plate_directories) > 0:
+            logger.debug(
+                f"[ROCKINGESTER POLL] {len(plate_directories)} plate directories due,"
+                f" {len(self.__plate_scheduler)} more waiting"
+            )
+
+            await self.scrape_plate_directories(plate_directories)
+
+    # ----------------------------------------------------------------------------------------
+    async def scrape_plate_directories(
+        self,
+        plate_directories: List[Path],
+    ) -> None:
+        """
+        Scrape the plate directories, each in its own task.
+
+        Up to max_concurrent_plates are scraped at once from each plates directory,
+        so plates on a slow or hung mount don't use up the slots of the other imagers.
+        The tasks are given one tick to finish, and those still running then are left to carry on.
+
+        Plates which are still waiting go back into the scheduler for when they are next due.
+
+        Errors are logged and don't stop the others, the plate is tried again on the next tick.
+        """
+
+        await self.prefetch_plates(plate_directories)
+
+        for plate_directory in plate_directories:
+            # Don't make tasks for the plates we have already finished with.
+            if self.is_handled(plate_directory.name):
+                continue
+
+            # Still being scraped from an earlier tick, so look again after this one.
+            if plate_directory in self.__plate_tasks:
+                self.__plate_scheduler.schedule(
+                    plate_directory, time.time() + self.__tick_seconds
+                )
+                continue
+
+            self.__plate_tasks[plate_directory] = asyncio.get_event_loop().create_task(
+                self.__scrape_plate_directory_task(plate_directory)
+            )
+
+        if len(self.__plate_tasks) > 0:
+            await asyncio.wait(
+                list(self.__plate_tasks.values()), timeout=self.__tick_seconds
+            )
+
+    # ----------------------------------------------------------------------------------------
+    async def prefetch_plates(self, plate_directories: List[Path]) -> None:
+        """
+        Find or inject the plates for a batch of plate directories together, filling the plate cache.
+
+        When a backlog of new plates arrives, this makes one Formulatrix round trip instead of one each.
+        Errors are only logged, since each plate is looked up again on its own when it is scraped.
+        """
+
+        barcodes = []
+        for plate_directory in plate_directories:
+            if self.is_handled(plate_directory.name):
+                continue
+
+            # Get the plate's barcode from the directory name.
+            plate_barcode = plate_directory.name[0:4]
+            if self.__ingest_only_barcodes is not None:
+                if plate_barcode not in self.__ingest_only_barcodes:
+                    continue
+            if self.__plate_cache.get(plate_barcode) is None:
+                barcodes.append(plate_barcode)
+
+        if len(barcodes) <= 1:
+            return
+
+        try:
+            await self.__plate_injector.find_or_inject_barcodes(
+                barcodes, self.__visits_directory
+            )
+        except Exception as exception:
+            logger.warning(
+                explain2(exception, f"prefetching {len(barcodes)} plates"),
+            )
+
+    # ----------------------------------------------------------------------------------------
+    async def __scrape_plate_directory_task(self, plate_directory: Path) -> None:
+        """
+        Scrape one plate directory as its own task, then schedule it again if it is still waiting.
+        """
+
+        semaphore = self.__plates_directory_semaphores.get(plate_directory.parent)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.__max_concurrent_plates)
+            self.__plates_directory_semaphores[plate_directory.parent] = semaphore
+
+        try:
+            async with semaphore:
+                next_time = await self.scrape_plate_directory(plate_directory)
+            if next_time is not None:
+                self.__plate_scheduler.schedule(plate_directory, next_time)
+        except Exception as exception:
+            # The plate directory has gone away, so stop scheduling it.
+            if isinstance(exception, FileNotFoundError) and not (
+                await self.__executors_share(plate_directory.parent).run_in_thread(
+                    plate_directory.is_dir
+                )
+            ):
+                logger.warning(
+                    f"[ROCKDIR] plate directory {str(plate_directory)} has disappeared"
                 )
+                self.__stage_timings.discard(plate_directory.name)
+                return
+
+            self.__plate_scheduler.schedule(
+                plate_directory, time.time() + self.__tick_seconds
+            )
+            self.__metrics.increment("scrape_errors")
+            # Just log the error, tag as anomaly for reporting, don't die.
+            logger.error(
+                "[ANOMALY] "
+                + explain2(
+                    exception,
+                    f"scraping plate directory {str(plate_directory)}",
+                ),
+                exc_info=exception,
+            )
+        finally:
+            self.__plate_tasks.pop(plate_directory, None)
 
     # ----------------------------------------------------------------------------------------
     async def scrape_plate_directory(
         self,
         plate_directory: Path,
-    ) -> None:
+    ) -> Optional[float]:
         """
         Scrape a single directory looking for images.
+
+        Returns:
+            Optional[float]: time at which the plate should next be scraped,
+                or None if there is nothing more to do for this plate directory
         """
 
         plate_name = plate_directory.name
 
         # We already handled this plate name?
-        if plate_name in self.__handled_plate_names:
+        if plate_name in self.__handled_index:
             # logger.debug(
             #     f"[ROCKINGESTER POLL] plate_barcode {plate_barcode}"
             #     f" is already handled in this instance"
             # )
-            return
+            return None
 
         # Get the plate's barcode from the directory name.
         plate_barcode = plate_name[0:4]
@@ -262,13 +945,23 @@ class DirectPoll(CollectorBase):
         # We have a specific list we want to process?
         if self.__ingest_only_barcodes is not None:
             if plate_barcode not in self.__ingest_only_barcodes:
-                return
+                # The list doesn't change, so don't look at this one again.
+                self.__handled_index.add(plate_name)
+                return None
+
+        if self.__ingest_journal.state(plate_name) is None:
+            await self.journal_plate(plate_name, JournalStates.SEEN)
+
+        plate_timer = self.__stage_timings.plate_timer(plate_name)
+        plate_timer.count_scrape()
 
         # Get the matching plate record from the xchembku or formulatrix database.
-        crystal_plate_model = await self.__plate_injector.find_or_inject_barcode(
-            plate_barcode,
-            self.__visits_directory,
-        )
+        with plate_timer.span(Stages.FIND_BARCODE):
+            crystal_plate_model = await self.__plate_injector.find_or_inject_barcode(
+                plate_barcode,
+                self.__visits_directory,
+                plate_timer,
+            )
 
         # The model has not been marked as being in error?
         if crystal_plate_model.error is None:
@@ -276,8 +969,16 @@ class DirectPoll(CollectorBase):
                 self.__visits_directory, crystal_plate_model.visit
             )
 
+            # Scrape the directory as images arrive.
+            if self.__ingest_mode == IngestModes.STREAMING:
+                return await self.scrape_plate_directory_streaming(
+                    plate_directory,
+                    crystal_plate_model,
+                    visit_directory,
+                )
+
             # Scrape the directory when all image files have arrived.
-            await self.scrape_plate_directory_if_complete(
+            return await self.scrape_plate_directory_if_complete(
                 plate_directory,
                 crystal_plate_model,
                 visit_directory,
@@ -288,9 +989,22 @@ class DirectPoll(CollectorBase):
             logger.debug(
                 f"[ROCKDIR] for plate_barcode {plate_barcode} crystal_plate_model.error is: {crystal_plate_model.error}"
             )
-            # Remember we "handled" this one within the current instance.
+
+            # The barcode isn't in Formulatrix yet, so look again later rather than giving up.
+            next_check_time = self.__plate_injector.next_check_time(plate_barcode)
+            if next_check_time is not None:
+                await self.journal_plate(
+                    plate_name, JournalStates.NOT_FOUND, crystal_plate_model.error
+                )
+                return next_check_time
+
+            # Remember we "handled" this one, also for the next instance.
             # Keeping this list could be obviated if we could move the files out of the plates directory after we process them.
-            self.__handled_plate_names.append(plate_name)
+            await self.journal_plate(
+                plate_name, JournalStates.ERROR, crystal_plate_model.error
+            )
+
+            return None
 
     # ----------------------------------------------------------------------------------------
     async def scrape_plate_directory_if_complete(
@@ -298,18 +1012,23 @@ class DirectPoll(CollectorBase):
         plate_directory: Path,
         crystal_plate_model: CrystalPlateModel,
         visit_directory: Path,
-    ) -> None:
+    ) -> Optional[float]:
         """
         Scrape a single directory looking for new files.
 
         Adds discovered files to internal list which gets pushed when it reaches a configurable size.
 
-        TODO: Consider some other flow where well images can be copied as they arrive instead of doing them all in a bunch.
+        See scrape_plate_directory_streaming for the flow where well images are copied as they arrive.
 
         Args:
             plate_directory: disk directory where to look for subwell images
             crystal_plate_model: pre-built crystal plate description
             visit_directory: full path to the top of the visit directory
+
+        Returns:
+            Optional[float]: time at which the plate should next be scraped,
+                which is when all images are expected but no later than the maximum wait,
+                or None if the plate directory has been handled
         """
 
         # Name of the destination directory where we will permanently store ingested well image files.
@@ -318,34 +1037,30 @@ class DirectPoll(CollectorBase):
         )
 
         # We have already put this plate directory into the visit directory?
+        # The target only appears once all its images are copied, so it is complete.
         # This shouldn't really happen except when someone has been fiddling with the database.
-        # TODO: Have a way to rebuild rockingest after database wipe, but images have already been copied to the visit.
-        if target.is_dir():
+        # After a database wipe, the records of plates already copied are rebuilt by reindex().
+        if await self.__executors.run_in_thread(target.is_dir):
             # Presumably this is done, so no error but log it.
             logger.debug(
                 f"[ROCKDIR] plate directory {plate_directory.name} is apparently already copied to {target}"
             )
-            self.__handled_plate_names.append(plate_directory.stem)
-            return
+            await self.journal_plate(plate_directory.name, JournalStates.COPIED)
+            return None
 
-        # This is the first time we have scraped a directory for this plate record in the database?
-        if crystal_plate_model.rockminer_collected_stem is None:
-            # Update the path stem in the crystal plate record.
-            # TODO: Consider if important to report/record same barcodes on different rockmaker directories.
-            crystal_plate_model.rockminer_collected_stem = plate_directory.stem
-            await self.__xchembku.upsert_crystal_plates(
-                [crystal_plate_model], "update rockminer_collected_stem"
-            )
+        plate_timer = self.__stage_timings.plate_timer(plate_directory.name)
+
+        with plate_timer.span(Stages.RECORD_STEM):
+            await self.record_collected_stem(plate_directory, crystal_plate_model)
 
         # Get all the well images in the plate directory and the latest arrival time.
-        subwell_names = []
         max_wait_seconds = self.__max_wait_seconds
-        max_mtime = os.stat(plate_directory).st_mtime
-
-        with os.scandir(plate_directory) as entries:
-            for entry in entries:
-                subwell_names.append(entry.name)
-                max_mtime = max(max_mtime, entry.stat().st_mtime)
+        with plate_timer.span(Stages.SCAN):
+            subwell_entries, directory_mtime = await self.__executors_share(
+                plate_directory.parent
+            ).run_in_thread(_scan_plate_directory, plate_directory)
+        subwell_names = [subwell_name for subwell_name, _ in subwell_entries]
+        max_mtime = max([directory_mtime] + [mtime for _, mtime in subwell_entries])
 
         # TODO: Verify that time.time() where rockingester runs matches os.stat() on filesystem from which images are collected.
         waited_seconds = time.time() - max_mtime
@@ -364,7 +1079,15 @@ class DirectPoll(CollectorBase):
                     f" in {plate_directory}"
                     f" after waiting {'%0.1f' % waited_seconds} out of {max_wait_seconds} seconds"
                 )
-                return
+                await self.journal_plate(plate_directory.name, JournalStates.WAITING)
+
+                # Look again when the images so far suggest the rest will be here.
+                return estimate_completion_time(
+                    [mtime for _, mtime in subwell_entries],
+                    crystal_plate_object.get_well_count(),
+                    max_mtime + max_wait_seconds,
+                    time.time() + self.__tick_seconds,
+                )
             else:
                 logger.warning(
                     f"[PLATEDONE] done waiting even though found only {len(subwell_names)}"
@@ -383,37 +1106,401 @@ class DirectPoll(CollectorBase):
         # Sort wells by name so that tests are deterministic.
         subwell_names.sort()
 
-        crystal_well_models: List[CrystalWellModel] = []
-        for subwell_name in subwell_names:
-            # Make the well model, including image width/height.
-            crystal_well_model = await self.ingest_well(
+        with plate_timer.span(Stages.INGEST_WELLS):
+            crystal_well_models = await self.make_well_models(
                 plate_directory,
-                subwell_name,
+                subwell_names,
                 crystal_plate_model,
                 crystal_plate_object,
                 target,
             )
 
-            # Append well model to the list of all wells on the plate.
-            crystal_well_models.append(crystal_well_model)
-
         # Here we create or update the crystal well records into xchembku.
         # TODO: Make sure that direct_poll does not double-create crystal well records if scrape is re-run with a different filename path.
-        await self.__xchembku.upsert_crystal_wells(crystal_well_models)
-
-        # Copy scraped directory to visit, replacing what might already be there.
-        # TODO: Handle case where we upsert the crystal_well record but then unable to copy image file.
-        shutil.copytree(
-            plate_directory,
-            target,
-        )
+        with plate_timer.span(Stages.UPSERT_WELLS):
+            await self.__xchembku.upsert_crystal_wells(crystal_well_models)
+        self.__metrics.increment("wells_ingested", len(crystal_well_models))
+        await self.journal_plate(plate_directory.name, JournalStates.UPSERTED)
+
+        # Copy scraped directory to visit, through a staging directory renamed into place when complete.
+        # If we die before then, the wells are upserted again on restart, which is harmless,
+        # and the copy resumes from the files already staged.
+        with plate_timer.span(Stages.COPY):
+            copy_report = await self.__executors_share(
+                plate_directory.parent
+            ).run_in_thread(
+                self.__plate_copier.copy_tree_staged,
+                plate_directory,
+                target,
+            )
+        self.__record_copy_metrics(copy_report)
+        await self.__record_checksums(plate_directory.name, copy_report)
 
         logger.info(
             f"copied {len(subwell_names)} well images from plate {plate_directory.name} to {target}"
+            f" ({copy_report['byte_count']} bytes in {'%0.3f' % copy_report['seconds']} seconds"
+            f" at {'%0.1f' % (copy_report['bytes_per_second'] / 1e6)} MB/s"
+            f" using {copy_report['methods']})"
+        )
+
+        # Remember we "handled" this one.
+        await self.journal_plate(plate_directory.name, JournalStates.COPIED)
+
+        return None
+
+    # ----------------------------------------------------------------------------------------
+    async def scrape_plate_directory_streaming(
+        self,
+        plate_directory: Path,
+        crystal_plate_model: CrystalPlateModel,
+        visit_directory: Path,
+    ) -> Optional[float]:
+        """
+        Scrape a single directory, ingesting each image once it has stopped changing.
+
+        New stable images are upserted as wells and then copied to the visit straight away.
+        When the plate is complete, or the maximum wait is exceeded, a completion marker is written.
+
+        The images already copied to the target let a restarted process resume a plate.
+
+        The wait for the rest of the images runs from the latest arrival of any of them,
+        counting those already ingested, whose mtimes are kept when they are copied.
+        The plate directory's mtime only counts before any image has arrived,
+        since renaming images out of it also changes it.
+
+        Args:
+            plate_directory: disk directory where to look for subwell images
+            crystal_plate_model: pre-built crystal plate description
+            visit_directory: full path to the top of the visit directory
+
+        Returns:
+            Optional[float]: time at which the plate should next be scraped,
+                or None if the plate directory has been handled
+        """
+
+        plate_name = plate_directory.name
+
+        # Name of the destination directory where we will permanently store ingested well image files.
+        target = visit_directory / self.__visit_plates_subdirectory / plate_name
+        complete_marker = _complete_marker(target)
+
+        # We have already completely ingested this plate?
+        if await self.__executors.run_in_thread(complete_marker.is_file):
+            logger.debug(
+                f"[ROCKDIR] plate directory {plate_name} is apparently already streamed to {target}"
+            )
+            self.__ingested_subwell_mtimes.pop(plate_name, None)
+            await self.journal_plate(plate_name, JournalStates.COPIED)
+            return None
+
+        plate_timer = self.__stage_timings.plate_timer(plate_name)
+
+        with plate_timer.span(Stages.RECORD_STEM):
+            await self.record_collected_stem(plate_directory, crystal_plate_model)
+
+        # First time we look at this plate in this process, so resume from what was already copied.
+        ingested_subwell_mtimes = self.__ingested_subwell_mtimes.get(plate_name)
+        if ingested_subwell_mtimes is None:
+            # Finish any image left part way into the visit, whose well is already upserted.
+            recovered_subwell_names = await self.__executors.run_in_thread(
+                self.__plate_copier.recover_partials, plate_directory, target
+            )
+            if len(recovered_subwell_names) > 0:
+                logger.info(
+                    f"[PLATESTREAM] recovered {len(recovered_subwell_names)} well images"
+                    f" left part way into {target} for plate {plate_name}"
+                )
+            ingested_subwell_mtimes = await self.__executors.run_in_thread(
+                _list_file_mtimes, target
+            )
+            self.__ingested_subwell_mtimes[plate_name] = ingested_subwell_mtimes
+
+        # Get all the well images in the plate directory.
+        max_wait_seconds = self.__max_wait_seconds
+        with plate_timer.span(Stages.SCAN):
+            subwell_entries, directory_mtime = await self.__executors_share(
+                plate_directory.parent
+            ).run_in_thread(_scan_plate_directory, plate_directory)
+
+        # The latest arrival time is of the images here or already ingested.
+        # The directory's mtime changes when images are renamed out of it, so only use it before any arrive.
+        max_mtime = max(
+            [mtime for _, mtime in subwell_entries]
+            + list(ingested_subwell_mtimes.values()),
+            default=directory_mtime,
+        )
+
+        now = time.time()
+        waited_seconds = now - max_mtime
+        deadline = max_mtime + max_wait_seconds
+
+        # Make an object corresponding to the crystal plate model's type.
+        crystal_plate_object = CrystalPlateObjects().build_object(
+            {"type": crystal_plate_model.thing_type}
+        )
+
+        # Split the images not yet ingested into those which are stable and those still changing.
+        stable_subwell_mtimes: Dict[str, float] = {}
+        unstable_mtimes = []
+        for subwell_name, mtime in subwell_entries:
+            if subwell_name in ingested_subwell_mtimes:
+                continue
+            if (
+                now - mtime >= self.__stable_seconds
+                or waited_seconds >= max_wait_seconds
+            ):
+                stable_subwell_mtimes[subwell_name] = mtime
+            else:
+                unstable_mtimes.append(mtime)
+
+        if len(stable_subwell_mtimes) > 0:
+            # Sort wells by name so that tests are deterministic.
+            stable_subwell_names = sorted(stable_subwell_mtimes)
+
+            with plate_timer.span(Stages.INGEST_WELLS):
+                crystal_well_models = await self.make_well_models(
+                    plate_directory,
+                    stable_subwell_names,
+                    crystal_plate_model,
+                    crystal_plate_object,
+                    target,
+                )
+
+            # Upsert before copying, so a crash in between just re-upserts on restart.
+            with plate_timer.span(Stages.UPSERT_WELLS):
+                await self.__xchembku.upsert_crystal_wells(crystal_well_models)
+            self.__metrics.increment("wells_ingested", len(crystal_well_models))
+            await self.journal_plate(plate_name, JournalStates.UPSERTED)
+
+            with plate_timer.span(Stages.COPY):
+                copy_report = await self.__executors_share(
+                    plate_directory.parent
+                ).run_in_thread(
+                    self.__plate_copier.copy_files,
+                    plate_directory,
+                    stable_subwell_names,
+                    target,
+                )
+            self.__record_copy_metrics(copy_report)
+            await self.__record_checksums(plate_name, copy_report)
+
+            ingested_subwell_mtimes.update(stable_subwell_mtimes)
+
+            logger.info(
+                f"[PLATESTREAM] copied {len(stable_subwell_names)} more well images"
+                f" ({len(ingested_subwell_mtimes)} so far) from plate {plate_name} to {target}"
+                f" ({copy_report['byte_count']} bytes in {'%0.3f' % copy_report['seconds']} seconds)"
+            )
+
+        well_count = crystal_plate_object.get_well_count()
+        # Images renamed to the visit are no longer in the plate directory, so count them too.
+        subwell_count = len(
+            set(ingested_subwell_mtimes).union(
+                subwell_name for subwell_name, _ in subwell_entries
+            )
+        )
+        is_complete = subwell_count >= well_count
+
+        # Not done yet, so tell when next to look, which is when the next image should be stable.
+        # With nothing pending, new images can only be found by looking again on the next tick.
+        if len(unstable_mtimes) > 0 or (
+            not is_complete and waited_seconds < max_wait_seconds
+        ):
+            if len(unstable_mtimes) > 0:
+                next_time = min(unstable_mtimes) + self.__stable_seconds
+            else:
+                next_time = now + self.__tick_seconds
+            return min(next_time, deadline)
+
+        if is_complete:
+            logger.debug(
+                f"[PLATEDONE] done streaming since found all {subwell_count}"
+                f" out of {well_count} subwell images in {plate_directory}"
+            )
+        else:
+            logger.warning(
+                f"[PLATEDONE] done streaming even though found only {subwell_count}"
+                f" out of {well_count} subwell images in {plate_directory}"
+                f" after waiting {'%0.1f' % waited_seconds} out of {max_wait_seconds} seconds"
+            )
+
+        # Mark the plate as completely ingested.
+        await self.__executors.run_in_thread(
+            self.__write_complete_marker, target, complete_marker
+        )
+
+        # If the images were renamed to the visit, the plate directory is now empty.
+        await self.__executors.run_in_thread(
+            self.__plate_copier.release_source, plate_directory
         )
 
         # Remember we "handled" this one.
-        self.__handled_plate_names.append(plate_directory.stem)
+        self.__ingested_subwell_mtimes.pop(plate_name, None)
+        await self.journal_plate(plate_name, JournalStates.COPIED)
+
+        return None
+
+    # ----------------------------------------------------------------------------------------
+    async def journal_plate(
+        self, plate_name: str, state: str, error: Optional[str] = None
+    ) -> None:
+        """
+        Record the plate's state in the journal, and remember it as handled if it is finished.
+
+        A finished plate's stage timings are reported.
+        """
+
+        is_changed = await self.__executors.run_in_thread(
+            self.__ingest_journal.record, plate_name, state, error
+        )
+
+        if state in FINAL_STATES:
+            self.__handled_index.add(plate_name)
+            await self.__executors.run_in_thread(
+                self.__stage_timings.finish, plate_name, state
+            )
+
+        if is_changed:
+            if state == JournalStates.COPIED:
+                self.__metrics.increment("plates_ingested")
+            elif state == JournalStates.ERROR:
+                self.__metrics.increment("plates_errored")
+
+    # ----------------------------------------------------------------------------------------
+    def __record_copy_metrics(self, copy_report: Dict) -> None:
+        self.__metrics.increment("bytes_copied", copy_report["byte_count"])
+        self.__metrics.latency_recorder("copy").record(copy_report["seconds"])
+        self.__metrics.set_gauge(
+            "copy_bytes_per_second", copy_report["bytes_per_second"]
+        )
+
+    # ----------------------------------------------------------------------------------------
+    async def __record_checksums(self, plate_name: str, copy_report: Dict) -> None:
+        """
+        Keep the checksums of the copied images in the journal, if the copier made them.
+
+        The well models have nowhere to put a checksum, so they are not sent to xchembku.
+        """
+
+        checksums = copy_report.get("checksums")
+        if checksums is None:
+            return
+
+        await self.__executors.run_in_thread(
+            self.__ingest_journal.record_checksums, plate_name, checksums
+        )
+
+    # ----------------------------------------------------------------------------------------
+    def metrics(self) -> Metrics:
+        return self.__metrics
+
+    # ----------------------------------------------------------------------------------------
+    def executors(self) -> Executors:
+        return self.__executors
+
+    # ----------------------------------------------------------------------------------------
+    async def report_metrics(self) -> str:
+        """
+        The collector's metrics in the Prometheus text format.
+        """
+
+        self.__metrics.set_gauge(
+            "pending_plates", len(self.__plate_scheduler) + len(self.__plate_tasks)
+        )
+        self.__metrics.set_gauge("handled_plates", len(self.__handled_index))
+        if self.__negative_cache is not None:
+            self.__metrics.set_gauge("not_found_barcodes", len(self.__negative_cache))
+
+        return self.__metrics.render()
+
+    # ----------------------------------------------------------------------------------------
+    async def reindex(self) -> Dict:
+        """
+        Rebuild the xchembku plate and well records from the plates already copied to the visits.
+
+        Meant for after a database wipe, so no image is copied.
+
+        Returns:
+            Dict: the report from Reindexer.run()
+        """
+
+        reindexer = Reindexer(
+            self.__visits_directory,
+            self.__visit_plates_subdirectory,
+            self.__xchembku,
+            self.__plate_injector,
+            self.__executors,
+            self.__reindex_specification,
+        )
+
+        return await reindexer.run()
+
+    # ----------------------------------------------------------------------------------------
+    def __write_complete_marker(self, target: Path, complete_marker: Path) -> None:
+        """
+        Blocking write of the completion marker, making the target if no images were ever copied.
+        """
+
+        target.mkdir(parents=True, exist_ok=True)
+        complete_marker.touch()
+
+    # ----------------------------------------------------------------------------------------
+    async def record_collected_stem(
+        self,
+        plate_directory: Path,
+        crystal_plate_model: CrystalPlateModel,
+    ) -> None:
+        """
+        Record in xchembku the directory stem the plate is being collected from, if not done already.
+        """
+
+        # This is the first time we have scraped a directory for this plate record in the database?
+        if crystal_plate_model.rockminer_collected_stem is None:
+            # Update the path stem in the crystal plate record.
+            # TODO: Consider if important to report/record same barcodes on different rockmaker directories.
+            crystal_plate_model.rockminer_collected_stem = plate_directory.stem
+            # Don't let the cache hold the changed model unless the upsert succeeds.
+            self.__plate_cache.invalidate(crystal_plate_model.barcode)
+            await self.__xchembku.upsert_crystal_plates(
+                [crystal_plate_model], "update rockminer_collected_stem"
+            )
+            self.__plate_cache.put(crystal_plate_model)
+
+    # ----------------------------------------------------------------------------------------
+    async def make_well_models(
+        self,
+        plate_directory: Path,
+        subwell_names: List[str],
+        crystal_plate_model: CrystalPlateModel,
+        crystal_plate_object: CrystalPlateInterface,
+        target: Path,
+    ) -> List[CrystalWellModel]:
+        """
+        Make the well models for the subwell images, reading all the image sizes in parallel.
+        """
+
+        # Read the image width/height of all the images in parallel.
+        probe_results = await probe_image_sizes_parallel(
+            self.__executors_share(plate_directory.parent),
+            [plate_directory / subwell_name for subwell_name in subwell_names],
+        )
+
+        crystal_well_models: List[CrystalWellModel] = []
+        for subwell_name, probe_result in zip(subwell_names, probe_results):
+            # Make the well model, including image width/height.
+            crystal_well_model = await self.ingest_well(
+                plate_directory,
+                subwell_name,
+                crystal_plate_model,
+                crystal_plate_object,
+                target,
+                probe_result,
+            )
+
+            # Append well model to the list of all wells on the plate.
+            crystal_well_models.append(crystal_well_model)
+
+        return crystal_well_models
 
     # ----------------------------------------------------------------------------------------
     async def ingest_well(
@@ -423,28 +1510,22 @@ class DirectPoll(CollectorBase):
         crystal_plate_model: CrystalPlateModel,
         crystal_plate_object: CrystalPlateInterface,
         target: Path,
+        probe_result: ProbeResult,
     ) -> CrystalWellModel:
         """
-        Ingest the well into the database.
+        Make the well model to be ingested into the database.
 
-        Move the well image file to the ingested area.
+        Args:
+            probe_result: the image width, height and error as already read from the image file
         """
 
-        input_well_filename = plate_directory / subwell_name
         ingested_well_filename = target / subwell_name
 
         # Stems are like "9acx_01A_1".
         # Convert the stem into a position as shown in soakdb3.
         position = crystal_plate_object.normalize_subwell_name(Path(subwell_name).stem)
 
-        error = None
-        try:
-            image = Image.open(input_well_filename)
-            width, height = image.size
-        except Exception as exception:
-            error = str(exception)
-            width = None
-            height = None
+        width, height, error = probe_result
 
         crystal_well_model = CrystalWellModel(
             position=position,
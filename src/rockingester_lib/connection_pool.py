@@ -0,0 +1,209 @@
+import contextlib
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections, such as the ones pytds makes.
+
+    Connections are reused, up to max_size of them exist at once.
+    A connection which has been idle for a while is checked before being handed out,
+    and one which is broken, or was in use when an error happened, is closed and replaced.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        specification: Optional[Dict] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            factory: called with no arguments to make a new connection
+            specification (Optional[Dict]): may contain
+                "max_size" (default 4), most connections open at once,
+                "acquire_timeout_seconds" (default 30), longest to wait for a free connection,
+                "health_check_seconds" (default 30), idle time after which a connection is checked,
+                "health_check_sql" (default "SELECT 1").
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__factory = factory
+        self.__max_size = int(specification.get("max_size", 4))
+        self.__acquire_timeout_seconds = float(
+            specification.get("acquire_timeout_seconds", 30.0)
+        )
+        self.__health_check_seconds = float(
+            specification.get("health_check_seconds", 30.0)
+        )
+        self.__health_check_sql = specification.get("health_check_sql", "SELECT 1")
+
+        # Idle connections with the time they were last released, most recent last.
+        self.__idle: List[Tuple[Any, float]] = []
+
+        # Connections which exist, idle or in use.
+        self.__size = 0
+
+        self.__created_count = 0
+        self.__is_closed = False
+
+        self.__condition = threading.Condition()
+
+    # ----------------------------------------------------------------------------------------
+    def max_size(self) -> int:
+        return self.__max_size
+
+    # ----------------------------------------------------------------------------------------
+    def size(self) -> int:
+        return self.__size
+
+    # ----------------------------------------------------------------------------------------
+    def idle_count(self) -> int:
+        return len(self.__idle)
+
+    # ----------------------------------------------------------------------------------------
+    def created_count(self) -> int:
+        return self.__created_count
+
+    # ----------------------------------------------------------------------------------------
+    def acquire(self) -> Any:
+        """
+        Blocking get of a healthy connection, making one if there is room.
+
+        Raises:
+            RuntimeError: when the pool is closed
+            TimeoutError: when no connection became free in time
+        """
+
+        deadline = time.monotonic() + self.__acquire_timeout_seconds
+
+        while True:
+            with self.__condition:
+                while True:
+                    if self.__is_closed:
+                        raise RuntimeError("connection pool is closed")
+
+                    if len(self.__idle) > 0:
+                        connection, released_time = self.__idle.pop()
+                        break
+
+                    if self.__size < self.__max_size:
+                        # Reserve the slot, then connect outside the lock.
+                        self.__size += 1
+                        connection = None
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(
+                            f"no free connection after {self.__acquire_timeout_seconds} seconds"
+                            f" with all {self.__max_size} in use"
+                        )
+                    self.__condition.wait(remaining)
+
+            if connection is None:
+                try:
+                    connection = self.__factory()
+                except Exception:
+                    self.__forget()
+                    raise
+
+                with self.__condition:
+                    self.__created_count += 1
+
+                return connection
+
+            if time.monotonic() - released_time < self.__health_check_seconds:
+                return connection
+
+            if self.__is_healthy(connection):
+                return connection
+
+            # Broken, so throw it away and go round again for another.
+            logger.warning("[CONNECTION POOL] discarding unhealthy idle connection")
+            self.__close_quietly(connection)
+            self.__forget()
+
+    # ----------------------------------------------------------------------------------------
+    def release(self, connection: Any, is_broken: bool = False) -> None:
+        """
+        Give a connection back to the pool, or close it if it's broken or the pool is closed.
+        """
+
+        with self.__condition:
+            if not is_broken and not self.__is_closed:
+                self.__idle.append((connection, time.monotonic()))
+                self.__condition.notify()
+                return
+
+        self.__close_quietly(connection)
+        self.__forget()
+
+    # ----------------------------------------------------------------------------------------
+    @contextlib.contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Context manager which acquires a connection and releases it afterwards.
+
+        If the block raises, the connection might be in a bad state, so it is not reused.
+        """
+
+        connection = self.acquire()
+        try:
+            yield connection
+        except BaseException:
+            self.release(connection, is_broken=True)
+            raise
+        self.release(connection)
+
+    # ----------------------------------------------------------------------------------------
+    def close(self) -> None:
+        """
+        Close the idle connections, and any in use when they are released.
+        """
+
+        with self.__condition:
+            self.__is_closed = True
+            idle = self.__idle
+            self.__idle = []
+            self.__size -= len(idle)
+            self.__condition.notify_all()
+
+        for connection, _ in idle:
+            self.__close_quietly(connection)
+
+    # ----------------------------------------------------------------------------------------
+    def __forget(self) -> None:
+        with self.__condition:
+            self.__size -= 1
+            self.__condition.notify()
+
+    # ----------------------------------------------------------------------------------------
+    def __is_healthy(self, connection: Any) -> bool:
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.__health_check_sql)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception as exception:
+            logger.debug(f"[CONNECTION POOL] health check failed: {exception}")
+            return False
+
+    # ----------------------------------------------------------------------------------------
+    def __close_quietly(self, connection: Any) -> None:
+        try:
+            connection.close()
+        except Exception as exception:
+            logger.debug(f"[CONNECTION POOL] error closing connection: {exception}")
@@ -0,0 +1,167 @@
+import asyncio
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Executors:
+    """
+    Thread pool, and optional process pool, for running blocking work off the asyncio event loop.
+
+    Filesystem calls go to the thread pool.
+    CPU-bound work goes to the process pool when one is configured, otherwise to the thread pool.
+    Functions given to run_in_process must be picklable, i.e. defined at module level.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification: Optional[Dict] = None):
+        """
+        Constructor.
+
+        Args:
+            specification (Optional[Dict]): may contain "thread_workers" (default 4),
+                "process_workers" (default 0, meaning no process pool)
+                and "process_start_method" (default "spawn").
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__thread_workers = int(specification.get("thread_workers", 4))
+        self.__process_workers = int(specification.get("process_workers", 0))
+        self.__process_start_method = specification.get("process_start_method", "spawn")
+
+        self.__thread_pool_executor: Optional[
+            concurrent.futures.ThreadPoolExecutor
+        ] = None
+        self.__process_pool_executor: Optional[
+            concurrent.futures.ProcessPoolExecutor
+        ] = None
+
+    # ----------------------------------------------------------------------------------------
+    def thread_workers(self) -> int:
+        return self.__thread_workers
+
+    # ----------------------------------------------------------------------------------------
+    def process_workers(self) -> int:
+        return self.__process_workers
+
+    # ----------------------------------------------------------------------------------------
+    def start(self) -> None:
+        """
+        Create the pools.  Workers are only started when work is first submitted.
+        """
+
+        if self.__thread_pool_executor is None:
+            self.__thread_pool_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(1, self.__thread_workers),
+                thread_name_prefix="rockingester",
+            )
+
+        if self.__process_pool_executor is None and self.__process_workers > 0:
+            self.__process_pool_executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.__process_workers,
+                mp_context=multiprocessing.get_context(self.__process_start_method),
+            )
+
+    # ----------------------------------------------------------------------------------------
+    def shutdown(self) -> None:
+        """
+        Shut down the pools without waiting, cancelling anything not yet started.
+        """
+
+        if self.__thread_pool_executor is not None:
+            self.__thread_pool_executor.shutdown(wait=False, cancel_futures=True)
+            self.__thread_pool_executor = None
+
+        if self.__process_pool_executor is not None:
+            self.__process_pool_executor.shutdown(wait=False, cancel_futures=True)
+            self.__process_pool_executor = None
+
+    # ----------------------------------------------------------------------------------------
+    async def run_in_thread(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Run the blocking function in the thread pool and return its result.
+        """
+
+        self.start()
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self.__thread_pool_executor, functools.partial(function, *args, **kwargs)
+        )
+
+    # ----------------------------------------------------------------------------------------
+    async def run_in_process(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Run the function in the process pool, or the thread pool if there is no process pool.
+        """
+
+        self.start()
+
+        executor: Optional[concurrent.futures.Executor] = self.__process_pool_executor
+        if executor is None:
+            executor = self.__thread_pool_executor
+
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, functools.partial(function, *args, **kwargs)
+        )
+
+
+class ExecutorsShare:
+    """
+    A share of the pools in an Executors object, which runs at most max_workers of its calls at once.
+
+    Each plates directory has its own share, so calls hung on one mount cannot hold every thread in the pool.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, executors: Executors, max_workers: int):
+        """
+        Constructor.
+
+        Args:
+            executors (Executors): the pools which are shared
+            max_workers (int): how many calls may be running in the pools at once, at least 1
+        """
+
+        self.__executors = executors
+        self.__max_workers = max(1, max_workers)
+
+        # Made when first needed, so that it belongs to the running event loop.
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+
+    # ----------------------------------------------------------------------------------------
+    def thread_workers(self) -> int:
+        return min(self.__max_workers, self.__executors.thread_workers())
+
+    # ----------------------------------------------------------------------------------------
+    def process_workers(self) -> int:
+        return min(self.__max_workers, self.__executors.process_workers())
+
+    # ----------------------------------------------------------------------------------------
+    def __get_semaphore(self) -> asyncio.Semaphore:
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.__max_workers)
+        return self.__semaphore
+
+    # ----------------------------------------------------------------------------------------
+    async def run_in_thread(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Run the blocking function in the thread pool, once this share has a worker free.
+        """
+
+        async with self.__get_semaphore():
+            return await self.__executors.run_in_thread(function, *args, **kwargs)
+
+    # ----------------------------------------------------------------------------------------
+    async def run_in_process(self, function: Callable, *args, **kwargs) -> Any:
+        """
+        Run the function in the process pool, or the thread pool, once this share has a worker free.
+        """
+
+        async with self.__get_semaphore():
+            return await self.__executors.run_in_process(function, *args, **kwargs)
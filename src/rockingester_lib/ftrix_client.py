@@ -1,12 +1,29 @@
-from typing import Dict, Optional
+import asyncio
+import concurrent.futures
+import logging
+import sqlite3
+import time
+from typing import Dict, List, Optional, Union
 
 import pytds
 from dls_utilpack.callsign import callsign
+from dls_utilpack.explain import explain2
 from dls_utilpack.require import require
 
 # Crystal plate constants.
 from xchembku_api.crystal_plate_objects.constants import TREENODE_NAMES_TO_THING_TYPES
 
+# Pool of reusable database connections.
+from rockingester_lib.connection_pool import ConnectionPool
+
+# Local copy of the xchem plate records.
+from rockingester_lib.ftrix_mirror import FtrixMirror
+
+# Running statistics of query times.
+from rockingester_lib.latency_recorder import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
 
 class FtrixClient:
     def __init__(self, specification: Dict):
@@ -14,11 +31,156 @@ class FtrixClient:
         s = f"{callsign(self)} specification"
         self.__mssql = require(s, specification, "mssql")
 
+        # Server "sqlite" means the database is a local stand-in file made by ftrix_sqlite.
+        # It is queried with the same SQL as the MSSQL server, only the placeholders differ.
+        self.__is_sqlite = self.__mssql["server"] == "sqlite"
+        self.__placeholder = "?" if self.__is_sqlite else "%s"
+
+        # Settings for the connection pool, see ConnectionPool.
+        self.__pool_specification = specification.get("pool_specification")
+
+        self.__connection_pool: Optional[ConnectionPool] = None
+
+        # Longest to wait for a query, including waiting for a pooled connection.
+        self.__query_timeout_seconds = float(
+            specification.get("query_timeout_seconds", 30.0)
+        )
+
+        # Longest to wait for the login when making a new connection.
+        self.__login_timeout_seconds = float(
+            specification.get("login_timeout_seconds", 15.0)
+        )
+
+        # Threads where the blocking pytds calls are made, so they don't hold up the event loop.
+        self.__thread_pool_executor: Optional[
+            concurrent.futures.ThreadPoolExecutor
+        ] = None
+
+        self.__latency_recorder = LatencyRecorder("ftrix_query")
+
+        # Most barcodes to look up in one query.
+        self.__query_chunk_size = int(specification.get("query_chunk_size", 256))
+
+        # Query text for each number of barcodes, so it is only built once.
+        self.__query_barcodes_sqls: Dict[int, str] = {}
+
+        # Optional local mirror of the xchem plates, consulted before the database.
+        mirror_specification = specification.get("mirror_specification")
+        if mirror_specification is None:
+            mirror_specification = {"enabled": False}
+        self.__mirror: Optional[FtrixMirror] = None
+        if mirror_specification.get("enabled", True):
+            self.__mirror = FtrixMirror()
+
+        # Time between fetches of plates added since the last one.
+        self.__mirror_sync_seconds = float(
+            mirror_specification.get("sync_seconds", 60.0)
+        )
+
+        # Time between fetches of all plates, which picks up changed plates.
+        self.__mirror_full_sync_seconds = float(
+            mirror_specification.get("full_sync_seconds", 86400.0)
+        )
+
+        # Most plates to fetch in one query when syncing.
+        self.__mirror_batch_size = int(mirror_specification.get("batch_size", 5000))
+
+        self.__mirror_sync_future: Optional[asyncio.Future] = None
+
+        # Query text for the plates after an ID, built when first needed.
+        self.__query_plates_after_sql: Optional[str] = None
+
+    # ----------------------------------------------------------------------------------------
+    def latency_recorder(self) -> LatencyRecorder:
+        return self.__latency_recorder
+
+    # ----------------------------------------------------------------------------------------
+    def mirror(self) -> Optional[FtrixMirror]:
+        return self.__mirror
+
+    # ----------------------------------------------------------------------------------------
     async def connect(self):
-        pass
+        """
+        Make the connection pool and the threads to use it, connections are opened when first needed.
+
+        Starts syncing the mirror, if there is one.
+
+        Does nothing if already connected.
+        """
+
+        if self.__connection_pool is None and self.__mssql["server"] != "dummy":
+            self.__connection_pool = ConnectionPool(
+                self.__connect_sqlite if self.__is_sqlite else self.__connect_mssql,
+                self.__pool_specification,
+            )
+            # One thread for each connection the pool can make.
+            self.__thread_pool_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.__connection_pool.max_size(),
+                thread_name_prefix="ftrix_client",
+            )
+
+        if self.__mirror is not None and self.__mirror_sync_future is None:
+            self.__mirror_sync_future = asyncio.get_event_loop().create_task(
+                self.__sync_mirror_periodically()
+            )
 
     async def disconnect(self):
-        pass
+        """
+        Close all the pooled connections.
+
+        Does nothing if not connected.
+        """
+
+        if self.__mirror_sync_future is not None:
+            self.__mirror_sync_future.cancel()
+            try:
+                await self.__mirror_sync_future
+            except asyncio.CancelledError:
+                pass
+            self.__mirror_sync_future = None
+
+        if self.__connection_pool is not None:
+            logger.debug(
+                f"[FTRIX] closing connection pool"
+                f" which made {self.__connection_pool.created_count()} connections,"
+                f" query latency {self.__latency_recorder.report()}"
+            )
+            # Don't wait for queries still running, their connections are closed when they finish.
+            self.__thread_pool_executor.shutdown(wait=False, cancel_futures=True)
+            self.__thread_pool_executor = None
+            self.__connection_pool.close()
+            self.__connection_pool = None
+
+    # ----------------------------------------------------------------------------------------
+    def __connect_mssql(self):
+        """
+        Make a new connection to the RockMaker database, called by the pool.
+        """
+
+        return pytds.connect(
+            self.__mssql["server"],
+            self.__mssql["database"],
+            self.__mssql["username"],
+            self.__mssql["password"],
+            # Socket timeout, so a hung query gives its thread back eventually.
+            timeout=self.__query_timeout_seconds,
+            login_timeout=self.__login_timeout_seconds,
+            autocommit=True,
+        )
+
+    # ----------------------------------------------------------------------------------------
+    def __connect_sqlite(self):
+        """
+        Make a new connection to the SQLite stand-in database, called by the pool.
+        """
+
+        # Opening read-only means a missing file is an error rather than a new empty database.
+        return sqlite3.connect(
+            f"file:{self.__mssql['database']}?mode=ro",
+            uri=True,
+            timeout=self.__login_timeout_seconds,
+            check_same_thread=False,
+        )
 
     # ----------------------------------------------------------------------------------------
     async def query_barcode(self, barcode: str) -> Optional[Dict]:
@@ -26,32 +188,143 @@ class FtrixClient:
         Query the formulatrix database for te plate record with the given barcode.
         """
 
+        records = await self.query_barcodes([barcode])
+
+        return records.get(barcode)
+
+    # ----------------------------------------------------------------------------------------
+    async def query_barcodes(self, barcodes: List[str]) -> Dict[str, Dict]:
+        """
+        Query the formulatrix database for the plate records of many barcodes at once.
+
+        When there is a synced mirror, it is looked in first and only the barcodes missing are queried.
+
+        The time taken by the database query is recorded, see latency_recorder().
+
+        Returns:
+            Dict[str, Dict]: plate record for each barcode found, barcodes not found are left out
+        """
+
+        if self.__mirror is None or not self.__mirror.is_synced():
+            return await self.__query_barcodes_live(barcodes)
+
+        records: Dict[str, Dict] = {}
+        missing_barcodes = []
+        for barcode in barcodes:
+            record = self.__mirror.get(barcode)
+            if record is None:
+                missing_barcodes.append(barcode)
+            else:
+                records[barcode] = record
+
+        # Probably plates added since the last sync.
+        if len(missing_barcodes) > 0:
+            live_records = await self.__query_barcodes_live(missing_barcodes)
+            self.__mirror.put(live_records.values())
+            records.update(live_records)
+
+        return records
+
+    # ----------------------------------------------------------------------------------------
+    async def __query_barcodes_live(self, barcodes: List[str]) -> Dict[str, Dict]:
+        """
+        Query the formulatrix database itself, recording the time taken.
+        """
+
+        if len(barcodes) == 0:
+            return {}
+
         server = self.__mssql["server"]
 
-        if server == "dummy":
-            return await self.query_barcode_dummy(barcode)
-        else:
-            return await self.query_barcode_mssql(barcode)
+        time0 = time.time()
+        try:
+            if server == "dummy":
+                records = await self.query_barcodes_dummy(barcodes)
+            else:
+                records = await self.query_barcodes_mssql(barcodes)
+        except BaseException:
+            self.__latency_recorder.record(time.time() - time0, is_error=True)
+            raise
+
+        self.__latency_recorder.record(time.time() - time0)
+
+        return records
 
     # ----------------------------------------------------------------------------------------
-    async def query_barcode_mssql(self, barcode: str) -> Optional[Dict]:
+    async def query_barcodes_mssql(self, barcodes: List[str]) -> Dict[str, Dict]:
         """
-        Query the MSSQL formulatrix database for te plate record with the given barcode.
+        Query the MSSQL formulatrix database for the plate records with the given barcodes.
+
+        The query runs in the client's own threads.
+        This is also used for the SQLite stand-in.
+
+        Raises:
+            asyncio.TimeoutError: when the query takes longer than query_timeout_seconds
         """
 
-        # Connect to the RockMaker database at every tick.
-        # TODO: Handle failure to connect to RockMaker database.
-        connection = pytds.connect(
-            self.__mssql["server"],
-            self.__mssql["database"],
-            self.__mssql["username"],
-            self.__mssql["password"],
+        return await self.__run_mssql(self.__query_barcodes_mssql_blocking, barcodes)
+
+    # ----------------------------------------------------------------------------------------
+    async def __run_mssql(self, function, *args):
+        """
+        Run a blocking MSSQL function in the client's own threads, with the query timeout.
+        """
+
+        # Allow queries without an explicit connect, as before there was a pool.
+        if self.__connection_pool is None:
+            await self.connect()
+
+        # If this is cancelled or times out, the thread carries on to the end of the query,
+        # but the caller is not kept waiting for it.
+        return await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(
+                self.__thread_pool_executor, function, *args
+            ),
+            timeout=self.__query_timeout_seconds,
         )
 
+    # ----------------------------------------------------------------------------------------
+    async def query_barcode_mssql(self, barcode: str) -> Optional[Dict]:
+        """
+        Query the MSSQL formulatrix database for the plate record with the given barcode.
+        """
+
+        records = await self.query_barcodes_mssql([barcode])
+
+        return records.get(barcode)
+
+    # ----------------------------------------------------------------------------------------
+    def __query_barcodes_sql(self, barcode_count: int) -> str:
+        """
+        The parameterized query for the given number of barcodes, made once and then cached.
+        """
+
+        sql = self.__query_barcodes_sqls.get(barcode_count)
+        if sql is not None:
+            return sql
+
+        barcode_placeholders = ",".join([self.__placeholder] * barcode_count)
+
+        sql = self.__select_plates_sql(f"Plate.Barcode IN ({barcode_placeholders})")
+
+        self.__query_barcodes_sqls[barcode_count] = sql
+
+        return sql
+
+    # ----------------------------------------------------------------------------------------
+    def __select_plates_sql(
+        self, condition: str, top: str = "", order: str = ""
+    ) -> str:
+        """
+        Query text for xchem plates meeting the condition.
+
+        The plate type names are parameters, which come after any in the condition.
+        """
+
         # Select only plate types we care about.
-        treenode_names = [
-            f"'{str(name)}'" for name in list(TREENODE_NAMES_TO_THING_TYPES.keys())
-        ]
+        treenode_placeholders = ",".join(
+            [self.__placeholder] * len(TREENODE_NAMES_TO_THING_TYPES)
+        )
 
         # Plate's treenode is "ExperimentPlate".
         # Parent of ExperimentPlate is "Experiment", aka visit
@@ -59,7 +332,7 @@ class FtrixClient:
         # Parent of Project is "ProjectsFolder", we only care about "XChem"
         # Get all xchem barcodes and the associated experiment name.
         sql = (
-            "SELECT"
+            f"SELECT{top}"
             "\n  Plate.ID AS id,"
             "\n  Plate.Barcode AS barcode,"
             "\n  experiment_node.Name AS experiment,"
@@ -69,47 +342,250 @@ class FtrixClient:
             "\nJOIN TreeNode AS experiment_node ON experiment_node.ID = Experiment.TreeNodeID"
             "\nJOIN TreeNode AS plate_type_node ON plate_type_node.ID = experiment_node.ParentID"
             "\nJOIN TreeNode AS projects_folder_node ON projects_folder_node.ID = plate_type_node.ParentID"
-            f"\nWHERE Plate.Barcode = '{barcode}'"
+            f"\nWHERE {condition}"
             "\n  AND projects_folder_node.Name = 'xchem'"
-            f"\n  AND plate_type_node.Name IN ({',' .join(treenode_names)})"
+            f"\n  AND plate_type_node.Name IN ({treenode_placeholders})"
+            f"{order}"
         )
 
-        cursor = connection.cursor()
-        cursor.execute(sql)
-        rows = cursor.fetchall()
+        return sql
+
+    # ----------------------------------------------------------------------------------------
+    def __query_barcodes_mssql_blocking(self, barcodes: List[str]) -> Dict[str, Dict]:
+        """
+        Blocking query of the MSSQL formulatrix database, run in the client's threads.
+
+        Barcodes are looked up in chunks of at most query_chunk_size.
+        Each chunk is padded to a power of two by repeating its last barcode,
+        so only a few distinct statements are sent and the server can reuse their plans.
+        """
+
+        # Barcodes compare case-insensitively in RockMaker, so match results back that way.
+        requested_barcodes: Dict[str, str] = {}
+        for barcode in barcodes:
+            requested_barcodes.setdefault(barcode.strip().lower(), barcode)
+        unique_barcodes = list(requested_barcodes.values())
+
+        treenode_names = [str(name) for name in TREENODE_NAMES_TO_THING_TYPES.keys()]
+
+        records: Dict[str, Dict] = {}
+
+        connection_pool = self.__connection_pool
+        if connection_pool is None:
+            raise RuntimeError("formulatrix client is not connected")
+
+        # A connection which fails during the query is not put back into the pool.
+        with connection_pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                for index in range(0, len(unique_barcodes), self.__query_chunk_size):
+                    chunk = unique_barcodes[index : index + self.__query_chunk_size]
+
+                    padded_count = 1
+                    while padded_count < len(chunk):
+                        padded_count *= 2
+                    padded_count = min(padded_count, self.__query_chunk_size)
+                    chunk = chunk + [chunk[-1]] * (padded_count - len(chunk))
+
+                    cursor.execute(
+                        self.__query_barcodes_sql(padded_count),
+                        tuple(chunk + treenode_names),
+                    )
+
+                    for row in cursor.fetchall():
+                        barcode = requested_barcodes.get(
+                            str(row[1]).strip().lower(), row[1]
+                        )
+                        # Keep the first if a barcode is somehow on more than one plate.
+                        if barcode not in records:
+                            records[barcode] = {
+                                "formulatrix__plate__id": row[0],
+                                "barcode": row[1],
+                                "formulatrix__experiment__name": row[2],
+                                "plate_type": row[3],
+                            }
+            finally:
+                cursor.close()
+
+        return records
+
+    # ----------------------------------------------------------------------------------------
+    async def __sync_mirror_periodically(self) -> None:
+        """
+        Task which keeps the mirror up to date, until cancelled.
+
+        When the database can't be reached, the mirror carries on being used as it is.
+        """
+
+        # A full sync replaces the mirror's contents, not the mirror itself.
+        mirror = self.__mirror
+        if mirror is None:
+            return
+
+        last_full_sync_time = None
+        while True:
+            now = time.time()
+            is_full = (
+                last_full_sync_time is None
+                or now - last_full_sync_time >= self.__mirror_full_sync_seconds
+            )
+
+            try:
+                count = await self.sync_mirror(is_full=is_full)
+                if is_full:
+                    last_full_sync_time = now
+                logger.debug(
+                    f"[FTRIX] {'full' if is_full else 'incremental'} mirror sync fetched {count} plates"
+                    f" in {'%0.3f' % (time.time() - now)} seconds,"
+                    f" mirror now has {len(mirror)} up to id {mirror.high_water_id()}"
+                )
+            except Exception as exception:
+                logger.warning(explain2(exception, "syncing formulatrix mirror"))
+
+            await asyncio.sleep(self.__mirror_sync_seconds)
+
+    # ----------------------------------------------------------------------------------------
+    async def sync_mirror(self, is_full: bool = False) -> int:
+        """
+        Fetch plates added since the mirror's high-water mark, or all plates if is_full.
+
+        A full sync builds a new mirror and then swaps it in, so lookups carry on meanwhile.
+
+        Returns:
+            int: number of plates fetched
+        """
+
+        if self.__mirror is None:
+            return 0
 
-        if len(rows) == 0:
-            return None
+        mirror = FtrixMirror() if is_full else self.__mirror
+
+        count = 0
+        while True:
+            records = await self.query_plates_after(
+                mirror.high_water_id(), self.__mirror_batch_size
+            )
+            mirror.put(records, is_sync=True)
+            count += len(records)
+            if len(records) < self.__mirror_batch_size:
+                break
+
+        if is_full:
+            self.__mirror.replace(mirror)
+        self.__mirror.mark_synced()
+
+        return count
+
+    # ----------------------------------------------------------------------------------------
+    async def query_plates_after(self, after_id: int, limit: int) -> List[Dict]:
+        """
+        Query the xchem plate records with Plate.ID above after_id, in ID order.
+        """
+
+        if self.__mssql["server"] == "dummy":
+            return await self.query_plates_after_dummy(after_id, limit)
         else:
-            row = rows[0]
-            record = {
+            return await self.__run_mssql(
+                self.__query_plates_after_mssql_blocking, after_id, limit
+            )
+
+    # ----------------------------------------------------------------------------------------
+    def __query_plates_after_mssql_blocking(
+        self, after_id: int, limit: int
+    ) -> List[Dict]:
+        """
+        Blocking query for plates above an ID, run in the client's threads.
+        """
+
+        treenode_names = [str(name) for name in TREENODE_NAMES_TO_THING_TYPES.keys()]
+
+        # SQLite has no TOP, so the limit goes at the end, as does its parameter.
+        parameters: List[Union[int, str]]
+        if self.__is_sqlite:
+            if self.__query_plates_after_sql is None:
+                self.__query_plates_after_sql = self.__select_plates_sql(
+                    "Plate.ID > ?", order="\nORDER BY Plate.ID\nLIMIT ?"
+                )
+            parameters = [after_id, *treenode_names, limit]
+        else:
+            if self.__query_plates_after_sql is None:
+                self.__query_plates_after_sql = self.__select_plates_sql(
+                    "Plate.ID > %s", top=" TOP (%s)", order="\nORDER BY Plate.ID"
+                )
+            parameters = [limit, after_id, *treenode_names]
+
+        connection_pool = self.__connection_pool
+        if connection_pool is None:
+            raise RuntimeError("formulatrix client is not connected")
+
+        with connection_pool.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(self.__query_plates_after_sql, tuple(parameters))
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+
+        return [
+            {
                 "formulatrix__plate__id": row[0],
                 "barcode": row[1],
                 "formulatrix__experiment__name": row[2],
                 "plate_type": row[3],
             }
-            return record
+            for row in rows
+        ]
 
     # ----------------------------------------------------------------------------------------
-    async def query_barcode_dummy(self, barcode: str) -> Optional[Dict]:
+    async def query_plates_after_dummy(self, after_id: int, limit: int) -> List[Dict]:
+        """
+        Query the dummy database for plates above an ID.
+        """
+
+        database = self.__mssql["database"]
+        rows = sorted(self.__mssql[database], key=lambda row: int(row[0]))
+
+        return [
+            {
+                "formulatrix__plate__id": row[0],
+                "barcode": row[1],
+                "formulatrix__experiment__name": row[2],
+                "plate_type": row[3],
+            }
+            for row in rows
+            if int(row[0]) > after_id
+        ][:limit]
+
+    # ----------------------------------------------------------------------------------------
+    async def query_barcodes_dummy(self, barcodes: List[str]) -> Dict[str, Dict]:
         """
-        Query the dummy database for te plate record with the given barcode.
+        Query the dummy database for the plate records with the given barcodes.
         """
 
         database = self.__mssql["database"]
         rows = self.__mssql[database]
 
+        records: Dict[str, Dict] = {}
         for row in rows:
-            if row[1] == barcode:
-                record = {
+            if row[1] in barcodes and row[1] not in records:
+                records[row[1]] = {
                     "formulatrix__plate__id": row[0],
                     "barcode": row[1],
                     "formulatrix__experiment__name": row[2],
                     "plate_type": row[3],
                 }
-                return record
 
-        return None
+        return records
+
+    # ----------------------------------------------------------------------------------------
+    async def query_barcode_dummy(self, barcode: str) -> Optional[Dict]:
+        """
+        Query the dummy database for the plate record with the given barcode.
+        """
+
+        records = await self.query_barcodes_dummy([barcode])
+
+        return records.get(barcode)
 
 
 class FtrixClientContext:
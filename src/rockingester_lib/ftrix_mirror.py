@@ -0,0 +1,95 @@
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FtrixMirror:
+    """
+    Local copy of the xchem plate records from the Formulatrix database, keyed by barcode.
+
+    Records are the same dicts as FtrixClient.query_barcodes returns.
+    The highest Plate.ID seen is kept, so the mirror can be brought up to date
+    by asking only for plates added since.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self):
+        self.__records: Dict[str, Dict] = {}
+        self.__high_water_id = 0
+
+        # Whether a sync has ever finished, before which the mirror can't be trusted.
+        self.__is_synced = False
+
+        self.__hit_count = 0
+        self.__miss_count = 0
+
+        # Records may be added from executor threads.
+        self.__lock = threading.Lock()
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    # ----------------------------------------------------------------------------------------
+    def high_water_id(self) -> int:
+        return self.__high_water_id
+
+    # ----------------------------------------------------------------------------------------
+    def is_synced(self) -> bool:
+        return self.__is_synced
+
+    # ----------------------------------------------------------------------------------------
+    def hit_count(self) -> int:
+        return self.__hit_count
+
+    # ----------------------------------------------------------------------------------------
+    def miss_count(self) -> int:
+        return self.__miss_count
+
+    # ----------------------------------------------------------------------------------------
+    def get(self, barcode: str) -> Optional[Dict]:
+        """
+        The record for the barcode, or None if it isn't in the mirror.
+        """
+
+        record = self.__records.get(barcode.strip().lower())
+
+        if record is None:
+            self.__miss_count += 1
+        else:
+            self.__hit_count += 1
+
+        return record
+
+    # ----------------------------------------------------------------------------------------
+    def put(self, records: Iterable[Dict], is_sync: bool = False) -> None:
+        """
+        Add or replace records.
+
+        Only records from a sync move the high-water mark,
+        since records from a live lookup may be ahead of plates not yet synced.
+        """
+
+        with self.__lock:
+            for record in records:
+                self.__records[str(record["barcode"]).strip().lower()] = record
+                if is_sync:
+                    self.__high_water_id = max(
+                        self.__high_water_id, int(record["formulatrix__plate__id"])
+                    )
+
+    # ----------------------------------------------------------------------------------------
+    def replace(self, mirror: "FtrixMirror") -> None:
+        """
+        Take over the records of another mirror, such as one made by a full sync.
+        """
+
+        with self.__lock:
+            self.__records = mirror.__records
+            self.__high_water_id = mirror.__high_water_id
+
+    # ----------------------------------------------------------------------------------------
+    def mark_synced(self) -> None:
+        self.__is_synced = True
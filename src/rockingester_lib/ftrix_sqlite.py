@@ -0,0 +1,173 @@
+import logging
+import random
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Crystal plate constants.
+from xchembku_api.crystal_plate_objects.constants import TREENODE_NAMES_TO_THING_TYPES
+
+logger = logging.getLogger(__name__)
+
+# The parts of the RockMaker schema which the Formulatrix client queries.
+# Names compare case-insensitively, as they do with the collation RockMaker uses on MSSQL.
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS TreeNode ("
+    " ID INTEGER PRIMARY KEY,"
+    " ParentID INTEGER,"
+    " Name TEXT COLLATE NOCASE NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS Experiment ("
+    " ID INTEGER PRIMARY KEY,"
+    " TreeNodeID INTEGER NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS Plate ("
+    " ID INTEGER PRIMARY KEY,"
+    " Barcode TEXT COLLATE NOCASE NOT NULL,"
+    " ExperimentID INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS Plate_Barcode ON Plate (Barcode)",
+]
+
+# Characters RockMaker barcodes are made of.
+BARCODE_CHARACTERS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+# ------------------------------------------------------------------------------------------
+def create_schema(connection: sqlite3.Connection) -> None:
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.commit()
+
+
+# ------------------------------------------------------------------------------------------
+def _make_barcode(number: int) -> str:
+    characters = []
+    for _ in range(4):
+        number, index = divmod(number, len(BARCODE_CHARACTERS))
+        characters.append(BARCODE_CHARACTERS[index])
+    return "".join(reversed(characters))
+
+
+# ------------------------------------------------------------------------------------------
+def generate(
+    filename: str,
+    plate_count: int,
+    seed: int = 0,
+    plates_per_experiment: int = 20,
+    xchem_fraction: float = 0.9,
+) -> Dict:
+    """
+    Blocking fill of a new SQLite stand-in for the Formulatrix database with made-up plates.
+
+    Most plates are in the XChem projects folder, split between the plate types
+    the client looks for, and the rest are in another folder or of another plate type,
+    so the query's joins and filters have something to throw away.
+
+    Args:
+        filename: the SQLite file, which must not already exist
+        plate_count: how many plates to make, at most 36**4 since barcodes are 4 characters
+        seed: for the random barcodes, so the same arguments always make the same database
+        plates_per_experiment: how many plates share each experiment, aka visit
+        xchem_fraction: fraction of experiments which are under XChem with a known plate type
+
+    Returns:
+        Dict: summary of what was made, including the barcodes of the plates the client can find
+    """
+
+    if Path(filename).exists():
+        raise RuntimeError(f"formulatrix stand-in {filename} already exists")
+
+    if plate_count > len(BARCODE_CHARACTERS) ** 4:
+        raise RuntimeError(f"too many plates {plate_count} for 4-character barcodes")
+
+    time0 = time.time()
+
+    Path(filename).parent.mkdir(parents=True, exist_ok=True)
+
+    randomizer = random.Random(seed)
+
+    connection = sqlite3.connect(filename)
+    try:
+        # Nothing else uses the file while it's being made, so don't wait for the disk.
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+
+        create_schema(connection)
+
+        # Folders, and under each a project node for each plate type.
+        treenodes: List[Tuple[int, Optional[int], str]] = []
+        project_ids = {}
+        next_id = 1
+        for folder_name in ["XChem", "OtherProjects"]:
+            folder_id = next_id
+            treenodes.append((folder_id, None, folder_name))
+            next_id += 1
+            for plate_type in list(TREENODE_NAMES_TO_THING_TYPES.keys()) + [
+                "MRC_2drop"
+            ]:
+                project_ids[(folder_name, plate_type)] = next_id
+                treenodes.append((next_id, folder_id, plate_type))
+                next_id += 1
+
+        xchem_projects = [
+            project_ids[("XChem", plate_type)]
+            for plate_type in TREENODE_NAMES_TO_THING_TYPES.keys()
+        ]
+        other_projects = [
+            project_id
+            for project_id in project_ids.values()
+            if project_id not in xchem_projects
+        ]
+
+        # Experiment nodes, named like the techs name them, from which the visit is parsed.
+        experiment_count = max(1, -(-plate_count // plates_per_experiment))
+        experiments = []
+        xchem_experiment_ids = set()
+        for index in range(experiment_count):
+            experiment_id = index + 1
+            if randomizer.random() < xchem_fraction:
+                parent_id = xchem_projects[index % len(xchem_projects)]
+                xchem_experiment_ids.add(experiment_id)
+            else:
+                parent_id = other_projects[index % len(other_projects)]
+            name = f"cm{10000 + index // 10}-{index % 10 + 1}_generated"
+            treenodes.append((next_id, parent_id, name))
+            experiments.append((experiment_id, next_id))
+            next_id += 1
+
+        connection.executemany("INSERT INTO TreeNode VALUES (?, ?, ?)", treenodes)
+        connection.executemany("INSERT INTO Experiment VALUES (?, ?)", experiments)
+
+        # Unique barcodes with gaps, increasing with the plate ID as Rockmaker hands them out.
+        numbers = sorted(
+            randomizer.sample(range(len(BARCODE_CHARACTERS) ** 4), plate_count)
+        )
+
+        xchem_barcodes: List[str] = []
+        plates = []
+        for index, number in enumerate(numbers):
+            barcode = _make_barcode(number)
+            experiment_id = index // plates_per_experiment + 1
+            plates.append((index + 1, barcode, experiment_id))
+            if experiment_id in xchem_experiment_ids:
+                xchem_barcodes.append(barcode)
+
+        connection.executemany("INSERT INTO Plate VALUES (?, ?, ?)", plates)
+        connection.commit()
+    finally:
+        connection.close()
+
+    summary: Dict[str, Any] = {
+        "filename": str(filename),
+        "plate_count": plate_count,
+        "experiment_count": experiment_count,
+        "xchem_plate_count": len(xchem_barcodes),
+        "xchem_barcodes": xchem_barcodes,
+        "seconds": time.time() - time0,
+    }
+
+    logger.debug(
+        f"[FTRIX SQLITE] generated {plate_count} plates in {experiment_count} experiments"
+        f" into {filename} in {'%0.3f' % summary['seconds']} seconds"
+    )
+
+    return summary
@@ -0,0 +1,91 @@
+import hashlib
+import logging
+from typing import Dict, Iterable, Optional, Set, Union
+
+logger = logging.getLogger(__name__)
+
+
+class HandledIndexModes:
+    # Keep the plate names themselves.
+    SET = "set"
+    # Keep only a 64-bit hash of each plate name, which is about half the memory.
+    HASHED = "hashed"
+
+
+# ------------------------------------------------------------------------------------------
+def _hash_name(name: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class HandledIndex:
+    """
+    Set of the plate names which have been finished with, with constant-time membership.
+
+    In hashed mode, two different names could in principle share a hash,
+    but with 64 bits that is negligible even over millions of plates.
+    A bloom filter would be smaller still, but its false positives would silently skip new plates.
+
+    Names which are no longer on disk can be dropped with retain() to keep the index bounded.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification: Optional[Dict] = None):
+        """
+        Constructor.
+
+        Args:
+            specification (Optional[Dict]): may contain "mode", either "set" (default) or "hashed".
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__mode = specification.get("mode", HandledIndexModes.SET)
+        if self.__mode not in (HandledIndexModes.SET, HandledIndexModes.HASHED):
+            raise RuntimeError(f"handled index has invalid mode {self.__mode}")
+
+        self.__keys: Set[Union[str, int]] = set()
+
+    # ----------------------------------------------------------------------------------------
+    def __key(self, name: str) -> Union[str, int]:
+        if self.__mode == HandledIndexModes.HASHED:
+            return _hash_name(name)
+        return name
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.__keys)
+
+    # ----------------------------------------------------------------------------------------
+    def __contains__(self, name: str) -> bool:
+        return self.__key(name) in self.__keys
+
+    # ----------------------------------------------------------------------------------------
+    def add(self, name: str) -> None:
+        self.__keys.add(self.__key(name))
+
+    # ----------------------------------------------------------------------------------------
+    def update(self, names: Iterable[str]) -> None:
+        self.__keys.update(self.__key(name) for name in names)
+
+    # ----------------------------------------------------------------------------------------
+    def discard(self, name: str) -> None:
+        self.__keys.discard(self.__key(name))
+
+    # ----------------------------------------------------------------------------------------
+    def retain(self, names: Iterable[str]) -> int:
+        """
+        Drop everything except the given names, typically those still on disk.
+
+        Returns:
+            int: how many entries were dropped
+        """
+
+        keys = {self.__key(name) for name in names}
+
+        count = len(self.__keys)
+        self.__keys &= keys
+
+        return count - len(self.__keys)
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import struct
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# JPEG start-of-frame markers, which carry the image dimensions.
+# C4 (DHT), C8 (JPG) and CC (DAC) are in the same range but are not frames.
+JPEG_SOF_MARKERS = {
+    0xC0,
+    0xC1,
+    0xC2,
+    0xC3,
+    0xC5,
+    0xC6,
+    0xC7,
+    0xC9,
+    0xCA,
+    0xCB,
+    0xCD,
+    0xCE,
+    0xCF,
+}
+
+# JPEG markers which have no length field after them.
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7}
+
+# Result of probing one image: width, height and error, where error is None on success.
+ProbeResult = Tuple[Optional[int], Optional[int], Optional[str]]
+
+
+# ------------------------------------------------------------------------------------------
+def probe_image_size(filename: Union[str, Path]) -> Tuple[int, int]:
+    """
+    Get the width and height of an image, reading only the header bytes of JPEG and PNG files.
+
+    Other formats are handed to PIL.
+
+    Raises:
+        Exception: when the file cannot be opened or is not a recognizable image.
+    """
+
+    with open(filename, "rb") as stream:
+        head = stream.read(24)
+
+        if head.startswith(PNG_SIGNATURE):
+            size = _png_size(head)
+            if size is not None:
+                return size
+
+        elif head.startswith(b"\xff\xd8"):
+            stream.seek(2)
+            size = _jpeg_size(stream)
+            if size is not None:
+                return size
+
+    # Not a format we can read quickly, or a header we did not understand.
+    from PIL import Image
+
+    with Image.open(filename) as image:
+        width, height = image.size
+
+    return width, height
+
+
+# ------------------------------------------------------------------------------------------
+def probe_image_sizes(filenames: List[Union[str, Path]]) -> List[ProbeResult]:
+    """
+    Probe each image in turn, returning the error as a string instead of raising.
+
+    This is module level so it can be given to a process pool.
+    """
+
+    results: List[ProbeResult] = []
+    for filename in filenames:
+        try:
+            width, height = probe_image_size(filename)
+            results.append((width, height, None))
+        except Exception as exception:
+            results.append((None, None, str(exception)))
+
+    return results
+
+
+# ------------------------------------------------------------------------------------------
+async def probe_image_sizes_parallel(
+    executors,
+    filenames: List[Union[str, Path]],
+) -> List[ProbeResult]:
+    """
+    Probe a batch of images, such as a whole plate, in parallel.
+
+    The batch is split into one chunk per worker so that each worker call does many files.
+
+    Args:
+        executors (Executors): pools in which to run the probing
+        filenames (List): images to be probed
+
+    Returns:
+        List[ProbeResult]: results in the same order as the filenames
+    """
+
+    if len(filenames) == 0:
+        return []
+
+    worker_count = executors.process_workers()
+    if worker_count <= 0:
+        worker_count = executors.thread_workers()
+    chunk_count = max(1, min(worker_count, len(filenames)))
+    chunk_size = (len(filenames) + chunk_count - 1) // chunk_count
+
+    chunks = [
+        filenames[index : index + chunk_size]
+        for index in range(0, len(filenames), chunk_size)
+    ]
+
+    chunk_results = await asyncio.gather(
+        *[executors.run_in_process(probe_image_sizes, chunk) for chunk in chunks]
+    )
+
+    results: List[ProbeResult] = []
+    for chunk_result in chunk_results:
+        results.extend(chunk_result)
+
+    return results
+
+
+# ------------------------------------------------------------------------------------------
+def _png_size(head: bytes) -> Optional[Tuple[int, int]]:
+    """
+    The IHDR chunk must come first, right after the signature.
+    """
+
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+
+    width, height = struct.unpack(">II", head[16:24])
+
+    return width, height
+
+
+# ------------------------------------------------------------------------------------------
+def _jpeg_size(stream: BinaryIO) -> Optional[Tuple[int, int]]:
+    """
+    Walk the JPEG markers, skipping segment bodies, until a start-of-frame.
+
+    The stream is positioned just after the SOI marker.
+    """
+
+    while True:
+        byte = stream.read(1)
+        if len(byte) == 0:
+            return None
+        if byte != b"\xff":
+            # Not at a marker, so this isn't a JPEG layout we understand.
+            return None
+
+        # Markers may be padded with any number of 0xFF fill bytes.
+        marker = stream.read(1)
+        while marker == b"\xff":
+            marker = stream.read(1)
+        if len(marker) == 0:
+            return None
+
+        code = marker[0]
+
+        if code in JPEG_STANDALONE_MARKERS:
+            continue
+
+        # Reached end of image or start of scan without seeing a frame.
+        if code in (0xD9, 0xDA):
+            return None
+
+        length_bytes = stream.read(2)
+        if len(length_bytes) != 2:
+            return None
+        (length,) = struct.unpack(">H", length_bytes)
+        if length < 2:
+            return None
+
+        if code in JPEG_SOF_MARKERS:
+            frame = stream.read(5)
+            if len(frame) != 5:
+                return None
+            _, height, width = struct.unpack(">BHH", frame)
+            # Height can be deferred to a DNL segment, leave that to PIL.
+            if height == 0:
+                return None
+            return width, height
+
+        stream.seek(length - 2, 1)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Letters of the well rows on a 96-well plate.
+WELL_LETTERS = "ABCDEFGH"
+
+# Number of wells on the plates the simulator makes.
+WELL_COUNT = 96
+
+# Subwells in each well of the plate types the simulator can make,
+# keyed by the name which ends the plate directory names.
+PLATE_TYPES = {
+    "3drop": 3,
+    "2drop": 2,
+    "1drop": 1,
+}
+
+
+# ------------------------------------------------------------------------------------------
+def make_jpeg_bytes(width: int, height: int, size: int) -> bytes:
+    """
+    Make a file which looks like a JPEG of the given dimensions to anything reading its header.
+
+    The header is followed by comment segments padding the file out to about size bytes,
+    so copying it costs about what copying a real image would.
+    """
+
+    # Start of image, then a baseline frame header giving the dimensions of 3 components.
+    data = bytearray(b"\xff\xd8")
+    data += b"\xff\xc0" + struct.pack(">HBHHB", 17, 8, height, width, 3)
+    data += b"\x01\x22\x00\x02\x11\x01\x03\x11\x01"
+
+    # Comment segments, each at most 65533 bytes of content.
+    while size - len(data) - 4 >= 2:
+        length = min(65535, size - len(data) - 4)
+        data += b"\xff\xfe" + struct.pack(">H", length) + b"\x00" * (length - 2)
+
+    # End of image.
+    data += b"\xff\xd9"
+
+    return bytes(data)
+
+
+# ------------------------------------------------------------------------------------------
+def subwell_filename(barcode: str, index: int, subwell_count: int = 3) -> str:
+    """
+    The name Rockmaker gives the image of a subwell, by index from 0 up to the number of subwells on the plate.
+
+    The default of 3 subwells in each well is a swiss3 plate, with indices 0 to 287.
+    """
+
+    well = index // subwell_count
+    subwell = index % subwell_count + 1
+    row = WELL_LETTERS[well // 12]
+    col = "%02d" % (well % 12 + 1)
+
+    return f"{barcode}_{col}{row}_{subwell}.jpg"
+
+
+class ImagerSimulator:
+    """
+    Pretends to be a Rockmaker imager, writing plate directories of images into a plates directory.
+
+    Plates are started at a steady rate, and each plate's images are written one after the other,
+    optionally with a pause between them as a real imager takes time to move between wells.
+
+    The plates take their types in turn from the configured plate types, see PLATE_TYPES.
+
+    The time each plate's last image was written is kept, to measure ingest latency against.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification: Dict):
+        """
+        Constructor.
+
+        Args:
+            specification (Dict): contains
+                "plates_directory", where to make the plate directories,
+                "barcodes", one plate is made for each,
+                and may contain
+                "plates_per_minute" (default 6), how often a plate is started,
+                "plate_types" (default ["3drop"]), plate types to make, in turn,
+                "image_count" (default a full plate), images per plate, at most a full plate,
+                "image_width" and "image_height" (default 1024), dimensions in the image headers,
+                "image_bytes" (default 65536), size of each image file,
+                "image_interval_seconds" (default 0), pause between images of a plate.
+        """
+
+        self.__plates_directory = Path(specification["plates_directory"])
+        self.__barcodes: List[str] = list(specification["barcodes"])
+        self.__plates_per_minute = float(specification.get("plates_per_minute", 6.0))
+
+        self.__plate_types: List[str] = list(
+            specification.get("plate_types", ["3drop"])
+        )
+        if len(self.__plate_types) == 0:
+            raise RuntimeError("imager simulator plate_types is empty")
+        for plate_type in self.__plate_types:
+            if plate_type not in PLATE_TYPES:
+                raise RuntimeError(
+                    f"imager simulator plate type {plate_type} is not one of {list(PLATE_TYPES)}"
+                )
+
+        image_count = specification.get("image_count")
+        self.__image_count: Optional[int] = (
+            None if image_count is None else int(image_count)
+        )
+        self.__image_interval_seconds = float(
+            specification.get("image_interval_seconds", 0.0)
+        )
+
+        self.__image_bytes = make_jpeg_bytes(
+            int(specification.get("image_width", 1024)),
+            int(specification.get("image_height", 1024)),
+            int(specification.get("image_bytes", 65536)),
+        )
+
+        # Time each plate directory finished being written, keyed by its name.
+        self.__plate_arrival_times: Dict[str, float] = {}
+
+    # ----------------------------------------------------------------------------------------
+    def plate_names(self) -> List[str]:
+        """
+        The names of the plate directories the simulator makes, in the order it makes them.
+        """
+
+        return [
+            self.__plate_name(barcode, index)
+            for index, barcode in enumerate(self.__barcodes)
+        ]
+
+    # ----------------------------------------------------------------------------------------
+    def plate_arrival_times(self) -> Dict[str, float]:
+        """
+        The time the last image of each finished plate was written, keyed by plate directory name.
+        """
+
+        return dict(self.__plate_arrival_times)
+
+    # ----------------------------------------------------------------------------------------
+    def image_counts(self) -> Dict[str, int]:
+        """
+        The number of images the simulator writes in each plate directory, keyed by its name.
+        """
+
+        return {
+            self.__plate_name(barcode, index): self.__plate_image_count(index)
+            for index, barcode in enumerate(self.__barcodes)
+        }
+
+    # ----------------------------------------------------------------------------------------
+    def image_bytes(self) -> int:
+        return len(self.__image_bytes)
+
+    # ----------------------------------------------------------------------------------------
+    def __plate_type(self, index: int) -> str:
+        return self.__plate_types[index % len(self.__plate_types)]
+
+    # ----------------------------------------------------------------------------------------
+    def __plate_name(self, barcode: str, index: int) -> str:
+        return f"{barcode}_2023-04-06_RI1000-0276-{self.__plate_type(index)}"
+
+    # ----------------------------------------------------------------------------------------
+    def __plate_image_count(self, index: int) -> int:
+        full_count = WELL_COUNT * PLATE_TYPES[self.__plate_type(index)]
+        if self.__image_count is None:
+            return full_count
+        return min(self.__image_count, full_count)
+
+    # ----------------------------------------------------------------------------------------
+    async def run(self) -> None:
+        """
+        Write all the plates, returning when the last one is finished.
+        """
+
+        self.__plates_directory.mkdir(parents=True, exist_ok=True)
+
+        interval = 60.0 / self.__plates_per_minute
+        time0 = time.time()
+
+        tasks = []
+        for index, barcode in enumerate(self.__barcodes):
+            # Keep to the rate, even if writing a plate takes longer than the interval.
+            delay = time0 + index * interval - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            tasks.append(asyncio.create_task(self.__write_plate(barcode, index)))
+
+        await asyncio.gather(*tasks)
+
+    # ----------------------------------------------------------------------------------------
+    async def __write_plate(self, barcode: str, plate_index: int) -> None:
+        plate_name = self.__plate_name(barcode, plate_index)
+        plate_directory = self.__plates_directory / plate_name
+        subwell_count = PLATE_TYPES[self.__plate_type(plate_index)]
+        image_count = self.__plate_image_count(plate_index)
+
+        if self.__image_interval_seconds <= 0:
+            await asyncio.to_thread(
+                self.__write_images,
+                plate_directory,
+                barcode,
+                subwell_count,
+                0,
+                image_count,
+            )
+        else:
+            for index in range(image_count):
+                await asyncio.to_thread(
+                    self.__write_images,
+                    plate_directory,
+                    barcode,
+                    subwell_count,
+                    index,
+                    index + 1,
+                )
+                await asyncio.sleep(self.__image_interval_seconds)
+
+        self.__plate_arrival_times[plate_name] = time.time()
+
+    # ----------------------------------------------------------------------------------------
+    def __write_images(
+        self,
+        plate_directory: Path,
+        barcode: str,
+        subwell_count: int,
+        first: int,
+        last: int,
+    ) -> None:
+        plate_directory.mkdir(parents=True, exist_ok=True)
+
+        for index in range(first, last):
+            with open(
+                plate_directory / subwell_filename(barcode, index, subwell_count), "wb"
+            ) as stream:
+                stream.write(self.__image_bytes)
@@ -0,0 +1,250 @@
+import asyncio
+import copy
+import logging
+import resource
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+from dls_utilpack.visit import get_xchem_subdirectory
+
+# Things which make the collector.
+from rockingester_lib.collectors.collectors import Collectors
+
+# Object able to talk to the formulatrix database.
+from rockingester_lib.ftrix_client import FtrixClientContext
+
+# Generator of the SQLite stand-in for the Formulatrix database.
+from rockingester_lib.ftrix_sqlite import generate
+
+# Something writing plate directories like a Rockmaker imager does.
+from rockingester_lib.imager_simulator import ImagerSimulator
+
+# Running statistics of how long each plate took to be ingested.
+from rockingester_lib.latency_recorder import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class IngestBenchmark:
+    """
+    Measures how fast a DirectPoll collector ingests plates written by simulated imagers.
+
+    Everything is local and made fresh under a working directory:
+    an SQLite stand-in for Formulatrix, an SQLite xchembku, the visit directories,
+    and one plates directory per imager.
+    The collector runs in this process, so the CPU and memory reported include
+    the imagers' writing, which is small beside the collector's own work.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification: Dict):
+        """
+        Constructor.
+
+        Args:
+            specification (Dict): contains
+                "directory", an empty working directory,
+                and may contain
+                "plate_count" (default 20), plates written by each imager,
+                "imager_count" (default 1), imagers writing at the same time,
+                "timeout_seconds" (default 600), longest to wait for all plates to be ingested,
+                "poll_seconds" (default 0.1), how often to check which plates are ingested,
+                "imager_specification", settings for each ImagerSimulator, other than its
+                    plates directory and barcodes,
+                "collector_settings", added to the DirectPoll collector's type_specific_tbd.
+        """
+
+        self.__directory = Path(specification["directory"])
+        self.__plate_count = int(specification.get("plate_count", 20))
+        self.__imager_count = int(specification.get("imager_count", 1))
+        self.__timeout_seconds = float(specification.get("timeout_seconds", 600.0))
+        self.__poll_seconds = float(specification.get("poll_seconds", 0.1))
+        self.__imager_specification = dict(
+            specification.get("imager_specification", {})
+        )
+        self.__collector_settings = dict(specification.get("collector_settings", {}))
+
+        self.__visits_directory = self.__directory / "visits"
+
+        # Barcodes of the plates the imagers write, found when the stand-in is made.
+        self.__barcodes: List[str] = []
+
+    # ----------------------------------------------------------------------------------------
+    async def run(self) -> Dict:
+        """
+        Run the benchmark.
+
+        Returns:
+            Dict: the measurements, see __report()
+        """
+
+        ftrix_client_specification = await self.__make_ftrix()
+
+        barcodes = self.__barcodes
+        imagers: List[ImagerSimulator] = []
+        plates_directories = []
+        for index in range(self.__imager_count):
+            plates_directory = self.__directory / f"imager{index + 1}" / "SubwellImages"
+            plates_directories.append(str(plates_directory))
+
+            imager_specification = copy.deepcopy(self.__imager_specification)
+            imager_specification["plates_directory"] = str(plates_directory)
+            imager_specification["barcodes"] = barcodes[
+                index * self.__plate_count : (index + 1) * self.__plate_count
+            ]
+            imagers.append(ImagerSimulator(imager_specification))
+
+        collector_specification: Dict[str, Any] = {
+            "type": "rockingester_lib.collectors.direct_poll",
+            "type_specific_tbd": {
+                "plates_directories": plates_directories,
+                "visits_directory": str(self.__visits_directory),
+                "visit_plates_subdirectory": "processing/rockingester",
+                "max_wait_seconds": 60.0,
+                "xchembku_dataface_specification": {
+                    "type": "xchembku_lib.xchembku_datafaces.direct",
+                    "database": {
+                        "type": "dls_normsql.aiosqlite",
+                        "filename": str(self.__directory / "xchembku.sqlite"),
+                        "log_level": "WARNING",
+                    },
+                },
+                "ftrix_client_specification": ftrix_client_specification,
+            },
+        }
+        collector_specification["type_specific_tbd"].update(self.__collector_settings)
+
+        collector = Collectors().build_object(collector_specification)
+
+        usage0 = resource.getrusage(resource.RUSAGE_SELF)
+        time0 = time.time()
+
+        await collector.activate()
+        try:
+            imager_futures = [asyncio.create_task(imager.run()) for imager in imagers]
+
+            ingested_times = await self.__wait_for_ingest(collector, imagers)
+
+            await asyncio.gather(*imager_futures)
+        finally:
+            await collector.deactivate()
+
+        usage1 = resource.getrusage(resource.RUSAGE_SELF)
+
+        return self.__report(imagers, ingested_times, time0, usage0, usage1)
+
+    # ----------------------------------------------------------------------------------------
+    async def __make_ftrix(self) -> Dict:
+        """
+        Make the Formulatrix stand-in, and a visit directory for each plate to be written.
+        """
+
+        filename = str(self.__directory / "ftrix.sqlite")
+
+        # Twice as many plates as needed, since some are not xchem plates.
+        plate_count = self.__plate_count * self.__imager_count
+        summary = await asyncio.to_thread(generate, filename, 2 * plate_count + 100)
+        self.__barcodes = summary["xchem_barcodes"][0:plate_count]
+
+        ftrix_client_specification = {
+            "mssql": {"server": "sqlite", "database": filename},
+        }
+
+        async with FtrixClientContext(ftrix_client_specification) as ftrix_client:
+            records = await ftrix_client.query_barcodes(self.__barcodes)
+
+        for record in records.values():
+            visit_directory = self.__visits_directory / get_xchem_subdirectory(
+                record["formulatrix__experiment__name"]
+            )
+            visit_directory.mkdir(parents=True, exist_ok=True)
+
+        return ftrix_client_specification
+
+    # ----------------------------------------------------------------------------------------
+    async def __wait_for_ingest(
+        self, collector, imagers: List[ImagerSimulator]
+    ) -> Dict[str, float]:
+        """
+        Wait until the collector has finished with every plate, noting when each was finished.
+        """
+
+        plate_names: Set[str] = set()
+        for imager in imagers:
+            plate_names.update(imager.plate_names())
+
+        ingested_times: Dict[str, float] = {}
+
+        time0 = time.time()
+        while len(ingested_times) < len(plate_names):
+            if time.time() - time0 > self.__timeout_seconds:
+                logger.warning(
+                    f"[BENCHMARK] only {len(ingested_times)} out of {len(plate_names)} plates"
+                    f" were ingested within {self.__timeout_seconds} seconds"
+                )
+                break
+
+            await asyncio.sleep(self.__poll_seconds)
+
+            now = time.time()
+            for plate_name in plate_names:
+                if plate_name not in ingested_times and collector.is_handled(
+                    plate_name
+                ):
+                    ingested_times[plate_name] = now
+
+        return ingested_times
+
+    # ----------------------------------------------------------------------------------------
+    def __report(
+        self,
+        imagers: List[ImagerSimulator],
+        ingested_times: Dict[str, float],
+        time0: float,
+        usage0,
+        usage1,
+    ) -> Dict:
+        """
+        Summarize the measurements.
+        """
+
+        latency_recorder = LatencyRecorder("arrival_to_ingest")
+        arrival_times: Dict[str, float] = {}
+        image_counts: Dict[str, int] = {}
+        for imager in imagers:
+            arrival_times.update(imager.plate_arrival_times())
+            image_counts.update(imager.image_counts())
+
+        for plate_name, ingested_time in ingested_times.items():
+            arrival_time = arrival_times.get(plate_name)
+            if arrival_time is not None:
+                latency_recorder.record(max(0.0, ingested_time - arrival_time))
+
+        elapsed_seconds = max(ingested_times.values(), default=time.time()) - time0
+        ingested_count = len(ingested_times)
+        ingested_image_count = sum(
+            image_counts.get(plate_name, 0) for plate_name in ingested_times
+        )
+
+        latency = latency_recorder.report()
+
+        return {
+            "plate_count": self.__plate_count * self.__imager_count,
+            "imager_count": self.__imager_count,
+            "ingested_count": ingested_count,
+            "elapsed_seconds": elapsed_seconds,
+            "plates_per_minute": 60.0 * ingested_count / elapsed_seconds
+            if elapsed_seconds > 0
+            else None,
+            "images_per_second": ingested_image_count / elapsed_seconds
+            if elapsed_seconds > 0
+            else None,
+            "latency_p50_seconds": latency["p50_seconds"],
+            "latency_p95_seconds": latency["p95_seconds"],
+            "latency_max_seconds": latency["max_seconds"],
+            "cpu_user_seconds": usage1.ru_utime - usage0.ru_utime,
+            "cpu_system_seconds": usage1.ru_stime - usage0.ru_stime,
+            # On Linux the peak resident size is given in kilobytes.
+            "peak_rss_megabytes": usage1.ru_maxrss / 1024.0,
+        }
@@ -0,0 +1,262 @@
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JournalStates:
+    # Plate directory has been found.
+    SEEN = "seen"
+    # Still waiting for more images to arrive.
+    WAITING = "waiting"
+    # Well records have been upserted into xchembku.
+    UPSERTED = "upserted"
+    # The barcode is not in Formulatrix yet, so it will be looked up again.
+    NOT_FOUND = "not_found"
+    # Images have been copied to the visit, so the plate is finished.
+    COPIED = "copied"
+    # The plate can't be ingested, for example its barcode has a bad visit.
+    ERROR = "error"
+
+
+# States in which there is nothing more to do for a plate.
+FINAL_STATES = (JournalStates.COPIED, JournalStates.ERROR)
+
+
+class IngestJournal:
+    """
+    Local on-disk record of the ingestion state of each plate directory.
+
+    The whole journal is read when opened, so a restarted collector
+    knows which plates are finished without asking xchembku or looking at the visits.
+    Only the states of unfinished plates are then kept in memory.
+
+    The journal is an sqlite table keyed by plate directory name,
+    plus a table of the scanning cursor of each plates directory,
+    and a table of the checksum of each image copied to the visit, when checksums are on.
+    When no filename is given, states are kept in memory only and checksums are not kept.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, filename: Optional[str] = None):
+        self.__filename = filename
+
+        self.__connection: Optional[sqlite3.Connection] = None
+
+        # The latest state of each unfinished plate, so unchanged states are not written again.
+        self.__states: Dict[str, str] = {}
+
+        # The plate name below which all plates are handled, for each plates directory.
+        self.__cursors: Dict[str, str] = {}
+
+        # Records may be written from several executor threads.
+        self.__lock = threading.Lock()
+
+    # ----------------------------------------------------------------------------------------
+    def open(self) -> Dict[str, str]:
+        """
+        Blocking open of the journal, creating it if needed, and loading all plate states.
+
+        Returns:
+            Dict[str, str]: state of each plate directory name in the journal
+        """
+
+        with self.__lock:
+            self.__states = {}
+            self.__cursors = {}
+
+            if self.__filename is None:
+                return dict(self.__states)
+
+            Path(self.__filename).parent.mkdir(parents=True, exist_ok=True)
+
+            time0 = time.time()
+
+            self.__connection = sqlite3.connect(
+                self.__filename, check_same_thread=False
+            )
+            # Writes are one small row at a time, so don't sync each one to disk.
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("PRAGMA synchronous=NORMAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS plates ("
+                " plate_name TEXT PRIMARY KEY,"
+                " state TEXT NOT NULL,"
+                " error TEXT,"
+                " updated_on REAL NOT NULL)"
+            )
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS cursors ("
+                " plates_directory TEXT PRIMARY KEY,"
+                " cursor TEXT NOT NULL)"
+            )
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS checksums ("
+                " plate_name TEXT NOT NULL,"
+                " filename TEXT NOT NULL,"
+                " byte_count INTEGER NOT NULL,"
+                " algorithm TEXT NOT NULL,"
+                " digest TEXT NOT NULL,"
+                " PRIMARY KEY (plate_name, filename))"
+            )
+            self.__connection.commit()
+
+            self.__cursors = dict(
+                self.__connection.execute(
+                    "SELECT plates_directory, cursor FROM cursors"
+                )
+            )
+
+            plate_states = dict(
+                self.__connection.execute("SELECT plate_name, state FROM plates")
+            )
+
+            for plate_name, state in plate_states.items():
+                if state not in FINAL_STATES:
+                    self.__states[plate_name] = state
+
+            logger.debug(
+                f"[JOURNAL] loaded {len(plate_states)} plate states from {self.__filename}"
+                f" in {'%0.3f' % (time.time() - time0)} seconds"
+            )
+
+            return plate_states
+
+    # ----------------------------------------------------------------------------------------
+    def close(self) -> None:
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+    # ----------------------------------------------------------------------------------------
+    def state(self, plate_name: str) -> Optional[str]:
+        """
+        The state of an unfinished plate, or None if finished or never recorded.
+        """
+
+        return self.__states.get(plate_name)
+
+    # ----------------------------------------------------------------------------------------
+    def cursor(self, plates_directory: str) -> Optional[str]:
+        """
+        The cursor recorded for the plates directory, or None if there isn't one.
+        """
+
+        return self.__cursors.get(plates_directory)
+
+    # ----------------------------------------------------------------------------------------
+    def record_cursor(self, plates_directory: str, cursor: str) -> None:
+        """
+        Blocking record of the cursor for a plates directory.
+        """
+
+        with self.__lock:
+            if self.__cursors.get(plates_directory) == cursor:
+                return
+
+            self.__cursors[plates_directory] = cursor
+
+            if self.__connection is not None:
+                self.__connection.execute(
+                    "INSERT OR REPLACE INTO cursors (plates_directory, cursor)"
+                    " VALUES (?, ?)",
+                    (plates_directory, cursor),
+                )
+                self.__connection.commit()
+
+    # ----------------------------------------------------------------------------------------
+    def record(self, plate_name: str, state: str, error: Optional[str] = None) -> bool:
+        """
+        Blocking record of a plate's state, if it has changed.
+
+        Returns:
+            bool: True if the state changed
+        """
+
+        with self.__lock:
+            if self.__states.get(plate_name) == state:
+                return False
+
+            # Finished plates are never recorded again, so don't keep them in memory.
+            if state in FINAL_STATES:
+                self.__states.pop(plate_name, None)
+            else:
+                self.__states[plate_name] = state
+
+            if self.__connection is not None:
+                self.__connection.execute(
+                    "INSERT OR REPLACE INTO plates (plate_name, state, error, updated_on)"
+                    " VALUES (?, ?, ?, ?)",
+                    (plate_name, state, error, time.time()),
+                )
+                self.__connection.commit()
+
+            return True
+
+    # ----------------------------------------------------------------------------------------
+    def record_checksums(self, plate_name: str, checksums: Dict[str, Dict]) -> None:
+        """
+        Blocking record of the checksums of a plate's copied images, in one transaction.
+
+        Args:
+            checksums (Dict[str, Dict]): byte_count, algorithm and digest of each image,
+                keyed by its filename in the plate directory, as reported by the plate copier
+        """
+
+        if len(checksums) == 0:
+            return
+
+        with self.__lock:
+            if self.__connection is None:
+                return
+
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO checksums"
+                " (plate_name, filename, byte_count, algorithm, digest)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        plate_name,
+                        filename,
+                        checksum["byte_count"],
+                        checksum["algorithm"],
+                        checksum["digest"],
+                    )
+                    for filename, checksum in checksums.items()
+                ],
+            )
+            self.__connection.commit()
+
+    # ----------------------------------------------------------------------------------------
+    def checksums(self, plate_name: str) -> Dict[str, Dict]:
+        """
+        Blocking read of the checksums recorded for a plate's images.
+
+        Returns:
+            Dict[str, Dict]: byte_count, algorithm and digest of each image keyed by filename,
+                empty if none are recorded or the journal is only in memory
+        """
+
+        with self.__lock:
+            if self.__connection is None:
+                return {}
+
+            rows = self.__connection.execute(
+                "SELECT filename, byte_count, algorithm, digest FROM checksums"
+                " WHERE plate_name = ? ORDER BY filename",
+                (plate_name,),
+            ).fetchall()
+
+        return {
+            filename: {
+                "byte_count": byte_count,
+                "algorithm": algorithm,
+                "digest": digest,
+            }
+            for filename, byte_count, algorithm, digest in rows
+        }
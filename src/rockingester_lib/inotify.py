@@ -0,0 +1,134 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Event masks from <sys/inotify.h>.
+IN_ACCESS = 0x00000001
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_CLOSE_NOWRITE = 0x00000010
+IN_OPEN = 0x00000020
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_UNMOUNT = 0x00002000
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# Each event is a struct inotify_event: int wd, uint32 mask, uint32 cookie, uint32 len, char name[len].
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal wrapper around the Linux inotify system calls using ctypes.
+
+    The file descriptor is non-blocking, so it can be registered with an asyncio loop's add_reader.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise RuntimeError("unable to find the C library needed for inotify")
+
+        self.__libc = ctypes.CDLL(libc_name, use_errno=True)
+
+        if not hasattr(self.__libc, "inotify_init1"):
+            raise RuntimeError(f"the C library {libc_name} does not provide inotify")
+
+        self.__libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.__libc.inotify_init1.restype = ctypes.c_int
+        self.__libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self.__libc.inotify_add_watch.restype = ctypes.c_int
+        self.__libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.__libc.inotify_rm_watch.restype = ctypes.c_int
+
+        self.__fd = self.__libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.__fd < 0:
+            self.__raise_errno("inotify_init1")
+
+    # ----------------------------------------------------------------------------------------
+    def fileno(self) -> int:
+        return self.__fd
+
+    # ----------------------------------------------------------------------------------------
+    def add_watch(self, path: str, mask: int) -> int:
+        """
+        Watch the path for the events in the mask.
+
+        Returns:
+            int: the watch descriptor, which is the same if the path is already watched
+        """
+
+        wd = self.__libc.inotify_add_watch(self.__fd, os.fsencode(str(path)), mask)
+        if wd < 0:
+            self.__raise_errno(f"inotify_add_watch {path}")
+
+        return wd
+
+    # ----------------------------------------------------------------------------------------
+    def remove_watch(self, wd: int) -> None:
+        """
+        Stop watching, ignoring the error when the watch was already removed by the kernel.
+        """
+
+        if self.__libc.inotify_rm_watch(self.__fd, wd) < 0:
+            errno = ctypes.get_errno()
+            if errno != 22:  # EINVAL
+                self.__raise_errno(f"inotify_rm_watch {wd}")
+
+    # ----------------------------------------------------------------------------------------
+    def read_events(self) -> List[Tuple[int, int, int, str]]:
+        """
+        Read all events which are currently available, without blocking.
+
+        Returns:
+            List[Tuple[int, int, int, str]]: tuples of (wd, mask, cookie, name)
+        """
+
+        events = []
+        while True:
+            try:
+                buffer = os.read(self.__fd, 65536)
+            except BlockingIOError:
+                break
+
+            if len(buffer) == 0:
+                break
+
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(buffer, offset)
+                offset += _EVENT_HEADER.size
+                name = buffer[offset : offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, cookie, os.fsdecode(name)))
+
+        return events
+
+    # ----------------------------------------------------------------------------------------
+    def close(self) -> None:
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    # ----------------------------------------------------------------------------------------
+    def __raise_errno(self, what: str) -> None:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{what}: {os.strerror(errno)}")
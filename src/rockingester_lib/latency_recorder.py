@@ -0,0 +1,82 @@
+import collections
+import logging
+import threading
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyRecorder:
+    """
+    Keeps running statistics of how long some operation takes.
+
+    Counts and totals cover every sample, percentiles cover the most recent samples only.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, name: str, recent_count: int = 1000):
+        self.__name = name
+
+        self.__count = 0
+        self.__error_count = 0
+        self.__total_seconds = 0.0
+        self.__max_seconds: Optional[float] = None
+
+        self.__recent: Deque[float] = collections.deque(maxlen=recent_count)
+
+        # Samples may be recorded from executor threads.
+        self.__lock = threading.Lock()
+
+    # ----------------------------------------------------------------------------------------
+    def name(self) -> str:
+        return self.__name
+
+    # ----------------------------------------------------------------------------------------
+    def record(self, seconds: float, is_error: bool = False) -> None:
+        with self.__lock:
+            self.__count += 1
+            if is_error:
+                self.__error_count += 1
+            self.__total_seconds += seconds
+            if self.__max_seconds is None or seconds > self.__max_seconds:
+                self.__max_seconds = seconds
+            self.__recent.append(seconds)
+
+    # ----------------------------------------------------------------------------------------
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        The given fraction's percentile of the recent samples, or None if there are none.
+        """
+
+        with self.__lock:
+            samples = sorted(self.__recent)
+
+        if len(samples) == 0:
+            return None
+
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+
+        return samples[index]
+
+    # ----------------------------------------------------------------------------------------
+    def report(self) -> Dict:
+        """
+        Summary of the samples, suitable for logging or returning over the network.
+        """
+
+        with self.__lock:
+            count = self.__count
+            error_count = self.__error_count
+            total_seconds = self.__total_seconds
+            max_seconds = self.__max_seconds
+
+        return {
+            "name": self.__name,
+            "count": count,
+            "error_count": error_count,
+            "total_seconds": total_seconds,
+            "mean_seconds": total_seconds / count if count > 0 else None,
+            "max_seconds": max_seconds,
+            "p50_seconds": self.percentile(0.50),
+            "p95_seconds": self.percentile(0.95),
+        }
@@ -0,0 +1,178 @@
+import inspect
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+# Running statistics of how long things take.
+from rockingester_lib.latency_recorder import LatencyRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """
+    Named counters, gauges and latencies, which can be rendered in the Prometheus text format.
+
+    Counters only go up, gauges are set to the latest value,
+    and latencies are LatencyRecorders, rendered as summaries with an error count.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, prefix: str = "rockingester"):
+        self.__prefix = prefix
+
+        self.__counters: Dict[str, float] = {}
+        self.__gauges: Dict[str, float] = {}
+        self.__latency_recorders: Dict[str, LatencyRecorder] = {}
+        self.__helps: Dict[str, str] = {}
+
+        # Counters may be incremented from executor threads.
+        self.__lock = threading.Lock()
+
+    # ----------------------------------------------------------------------------------------
+    def describe(self, name: str, text: str) -> None:
+        """
+        Give the help text shown for a metric.
+        """
+
+        self.__helps[name] = text
+
+    # ----------------------------------------------------------------------------------------
+    def increment(self, name: str, value: float = 1.0) -> None:
+        with self.__lock:
+            self.__counters[name] = self.__counters.get(name, 0.0) + value
+
+    # ----------------------------------------------------------------------------------------
+    def set_gauge(self, name: str, value: float) -> None:
+        self.__gauges[name] = value
+
+    # ----------------------------------------------------------------------------------------
+    def counter(self, name: str) -> float:
+        return self.__counters.get(name, 0.0)
+
+    # ----------------------------------------------------------------------------------------
+    def gauge(self, name: str) -> float:
+        return self.__gauges.get(name, 0.0)
+
+    # ----------------------------------------------------------------------------------------
+    def latency_recorder(self, name: str) -> LatencyRecorder:
+        """
+        The latency recorder of the given name, made if it doesn't exist yet.
+        """
+
+        with self.__lock:
+            latency_recorder = self.__latency_recorders.get(name)
+            if latency_recorder is None:
+                latency_recorder = LatencyRecorder(name)
+                self.__latency_recorders[name] = latency_recorder
+
+        return latency_recorder
+
+    # ----------------------------------------------------------------------------------------
+    def latency_recorder_names(self) -> List[str]:
+        with self.__lock:
+            return sorted(self.__latency_recorders.keys())
+
+    # ----------------------------------------------------------------------------------------
+    def add_latency_recorder(
+        self, name: str, latency_recorder: LatencyRecorder
+    ) -> None:
+        """
+        Include a latency recorder kept by something else, such as the Formulatrix client.
+        """
+
+        self.__latency_recorders[name] = latency_recorder
+
+    # ----------------------------------------------------------------------------------------
+    def render(self) -> str:
+        """
+        All the metrics in the Prometheus text exposition format.
+        """
+
+        lines: List[str] = []
+
+        for name, value in sorted(self.__counters.items()):
+            self.__render_one(lines, f"{name}_total", "counter", name, value)
+
+        for name, value in sorted(self.__gauges.items()):
+            self.__render_one(lines, name, "gauge", name, value)
+
+        for name, latency_recorder in sorted(self.__latency_recorders.items()):
+            report = latency_recorder.report()
+            full_name = f"{self.__prefix}_{name}_seconds"
+
+            text = self.__helps.get(name)
+            if text is not None:
+                lines.append(f"# HELP {full_name} {text}")
+            lines.append(f"# TYPE {full_name} summary")
+            for quantile, key in [("0.5", "p50_seconds"), ("0.95", "p95_seconds")]:
+                if report[key] is not None:
+                    lines.append(
+                        f'{full_name}{{quantile="{quantile}"}} {_format(report[key])}'
+                    )
+            lines.append(f"{full_name}_sum {_format(report['total_seconds'])}")
+            lines.append(f"{full_name}_count {report['count']}")
+
+            self.__render_one(
+                lines,
+                f"{name}_errors_total",
+                "counter",
+                None,
+                report["error_count"],
+            )
+
+        return "\n".join(lines) + "\n"
+
+    # ----------------------------------------------------------------------------------------
+    def __render_one(
+        self, lines: List[str], name: str, kind: str, help_name, value: Any
+    ) -> None:
+        full_name = f"{self.__prefix}_{name}"
+
+        text = self.__helps.get(help_name) if help_name is not None else None
+        if text is not None:
+            lines.append(f"# HELP {full_name} {text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        lines.append(f"{full_name} {_format(value)}")
+
+
+# ------------------------------------------------------------------------------------------
+def _format(value: Any) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class TimedProxy:
+    """
+    Stands in for an object whose coroutine methods are timed into a latency recorder.
+
+    Used to measure every call made to the xchembku dataface without touching each call site.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, target: Any, latency_recorder: LatencyRecorder):
+        self.__target = target
+        self.__latency_recorder = latency_recorder
+
+    # ----------------------------------------------------------------------------------------
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self.__target, name)
+
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+
+        latency_recorder = self.__latency_recorder
+
+        async def timed(*args, **kwargs):
+            time0 = time.time()
+            try:
+                result = await attribute(*args, **kwargs)
+            except BaseException:
+                latency_recorder.record(time.time() - time0, is_error=True)
+                raise
+            latency_recorder.record(time.time() - time0)
+            return result
+
+        return timed
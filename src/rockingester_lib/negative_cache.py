@@ -0,0 +1,119 @@
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class NegativeCache:
+    """
+    Barcodes which were not found in the Formulatrix database, with when to look again.
+
+    Each miss doubles the time until the next look, from initial_seconds up to max_seconds,
+    so a plate registered late in RockMaker is still picked up,
+    while one which never will be costs few queries.
+
+    After max_misses misses, or max_age_seconds since the first, the barcode is given up on,
+    so a plate which is never registered doesn't wait for ever.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification: Optional[Dict] = None):
+        """
+        Constructor.
+
+        Args:
+            specification (Optional[Dict]): may contain
+                "initial_seconds" (default 60), time until the first look again,
+                "max_seconds" (default 3600), longest time between looks,
+                "backoff_factor" (default 2), how much longer each time is than the last,
+                "max_misses" (default 10), misses after which the barcode is given up on,
+                "max_age_seconds" (default 86400), time from the first miss after which it is given up on.
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__initial_seconds = float(specification.get("initial_seconds", 60.0))
+        self.__max_seconds = float(specification.get("max_seconds", 3600.0))
+        self.__backoff_factor = float(specification.get("backoff_factor", 2.0))
+        self.__max_misses = int(specification.get("max_misses", 10))
+        self.__max_age_seconds = float(specification.get("max_age_seconds", 86400.0))
+
+        # Values are (miss count, time of next look, time of first miss).
+        self.__entries: Dict[str, Tuple[int, float, float]] = {}
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    # ----------------------------------------------------------------------------------------
+    def __contains__(self, barcode: str) -> bool:
+        return barcode in self.__entries
+
+    # ----------------------------------------------------------------------------------------
+    def next_check_time(self, barcode: str) -> Optional[float]:
+        """
+        When the barcode should next be looked up, or None if it is not a known miss.
+        """
+
+        entry = self.__entries.get(barcode)
+        if entry is None:
+            return None
+
+        return entry[1]
+
+    # ----------------------------------------------------------------------------------------
+    def is_due(self, barcode: str, now: Optional[float] = None) -> bool:
+        """
+        Whether the barcode should be looked up, which is always true if it is not a known miss.
+        """
+
+        next_check_time = self.next_check_time(barcode)
+        if next_check_time is None:
+            return True
+
+        if now is None:
+            now = time.time()
+
+        return now >= next_check_time
+
+    # ----------------------------------------------------------------------------------------
+    def record_miss(self, barcode: str, now: Optional[float] = None) -> Optional[float]:
+        """
+        Note that the barcode was looked up and not found.
+
+        Returns:
+            Optional[float]: when the barcode should next be looked up,
+                or None if it has been given up on, in which case it is forgotten
+        """
+
+        if now is None:
+            now = time.time()
+
+        miss_count, _, first_miss_time = self.__entries.get(barcode, (0, now, now))
+        miss_count += 1
+
+        if (
+            miss_count >= self.__max_misses
+            or now - first_miss_time >= self.__max_age_seconds
+        ):
+            self.__entries.pop(barcode, None)
+            return None
+
+        delay = min(
+            self.__max_seconds,
+            self.__initial_seconds * self.__backoff_factor ** (miss_count - 1),
+        )
+
+        self.__entries[barcode] = (miss_count, now + delay, first_miss_time)
+
+        return now + delay
+
+    # ----------------------------------------------------------------------------------------
+    def discard(self, barcode: str) -> None:
+        """
+        Forget the barcode, typically because it has now been found.
+        """
+
+        self.__entries.pop(barcode, None)
@@ -0,0 +1,118 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Crystal plate pydantic model.
+from xchembku_api.models.crystal_plate_model import CrystalPlateModel
+
+logger = logging.getLogger(__name__)
+
+
+class PlateCache:
+    """
+    In-process cache of crystal plate models, keyed by barcode.
+
+    Entries expire after a time-to-live so that changes made to xchembku by other
+    programs are eventually seen, and the least recently used entries are evicted
+    when the cache is full.
+
+    The owner is expected to call put() or invalidate() whenever it upserts a plate itself.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification: Optional[Dict] = None):
+        """
+        Constructor.
+
+        Args:
+            specification (Optional[Dict]): may contain "max_entries" and "ttl_seconds".
+                A ttl_seconds of 0 disables the cache.
+        """
+
+        if specification is None:
+            specification = {}
+
+        # Maximum number of plates to hold before evicting the least recently used.
+        self.__max_entries = int(specification.get("max_entries", 1000))
+
+        # How long a plate is kept before it must be fetched again from the database.
+        self.__ttl_seconds = float(specification.get("ttl_seconds", 60.0))
+
+        # Ordered from least to most recently used, values are (expires_at, model).
+        self.__entries: OrderedDict = OrderedDict()
+
+        self.__hit_count = 0
+        self.__miss_count = 0
+
+    # ----------------------------------------------------------------------------------------
+    def get(self, barcode: str) -> Optional[CrystalPlateModel]:
+        """
+        Return the cached plate model for the barcode, or None if not cached or expired.
+        """
+
+        entry = self.__entries.get(barcode)
+
+        if entry is None:
+            self.__miss_count += 1
+            return None
+
+        expires_at, crystal_plate_model = entry
+        if time.monotonic() >= expires_at:
+            del self.__entries[barcode]
+            self.__miss_count += 1
+            return None
+
+        # Mark as most recently used.
+        self.__entries.move_to_end(barcode)
+        self.__hit_count += 1
+
+        return crystal_plate_model
+
+    # ----------------------------------------------------------------------------------------
+    def put(self, crystal_plate_model: CrystalPlateModel) -> None:
+        """
+        Add or replace the plate model in the cache, evicting the oldest if full.
+        """
+
+        if self.__ttl_seconds <= 0 or self.__max_entries <= 0:
+            return
+
+        barcode = crystal_plate_model.barcode
+
+        self.__entries[barcode] = (
+            time.monotonic() + self.__ttl_seconds,
+            crystal_plate_model,
+        )
+        self.__entries.move_to_end(barcode)
+
+        while len(self.__entries) > self.__max_entries:
+            self.__entries.popitem(last=False)
+
+    # ----------------------------------------------------------------------------------------
+    def invalidate(self, barcode: str) -> None:
+        """
+        Forget any cached model for the barcode.
+        """
+
+        self.__entries.pop(barcode, None)
+
+    # ----------------------------------------------------------------------------------------
+    def clear(self) -> None:
+        """
+        Forget all cached models.
+        """
+
+        self.__entries.clear()
+
+    # ----------------------------------------------------------------------------------------
+    def hit_count(self) -> int:
+        return self.__hit_count
+
+    # ----------------------------------------------------------------------------------------
+    def miss_count(self) -> int:
+        return self.__miss_count
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.__entries)
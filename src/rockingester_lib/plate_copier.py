@@ -0,0 +1,733 @@
+import concurrent.futures
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ioctl request to make the destination share the source's extents (btrfs, xfs, ...).
+FICLONE = 0x40049409
+
+# Errors which mean the kernel can't do this kind of copy between these files.
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EBADF,
+    errno.ETXTBSY,
+}
+
+# Hash of the file data recorded when checksums are on, from the standard library so always available.
+CHECKSUM_ALGORITHM = "blake2b"
+
+# Size of each read when copying or hashing through Python.
+CHUNK_SIZE = 1024 * 1024
+
+
+class Methods:
+    AUTO = "auto"
+    REFLINK = "reflink"
+    COPY_FILE_RANGE = "copy_file_range"
+    SENDFILE = "sendfile"
+    BUFFERED = "buffered"
+
+
+class Transfers:
+    # Copy the data, by the configured method.
+    COPY = "copy"
+    # Link the target to the source's data, which needs the same filesystem.
+    HARDLINK = "hardlink"
+    # Move the source to the target, which needs the same filesystem.
+    RENAME = "rename"
+    # Copy by sharing the source's extents, which needs a filesystem supporting it.
+    REFLINK = "reflink"
+
+
+# ------------------------------------------------------------------------------------------
+def copy_file(
+    source: Path, destination: Path, method: str = Methods.AUTO
+) -> Tuple[int, str]:
+    """
+    Copy one file, keeping the data in the kernel when possible.
+
+    In auto mode, tries reflink, then copy_file_range, then sendfile, then a buffered copy.
+    The file's mode and times are copied like shutil.copy2.
+
+    Returns:
+        Tuple[int, str]: number of bytes copied and the method which did the copy
+    """
+
+    with open(source, "rb") as source_stream, open(destination, "wb") as target_stream:
+        source_fd = source_stream.fileno()
+        target_fd = target_stream.fileno()
+        size = os.fstat(source_fd).st_size
+
+        used_method = None
+
+        if method in (Methods.AUTO, Methods.REFLINK):
+            try:
+                fcntl.ioctl(target_fd, FICLONE, source_fd)
+                used_method = Methods.REFLINK
+            except OSError as exception:
+                if method == Methods.REFLINK:
+                    raise
+                if exception.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+
+        if used_method is None and method in (Methods.AUTO, Methods.COPY_FILE_RANGE):
+            # Not every platform has copy_file_range.
+            copy_file_range = getattr(os, "copy_file_range", None)
+            if _copy_in_kernel(copy_file_range, source_fd, target_fd, size):
+                used_method = Methods.COPY_FILE_RANGE
+            elif method == Methods.COPY_FILE_RANGE:
+                raise OSError(errno.EOPNOTSUPP, "copy_file_range is not supported")
+
+        if used_method is None and method in (Methods.AUTO, Methods.SENDFILE):
+            if _copy_in_kernel(_sendfile, source_fd, target_fd, size):
+                used_method = Methods.SENDFILE
+            elif method == Methods.SENDFILE:
+                raise OSError(errno.EOPNOTSUPP, "sendfile is not supported")
+
+        if used_method is None:
+            source_stream.seek(0)
+            target_stream.seek(0)
+            target_stream.truncate()
+            shutil.copyfileobj(source_stream, target_stream, CHUNK_SIZE)
+            used_method = Methods.BUFFERED
+
+    shutil.copystat(source, destination)
+
+    return size, used_method
+
+
+# ------------------------------------------------------------------------------------------
+def copy_file_hashed(source: Path, destination: Path) -> Tuple[int, str]:
+    """
+    Copy one file through Python, hashing the data on its way to the destination.
+
+    The data is read once, so the hash costs no more reading than a buffered copy.
+    Once written, the destination's length is checked against the bytes hashed
+    and the size of the source when it was opened.
+    The file's mode and times are copied like shutil.copy2.
+
+    Returns:
+        Tuple[int, str]: number of bytes copied and the hex digest of them
+    """
+
+    digest = hashlib.blake2b()
+    byte_count = 0
+
+    with open(source, "rb") as source_stream, open(destination, "wb") as target_stream:
+        size = os.fstat(source_stream.fileno()).st_size
+
+        while True:
+            chunk = source_stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            target_stream.write(chunk)
+            byte_count += len(chunk)
+
+        target_stream.flush()
+        written = os.fstat(target_stream.fileno()).st_size
+
+    if written != byte_count or byte_count != size:
+        raise RuntimeError(
+            f"copy of {str(source)} to {str(destination)} has {written} bytes"
+            f" but {byte_count} were read from a file of {size} bytes"
+        )
+
+    shutil.copystat(source, destination)
+
+    return byte_count, digest.hexdigest()
+
+
+# ------------------------------------------------------------------------------------------
+def hash_file(filename: Path) -> Tuple[int, str]:
+    """
+    Blocking hash of a file which is already in place, such as one staged by an earlier copy.
+
+    Returns:
+        Tuple[int, str]: number of bytes hashed and the hex digest of them
+    """
+
+    digest = hashlib.blake2b()
+    byte_count = 0
+
+    with open(filename, "rb") as stream:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            byte_count += len(chunk)
+
+    return byte_count, digest.hexdigest()
+
+
+# ------------------------------------------------------------------------------------------
+def _checksum(byte_count: int, digest: str) -> Dict:
+    return {"byte_count": byte_count, "algorithm": CHECKSUM_ALGORITHM, "digest": digest}
+
+
+# ------------------------------------------------------------------------------------------
+def staging_directory(target_directory: Path) -> Path:
+    """
+    The hidden sibling of a target directory where its files are copied before it appears.
+    """
+
+    return target_directory.parent / f".{target_directory.name}.staging"
+
+
+# ------------------------------------------------------------------------------------------
+def partial_filename(filename: Path) -> Path:
+    """
+    The hidden sibling of a file where it is copied before being renamed into place.
+    """
+
+    return filename.parent / f".{filename.name}.partial"
+
+
+# ------------------------------------------------------------------------------------------
+def _is_same_size(source: Path, destination: Path) -> bool:
+    """
+    Whether the destination exists with the size of the source, so doesn't need copying again.
+    """
+
+    try:
+        return os.stat(destination).st_size == os.stat(source).st_size
+    except FileNotFoundError:
+        return False
+
+
+# ------------------------------------------------------------------------------------------
+def transfer_file(
+    source: Path,
+    destination: Path,
+    transfer: str = Transfers.COPY,
+    method: str = Methods.AUTO,
+    is_checksummed: bool = False,
+) -> Tuple[int, str, Optional[str]]:
+    """
+    Put one file at the destination by the given transfer.
+
+    A hardlink or rename writes none of the data, and puts the file in place in one step,
+    but between filesystems it falls back to a copy by the method.
+    The copy is made to a partial file renamed into place when done,
+    after which a rename removes the source.
+    A reflink doesn't fall back, since copy in auto mode already tries a reflink first.
+
+    Checksums can only be made by the copy transfer, which then copies with copy_file_hashed()
+    instead of by the method, since data copied in the kernel can't be hashed on the way.
+
+    Returns:
+        Tuple[int, str, Optional[str]]: size of the file, the transfer or copy method which put it there,
+            and the hex digest of the data if checksummed, otherwise None
+    """
+
+    if is_checksummed and transfer != Transfers.COPY:
+        raise RuntimeError(f"checksums can only be made by copying, not by {transfer}")
+
+    if transfer == Transfers.REFLINK:
+        size, used_method = copy_file(source, destination, Methods.REFLINK)
+        return size, used_method, None
+
+    if transfer in (Transfers.HARDLINK, Transfers.RENAME):
+        size = os.stat(source).st_size
+        try:
+            if transfer == Transfers.HARDLINK:
+                # Replace anything left by an earlier transfer which didn't finish.
+                try:
+                    os.unlink(destination)
+                except FileNotFoundError:
+                    pass
+                os.link(source, destination)
+            else:
+                os.rename(source, destination)
+            return size, transfer, None
+        except OSError as exception:
+            if exception.errno != errno.EXDEV:
+                raise
+
+        partial = partial_filename(destination)
+        size, used_method = copy_file(source, partial, method)
+        os.replace(partial, destination)
+        if transfer == Transfers.RENAME:
+            os.unlink(source)
+
+        return size, used_method, None
+
+    if is_checksummed:
+        size, digest = copy_file_hashed(source, destination)
+        return size, Methods.BUFFERED, digest
+
+    size, used_method = copy_file(source, destination, method)
+    return size, used_method, None
+
+
+# ------------------------------------------------------------------------------------------
+def _remove_empty_directories(directory: Path) -> None:
+    """
+    Blocking removal of a directory tree left empty by renaming its files away.
+
+    Anything not empty, say a file which arrived late, is left where it is.
+    """
+
+    for path, _, _ in os.walk(directory, topdown=False):
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+
+
+# ------------------------------------------------------------------------------------------
+def _sendfile(source_fd: int, target_fd: int, count: int, offset_src: int) -> int:
+    """
+    Adapt os.sendfile to the calling convention of os.copy_file_range.
+    """
+
+    return os.sendfile(target_fd, source_fd, offset_src, count)
+
+
+# ------------------------------------------------------------------------------------------
+def _copy_in_kernel(function, source_fd: int, target_fd: int, size: int) -> bool:
+    """
+    Copy the whole file with copy_file_range or sendfile.
+
+    Returns:
+        bool: False if the call is not supported for these files and nothing was copied
+    """
+
+    if function is None:
+        return False
+
+    offset = 0
+    while offset < size:
+        try:
+            if function is _sendfile:
+                copied = function(source_fd, target_fd, size - offset, offset)
+            else:
+                copied = function(source_fd, target_fd, size - offset, offset, offset)
+        except OSError as exception:
+            if offset == 0 and exception.errno in UNSUPPORTED_ERRNOS:
+                return False
+            raise
+
+        # The file got shorter while we were copying it.
+        if copied == 0:
+            break
+
+        offset += copied
+
+    return True
+
+
+class PlateCopier:
+    """
+    Copies a plate directory with several files in flight at once.
+
+    Each file is copied with copy_file() so that, where the filesystem allows,
+    the data is reflinked or copied inside the kernel and never passes through Python.
+
+    When the plates and the visits are on the same filesystem, the files can instead
+    be hardlinked or renamed into the visit, so their data is not written again,
+    see Transfers.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, specification: Optional[Dict] = None):
+        """
+        Constructor.
+
+        Args:
+            specification (Optional[Dict]): may contain "workers" (default 4),
+                "transfer" (default "copy", else one of hardlink, rename or reflink),
+                "method" for copies (default "auto", else one of reflink, copy_file_range, sendfile or buffered)
+                and "checksum" (default false), to hash each file as it is copied.
+                Checksums need the copy transfer with the auto or buffered method,
+                since they are made by copying the data through Python rather than in the kernel.
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__workers = int(specification.get("workers", 4))
+        self.__method = specification.get("method", Methods.AUTO)
+        self.__is_checksummed = bool(specification.get("checksum", False))
+
+        self.__transfer = specification.get("transfer", Transfers.COPY)
+        if self.__transfer not in (
+            Transfers.COPY,
+            Transfers.HARDLINK,
+            Transfers.RENAME,
+            Transfers.REFLINK,
+        ):
+            raise RuntimeError(f"plate copier has invalid transfer {self.__transfer}")
+
+        # Rather than quietly losing the faster transfers and methods, refuse to mix them with checksums.
+        if self.__is_checksummed and self.__transfer != Transfers.COPY:
+            raise RuntimeError(
+                f"plate copier can't make checksums with transfer {self.__transfer}"
+            )
+        if self.__is_checksummed and self.__method not in (
+            Methods.AUTO,
+            Methods.BUFFERED,
+        ):
+            raise RuntimeError(
+                f"plate copier can't make checksums with method {self.__method}"
+            )
+
+        # So falling back to copies between filesystems is only warned about once.
+        self.__is_fallback_warned = False
+
+        self.__thread_pool_executor: Optional[
+            concurrent.futures.ThreadPoolExecutor
+        ] = None
+
+        # Several plates may be copied at once from different threads.
+        self.__lock = threading.Lock()
+
+    # ----------------------------------------------------------------------------------------
+    def transfer(self) -> str:
+        return self.__transfer
+
+    # ----------------------------------------------------------------------------------------
+    def is_checksummed(self) -> bool:
+        return self.__is_checksummed
+
+    # ----------------------------------------------------------------------------------------
+    def shutdown(self) -> None:
+        with self.__lock:
+            if self.__thread_pool_executor is not None:
+                self.__thread_pool_executor.shutdown(wait=True)
+                self.__thread_pool_executor = None
+
+    # ----------------------------------------------------------------------------------------
+    def copy_tree(self, source_directory: Path, target_directory: Path) -> Dict:
+        """
+        Blocking copy of a directory tree, like shutil.copytree.
+
+        Returns:
+            Dict: report with file_count, byte_count, seconds, bytes_per_second and methods,
+                the last being a count of files copied by each method,
+                plus, when checksummed, checksums, the byte_count and digest of each file
+                keyed by its path relative to the source directory
+        """
+
+        time0 = time.time()
+
+        # Make the directories first, then copy all the files in parallel.
+        pairs: List[Tuple[Path, Path]] = []
+        directories: List[Tuple[Path, Path]] = []
+        for directory, subdirectory_names, filenames in os.walk(source_directory):
+            relative = Path(directory).relative_to(source_directory)
+            target = target_directory / relative
+            target.mkdir(parents=True, exist_ok=relative != Path("."))
+            directories.append((Path(directory), target))
+            for filename in filenames:
+                pairs.append((Path(directory) / filename, target / filename))
+
+        report = self.__copy_pairs(
+            pairs,
+            time0,
+            [str(source.relative_to(source_directory)) for source, _ in pairs],
+        )
+
+        # Directory times last, since copying files into them changes them.
+        for source, target in directories:
+            shutil.copystat(source, target)
+
+        return report
+
+    # ----------------------------------------------------------------------------------------
+    def copy_tree_staged(self, source_directory: Path, target_directory: Path) -> Dict:
+        """
+        Blocking copy of a directory tree which appears at the target only once complete.
+
+        The files are copied into a hidden staging sibling of the target,
+        which is then renamed to the target in one step.
+        A staging directory left by a copy which didn't finish, say because the process died,
+        is resumed: files there which are the same size as the source are not copied again.
+
+        With the rename transfer, the source directory is renamed to the target when it can be,
+        otherwise its files are moved through the staging directory and it is removed once empty.
+
+        Returns:
+            Dict: report the same as copy_tree, plus resumed_count,
+                the number of files already staged which were not copied again,
+                whose checksums are made by reading them where they are staged
+        """
+
+        time0 = time.time()
+
+        # Like copytree, the target must not already exist.
+        if target_directory.exists():
+            raise FileExistsError(
+                errno.EEXIST, "target directory already exists", str(target_directory)
+            )
+
+        staging = staging_directory(target_directory)
+
+        if self.__transfer == Transfers.RENAME and not staging.exists():
+            report = self.__rename_tree(source_directory, target_directory, time0)
+            if report is not None:
+                return report
+
+        # Make the directories first, then copy all the files not already staged in parallel.
+        pairs: List[Tuple[Path, Path]] = []
+        directories: List[Tuple[Path, Path]] = []
+        resumed: List[Tuple[str, Path]] = []
+        for directory, subdirectory_names, filenames in os.walk(source_directory):
+            relative = Path(directory).relative_to(source_directory)
+            target = staging / relative
+            target.mkdir(parents=True, exist_ok=True)
+            directories.append((Path(directory), target))
+            for filename in filenames:
+                source = Path(directory) / filename
+                if _is_same_size(source, target / filename):
+                    resumed.append((str(relative / filename), target / filename))
+                else:
+                    pairs.append((source, target / filename))
+
+        report = self.__copy_pairs(
+            pairs,
+            time0,
+            [str(source.relative_to(source_directory)) for source, _ in pairs],
+        )
+
+        resumed_count = len(resumed)
+        if self.__is_checksummed:
+            for name, staged in resumed:
+                byte_count, digest = hash_file(staged)
+                report["checksums"][name] = _checksum(byte_count, digest)
+
+        # Directory times last, since copying files into them changes them.
+        for source, target in directories:
+            shutil.copystat(source, target)
+
+        os.rename(staging, target_directory)
+
+        if self.__transfer == Transfers.RENAME:
+            _remove_empty_directories(source_directory)
+
+        if resumed_count > 0:
+            logger.info(
+                f"[PLATECOPY] resumed staged copy to {target_directory},"
+                f" {resumed_count} files were already staged"
+                f" and {len(pairs)} were copied"
+            )
+
+        report["resumed_count"] = resumed_count
+
+        return report
+
+    # ----------------------------------------------------------------------------------------
+    def __rename_tree(
+        self, source_directory: Path, target_directory: Path, time0: float
+    ) -> Optional[Dict]:
+        """
+        Rename the whole source directory to the target.
+
+        Returns:
+            Optional[Dict]: report the same as copy_tree, or None if the target is on another filesystem
+        """
+
+        sizes = [
+            os.stat(Path(directory) / filename).st_size
+            for directory, _, filenames in os.walk(source_directory)
+            for filename in filenames
+        ]
+
+        try:
+            os.rename(source_directory, target_directory)
+        except OSError as exception:
+            if exception.errno != errno.EXDEV:
+                raise
+            return None
+
+        seconds = time.time() - time0
+
+        return {
+            "file_count": len(sizes),
+            "byte_count": sum(sizes),
+            "seconds": seconds,
+            "bytes_per_second": sum(sizes) / seconds if seconds > 0 else 0.0,
+            "methods": {Transfers.RENAME: len(sizes)},
+            "resumed_count": 0,
+        }
+
+    # ----------------------------------------------------------------------------------------
+    def release_source(self, source_directory: Path) -> None:
+        """
+        Blocking removal of a plate directory whose files have all been renamed to the visit.
+
+        Does nothing for the other transfers, which leave the plate directory as it was.
+        """
+
+        if self.__transfer == Transfers.RENAME:
+            _remove_empty_directories(source_directory)
+
+    # ----------------------------------------------------------------------------------------
+    def copy_files(
+        self, source_directory: Path, filenames: List[str], target_directory: Path
+    ) -> Dict:
+        """
+        Blocking copy of some files from one directory into another, making the target if needed.
+
+        Each file is copied to a hidden partial file and renamed into place,
+        so a reader of the target never sees a partly copied file.
+        Hardlinks and renames are made straight to the file's name, since they are done in one step.
+        A rename to a partial file would leave the image only there if the process died
+        before it was renamed into place.
+
+        Returns:
+            Dict: report the same as copy_tree
+        """
+
+        time0 = time.time()
+
+        target_directory.mkdir(parents=True, exist_ok=True)
+
+        is_in_place = self.__transfer in (Transfers.HARDLINK, Transfers.RENAME)
+
+        pairs = []
+        for filename in filenames:
+            target = target_directory / filename
+            if not is_in_place:
+                target = partial_filename(target)
+            pairs.append((source_directory / filename, target))
+
+        report = self.__copy_pairs(pairs, time0, filenames)
+
+        if not is_in_place:
+            for filename, (_, partial) in zip(filenames, pairs):
+                os.replace(partial, target_directory / filename)
+
+        return report
+
+    # ----------------------------------------------------------------------------------------
+    def recover_partials(
+        self, source_directory: Path, target_directory: Path
+    ) -> List[str]:
+        """
+        Blocking clean up of the partial files left in a target by a process which died.
+
+        With the rename transfer, a partial file whose source is gone was renamed there whole,
+        so it is renamed into place.
+        Any other partial file may be cut short, so is removed,
+        and its source, if still there, will be transferred again.
+
+        Returns:
+            List[str]: names of the files renamed into place
+        """
+
+        if not target_directory.is_dir():
+            return []
+
+        recovered_filenames = []
+        with os.scandir(target_directory) as entries:
+            partials = [
+                entry.name
+                for entry in entries
+                if entry.name.startswith(".") and entry.name.endswith(".partial")
+            ]
+
+        for partial in partials:
+            filename = partial[1 : -len(".partial")]
+            if (
+                self.__transfer == Transfers.RENAME
+                and not (source_directory / filename).exists()
+            ):
+                os.replace(target_directory / partial, target_directory / filename)
+                recovered_filenames.append(filename)
+            else:
+                os.unlink(target_directory / partial)
+
+        return sorted(recovered_filenames)
+
+    # ----------------------------------------------------------------------------------------
+    def __copy_pairs(
+        self, pairs: List[Tuple[Path, Path]], time0: float, names: List[str]
+    ) -> Dict:
+        """
+        Transfer the files, naming each in the checksums by the name given for its pair.
+        """
+
+        methods: Dict[str, int] = {}
+        byte_count = 0
+
+        if self.__workers <= 1 or len(pairs) <= 1:
+            results = [
+                transfer_file(
+                    source,
+                    target,
+                    self.__transfer,
+                    self.__method,
+                    self.__is_checksummed,
+                )
+                for source, target in pairs
+            ]
+        else:
+            with self.__lock:
+                if self.__thread_pool_executor is None:
+                    self.__thread_pool_executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.__workers,
+                        thread_name_prefix="plate_copier",
+                    )
+                thread_pool_executor = self.__thread_pool_executor
+            futures = [
+                thread_pool_executor.submit(
+                    transfer_file,
+                    source,
+                    target,
+                    self.__transfer,
+                    self.__method,
+                    self.__is_checksummed,
+                )
+                for source, target in pairs
+            ]
+            # Let every copy finish before raising any error.
+            concurrent.futures.wait(futures)
+            results = [future.result() for future in futures]
+
+        checksums: Dict[str, Dict] = {}
+        for name, (size, method, digest) in zip(names, results):
+            byte_count += size
+            methods[method] = methods.get(method, 0) + 1
+            if digest is not None:
+                checksums[name] = _checksum(size, digest)
+
+        if (
+            self.__transfer in (Transfers.HARDLINK, Transfers.RENAME)
+            and methods.get(self.__transfer, 0) < len(results)
+            and not self.__is_fallback_warned
+        ):
+            self.__is_fallback_warned = True
+            logger.warning(
+                f"[PLATECOPY] some files could not be transferred by {self.__transfer}"
+                f" since the visits are on another filesystem, so they were copied"
+            )
+
+        seconds = time.time() - time0
+
+        report = {
+            "file_count": len(pairs),
+            "byte_count": byte_count,
+            "seconds": seconds,
+            "bytes_per_second": byte_count / seconds if seconds > 0 else 0.0,
+            "methods": methods,
+        }
+
+        if self.__is_checksummed:
+            report["checksums"] = checksums
+
+        return report
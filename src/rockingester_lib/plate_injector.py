@@ -1,4 +1,9 @@
+import asyncio
+import contextlib
+import logging
+import time
 from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
 
 from dls_utilpack.visit import get_xchem_directory
 
@@ -13,43 +18,241 @@ from xchembku_api.models.crystal_plate_model import CrystalPlateModel
 
 from rockingester_lib.ftrix_client import FtrixClient
 
+# Barcodes not found in Formulatrix, with when to look again.
+from rockingester_lib.negative_cache import NegativeCache
+
+# Cache of plate models so waiting plates don't cost a database round trip.
+from rockingester_lib.plate_cache import PlateCache
+
+# Time spent in each stage of ingesting a plate.
+from rockingester_lib.stage_timer import PlateTimer, Stages, span
+
+logger = logging.getLogger(__name__)
+
+# Error given to plates whose barcode is not in the Formulatrix database.
+BARCODE_NOT_FOUND = "barcode not found Formulatrix database"
+
 
 class PlateInjector:
-    def __init__(self, ftrix_client: FtrixClient, xchembku_client):
+    def __init__(
+        self,
+        ftrix_client: FtrixClient,
+        xchembku_client,
+        plate_cache: Optional[PlateCache] = None,
+        negative_cache: Optional[NegativeCache] = None,
+    ):
 
         self.__ftrix_client = ftrix_client
         self.__xchembku_client = xchembku_client
+        self.__plate_cache = plate_cache
+        self.__negative_cache = negative_cache
+
+        # Lock of each barcode being found or injected, with how many tasks are using it.
+        self.__barcode_locks: Dict[str, asyncio.Lock] = {}
+        self.__barcode_lock_users: Dict[str, int] = {}
+
+    # ----------------------------------------------------------------------------------------
+    def next_check_time(self, barcode: str) -> Optional[float]:
+        """
+        When a barcode not found in Formulatrix should be looked up again,
+        or None if it is not waiting for that.
+        """
+
+        if self.__negative_cache is None:
+            return None
+
+        return self.__negative_cache.next_check_time(barcode)
 
     # ----------------------------------------------------------------------------------------
     async def find_or_inject_barcode(
-        self, barcode: str, visits_directory: str
+        self,
+        barcode: str,
+        visits_directory: str,
+        plate_timer: Optional[PlateTimer] = None,
     ) -> CrystalPlateModel:
         """
         Find barcode in xchembku database, or, if not found, add it from ftrix.
 
         If not in xchembku, always add barcode to xchembku, even if some kind of error to do with the plate.
+
+        When there is a plate cache, it is consulted before xchembku and updated after.
+
+        When there is a negative cache, a barcode not found in Formulatrix is not added to xchembku,
+        but given back with an error until it is looked up again, see next_check_time().
+        Once the negative cache gives up on the barcode, it is added to xchembku with the error.
+
+        When there is a plate timer, the database lookups are timed as stages of the plate.
         """
 
-        # Search in xchembku for the barcode.
-        crystal_plate_models = await self.__xchembku_client.fetch_crystal_plates(
-            CrystalPlateFilterModel(barcode=barcode)
+        crystal_plate_models = await self.find_or_inject_barcodes(
+            [barcode], visits_directory, plate_timer
         )
-        if len(crystal_plate_models) > 0:
-            return crystal_plate_models[0]
+
+        return crystal_plate_models[barcode]
+
+    # ----------------------------------------------------------------------------------------
+    async def find_or_inject_barcodes(
+        self,
+        barcodes: List[str],
+        visits_directory: str,
+        plate_timer: Optional[PlateTimer] = None,
+    ) -> Dict[str, CrystalPlateModel]:
+        """
+        Find many barcodes in xchembku database, adding those not found from ftrix.
+
+        All the barcodes not in xchembku are looked up in ftrix with a single query,
+        and all the new plates are added to xchembku with a single upsert.
+
+        Only one task at a time looks for any one barcode in xchembku,
+        so two tasks missing the cache at the same moment don't both inject the plate,
+        each with its own uuid, when xchembku keeps only the first.
+
+        Returns:
+            Dict[str, CrystalPlateModel]: plate model for each barcode
+        """
+
+        crystal_plate_models: Dict[str, CrystalPlateModel] = {}
+
+        # We have looked up these barcodes recently?
+        unknown_barcodes = []
+        for barcode in dict.fromkeys(barcodes):
+            crystal_plate_model = None
+            if self.__plate_cache is not None:
+                crystal_plate_model = self.__plate_cache.get(barcode)
+            if crystal_plate_model is not None:
+                crystal_plate_models[barcode] = crystal_plate_model
+            # Not found in Formulatrix last time, and not yet time to look again?
+            elif self.__negative_cache is not None and not self.__negative_cache.is_due(
+                barcode
+            ):
+                crystal_plate_models[barcode] = CrystalPlateModel(
+                    barcode=barcode, error=BARCODE_NOT_FOUND
+                )
+            else:
+                unknown_barcodes.append(barcode)
+
+        if len(unknown_barcodes) == 0:
+            return crystal_plate_models
+
+        async with self.__lock_barcodes(unknown_barcodes):
+            await self.__fetch_or_inject_barcodes(
+                unknown_barcodes, visits_directory, plate_timer, crystal_plate_models
+            )
+
+        return crystal_plate_models
+
+    # ----------------------------------------------------------------------------------------
+    async def __fetch_or_inject_barcodes(
+        self,
+        barcodes: List[str],
+        visits_directory: str,
+        plate_timer: Optional[PlateTimer],
+        crystal_plate_models: Dict[str, CrystalPlateModel],
+    ) -> None:
+        """
+        Find barcodes not in the cache in xchembku, adding those not found from ftrix.
+
+        The barcodes must be locked, see __lock_barcodes().
+        The plate model of each barcode is put in crystal_plate_models.
+        """
+
+        # Another task may have cached the plate while we were waiting for the lock.
+        unknown_barcodes = []
+        for barcode in barcodes:
+            crystal_plate_model = None
+            if self.__plate_cache is not None:
+                crystal_plate_model = self.__plate_cache.get(barcode)
+            if crystal_plate_model is not None:
+                crystal_plate_models[barcode] = crystal_plate_model
+            else:
+                unknown_barcodes.append(barcode)
+
+        if len(unknown_barcodes) == 0:
+            return
+
+        # Search in xchembku for the barcodes.
+        with span(plate_timer, Stages.FETCH_XCHEMBKU_PLATE):
+            fetched_crystal_plate_models = await asyncio.gather(
+                *[
+                    self.__xchembku_client.fetch_crystal_plates(
+                        CrystalPlateFilterModel(barcode=barcode)
+                    )
+                    for barcode in unknown_barcodes
+                ]
+            )
+
+        new_barcodes = []
+        for barcode, fetched in zip(unknown_barcodes, fetched_crystal_plate_models):
+            if len(fetched) > 0:
+                if self.__plate_cache is not None:
+                    self.__plate_cache.put(fetched[0])
+                crystal_plate_models[barcode] = fetched[0]
+            else:
+                new_barcodes.append(barcode)
+
+        if len(new_barcodes) == 0:
+            return
+
+        # Look up the barcodes in the Formulatrix database.
+        # The client's pooled connections are opened and closed by whoever owns the client.
+        with span(plate_timer, Stages.QUERY_FTRIX):
+            records = await self.__ftrix_client.query_barcodes(new_barcodes)
+
+        new_crystal_plate_models = []
+        for barcode in new_barcodes:
+            record = records.get(barcode)
+
+            # Don't insert into xchembku, but look again later, it may just not be registered yet.
+            if record is None and self.__negative_cache is not None:
+                next_check_time = self.__negative_cache.record_miss(barcode)
+                if next_check_time is not None:
+                    logger.debug(
+                        f"[PLATE INJECTOR] barcode {barcode} not found in Formulatrix,"
+                        f" will look again in {'%0.1f' % (next_check_time - time.time())} seconds"
+                    )
+                    crystal_plate_models[barcode] = CrystalPlateModel(
+                        barcode=barcode, error=BARCODE_NOT_FOUND
+                    )
+                    continue
+
+                # Given up looking, so insert it with the error like any other bad plate.
+                logger.warning(
+                    f"[PLATE INJECTOR] barcode {barcode} still not found in Formulatrix,"
+                    f" so giving up looking for it"
+                )
+
+            elif self.__negative_cache is not None:
+                self.__negative_cache.discard(barcode)
+
+            new_crystal_plate_models.append(
+                self.__build_crystal_plate_model(barcode, record, visits_directory)
+            )
+
+        if len(new_crystal_plate_models) == 0:
+            return
+
+        # Always insert into xchembku, even if some error is on it.
+        with span(plate_timer, Stages.INJECT_PLATE):
+            await self.__xchembku_client.upsert_crystal_plates(new_crystal_plate_models)
+
+        for crystal_plate_model in new_crystal_plate_models:
+            if self.__plate_cache is not None:
+                self.__plate_cache.put(crystal_plate_model)
+            crystal_plate_models[crystal_plate_model.barcode] = crystal_plate_model
+
+    # ----------------------------------------------------------------------------------------
+    def __build_crystal_plate_model(
+        self, barcode: str, record: Optional[Dict], visits_directory: str
+    ) -> CrystalPlateModel:
+        """
+        Make the model to be injected for a barcode from its ftrix record, which may be None.
+        """
 
         # Start a model object to be injected and returned.
         crystal_plate_model = CrystalPlateModel(barcode=barcode)
 
-        try:
-            # TODO: Consider a better ftrix_client connection management than making a new one each query.
-            await self.__ftrix_client.connect()
-            # Look up the barcode in the Formulatrix database.
-            record = await self.__ftrix_client.query_barcode(barcode)
-        finally:
-            await self.__ftrix_client.disconnect()
-
         if record is None:
-            crystal_plate_model.error = "barcode not found Formulatrix database"
+            crystal_plate_model.error = BARCODE_NOT_FOUND
 
         else:
             crystal_plate_model.formulatrix__plate__id = int(
@@ -83,7 +286,35 @@ class PlateInjector:
                 except Exception as exception:
                     crystal_plate_model.error = str(exception)
 
-        # Always insert into xchembku, even if some error is on it.
-        await self.__xchembku_client.upsert_crystal_plates([crystal_plate_model])
-
         return crystal_plate_model
+
+    # ----------------------------------------------------------------------------------------
+    @contextlib.asynccontextmanager
+    async def __lock_barcodes(self, barcodes: List[str]) -> AsyncIterator[None]:
+        """
+        Hold the lock of each barcode, made when first needed and dropped when no task uses it.
+        """
+
+        # Always in the same order, so tasks locking some of the same barcodes can't deadlock.
+        barcodes = sorted(barcodes)
+
+        for barcode in barcodes:
+            if barcode not in self.__barcode_locks:
+                self.__barcode_locks[barcode] = asyncio.Lock()
+                self.__barcode_lock_users[barcode] = 0
+            self.__barcode_lock_users[barcode] += 1
+
+        locked_barcodes = []
+        try:
+            for barcode in barcodes:
+                await self.__barcode_locks[barcode].acquire()
+                locked_barcodes.append(barcode)
+            yield
+        finally:
+            for barcode in locked_barcodes:
+                self.__barcode_locks[barcode].release()
+            for barcode in barcodes:
+                self.__barcode_lock_users[barcode] -= 1
+                if self.__barcode_lock_users[barcode] == 0:
+                    self.__barcode_locks.pop(barcode)
+                    self.__barcode_lock_users.pop(barcode)
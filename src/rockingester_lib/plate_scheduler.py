@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------
+def estimate_completion_time(
+    mtimes: List[float],
+    well_count: int,
+    deadline: float,
+    earliest: float,
+) -> float:
+    """
+    Guess when the last image of a plate will arrive, from the rate the images so far arrived.
+
+    The guess is clamped to be no earlier than earliest and no later than deadline.
+
+    Args:
+        mtimes (List[float]): arrival times of the images found so far
+        well_count (int): number of images expected for the plate
+        deadline (float): time when the wait for more images gives up
+        earliest (float): soonest it is worth looking at the plate again
+
+    Returns:
+        float: time at which to look at the plate again
+    """
+
+    estimate = deadline
+
+    if len(mtimes) >= 2 and len(mtimes) < well_count:
+        first_mtime = min(mtimes)
+        last_mtime = max(mtimes)
+        if last_mtime > first_mtime:
+            seconds_per_image = (last_mtime - first_mtime) / (len(mtimes) - 1)
+            estimate = last_mtime + seconds_per_image * (well_count - len(mtimes))
+
+    return max(earliest, min(estimate, deadline))
+
+
+class PlateScheduler:
+    """
+    Priority queue of plate directories, keyed by the time each is next due to be scraped.
+
+    A plate directory is in the queue at most once.
+    Scheduling an already queued plate directory keeps whichever time is sooner,
+    so a change noticed while a plate is waiting is never delayed by its old deadline.
+
+    Superseded heap entries are left in place and skipped when they come to the top.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self):
+        self.__heap: List[Tuple[float, int, Path]] = []
+
+        # The current due time of each queued plate directory.
+        self.__due_times: Dict[Path, float] = {}
+
+        # Tie breaker so plates due at the same time come out in the order they were scheduled.
+        self.__counter = itertools.count()
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.__due_times)
+
+    # ----------------------------------------------------------------------------------------
+    def __contains__(self, plate_directory: Path) -> bool:
+        return plate_directory in self.__due_times
+
+    # ----------------------------------------------------------------------------------------
+    def due_time(self, plate_directory: Path) -> Optional[float]:
+        return self.__due_times.get(plate_directory)
+
+    # ----------------------------------------------------------------------------------------
+    def schedule(self, plate_directory: Path, due_time: float) -> None:
+        """
+        Queue the plate directory, or bring it forward if it is queued for later.
+        """
+
+        old_due_time = self.__due_times.get(plate_directory)
+        if old_due_time is not None and old_due_time <= due_time:
+            return
+
+        self.__due_times[plate_directory] = due_time
+        heapq.heappush(self.__heap, (due_time, next(self.__counter), plate_directory))
+
+    # ----------------------------------------------------------------------------------------
+    def discard(self, plate_directory: Path) -> None:
+        """
+        Remove the plate directory from the queue, if it is there.
+        """
+
+        self.__due_times.pop(plate_directory, None)
+
+    # ----------------------------------------------------------------------------------------
+    def next_due_time(self) -> Optional[float]:
+        """
+        The soonest due time in the queue, or None if the queue is empty.
+        """
+
+        self.__drop_stale()
+
+        if len(self.__heap) == 0:
+            return None
+
+        return self.__heap[0][0]
+
+    # ----------------------------------------------------------------------------------------
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[Path]:
+        """
+        Remove and return the plate directories due at or before now, soonest first.
+
+        Args:
+            now (float): the current time
+            limit (Optional[int]): most plate directories to return, or None for all due
+        """
+
+        plate_directories: List[Path] = []
+
+        while limit is None or len(plate_directories) < limit:
+            self.__drop_stale()
+            if len(self.__heap) == 0 or self.__heap[0][0] > now:
+                break
+
+            _, _, plate_directory = heapq.heappop(self.__heap)
+            del self.__due_times[plate_directory]
+            plate_directories.append(plate_directory)
+
+        return plate_directories
+
+    # ----------------------------------------------------------------------------------------
+    def __drop_stale(self) -> None:
+        """
+        Pop heap entries which have been superseded or discarded.
+        """
+
+        heap = self.__heap
+        while len(heap) > 0:
+            due_time, _, plate_directory = heap[0]
+            if self.__due_times.get(plate_directory) == due_time:
+                break
+            heapq.heappop(heap)
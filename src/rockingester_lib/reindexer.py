@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dls_utilpack.require import require
+
+# Dataface client context.
+from xchembku_api.datafaces.context import Context as XchembkuDatafaceClientContext
+
+# Crystal plate pydantic model.
+from xchembku_api.models.crystal_plate_model import CrystalPlateModel
+
+# Crystal well pydantic model.
+from xchembku_api.models.crystal_well_model import CrystalWellModel
+
+# Crystal plate objects factory.
+from xchembku_lib.crystal_plate_objects.crystal_plate_objects import CrystalPlateObjects
+
+# Pools for running blocking work off the event loop.
+from rockingester_lib.executors import Executors
+
+# Object able to talk to the formulatrix database.
+from rockingester_lib.ftrix_client import FtrixClientContext
+
+# Fast image width/height reading.
+from rockingester_lib.image_probe import probe_image_sizes_parallel
+
+# Object which can inject new xchembku plate records discovered while looking in subwell images.
+from rockingester_lib.plate_injector import PlateInjector
+
+logger = logging.getLogger(__name__)
+
+
+# ------------------------------------------------------------------------------------------
+def _list_visit_plate_directories(
+    proposal_directory: Path, visit_plates_subdirectory: Path
+) -> List[Path]:
+    """
+    Blocking listing of the plate directories copied into all the visits of a proposal.
+
+    Hidden directories, such as unfinished staged copies, are not included.
+    """
+
+    plate_directories = []
+    with os.scandir(proposal_directory) as visit_entries:
+        for visit_entry in visit_entries:
+            if not visit_entry.is_dir():
+                continue
+            plates_directory = Path(visit_entry.path) / visit_plates_subdirectory
+            if not plates_directory.is_dir():
+                continue
+            with os.scandir(plates_directory) as plate_entries:
+                for plate_entry in plate_entries:
+                    if plate_entry.is_dir() and not plate_entry.name.startswith("."):
+                        plate_directories.append(Path(plate_entry.path))
+
+    return plate_directories
+
+
+# ------------------------------------------------------------------------------------------
+def _list_proposal_directories(visits_directory: Path) -> List[Path]:
+    with os.scandir(visits_directory) as entries:
+        return [
+            Path(entry.path)
+            for entry in entries
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+
+
+# ------------------------------------------------------------------------------------------
+def _list_image_names(plate_directory: Path) -> List[str]:
+    with os.scandir(plate_directory) as entries:
+        return sorted(
+            entry.name
+            for entry in entries
+            if entry.is_file() and not entry.name.startswith(".")
+        )
+
+
+class Reindexer:
+    """
+    Rebuilds the xchembku plate and well records from the plate directories already in the visits,
+    for example after the database has been wiped.
+
+    No image is copied.
+    The visits are listed in parallel, one proposal per thread,
+    then the plates are taken in chunks: the barcodes of a chunk are looked up together,
+    the images of a chunk are probed together,
+    and the wells are upserted in large batches.
+
+    Wells are upserted by filename, so running it again over the same visits is harmless.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(
+        self,
+        visits_directory: Path,
+        visit_plates_subdirectory: Path,
+        xchembku,
+        plate_injector: PlateInjector,
+        executors: Executors,
+        specification: Optional[Dict] = None,
+    ):
+        """
+        Constructor.
+
+        Args:
+            specification (Optional[Dict]): may contain
+                "plates_per_chunk" (default 100), plates looked up and probed together,
+                "wells_per_upsert" (default 5000), wells given to xchembku in one upsert.
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__visits_directory = Path(visits_directory)
+        self.__visit_plates_subdirectory = Path(visit_plates_subdirectory)
+        self.__xchembku = xchembku
+        self.__plate_injector = plate_injector
+        self.__executors = executors
+
+        self.__plates_per_chunk = int(specification.get("plates_per_chunk", 100))
+        self.__wells_per_upsert = int(specification.get("wells_per_upsert", 5000))
+
+    # ----------------------------------------------------------------------------------------
+    async def run(self) -> Dict:
+        """
+        Reindex all the plate directories in all the visits.
+
+        Returns:
+            Dict: report with plate_count, well_count, skipped_plates, seconds
+                and wells_per_second, skipped_plates being the names of plates
+                which have no good record in xchembku or Formulatrix
+        """
+
+        time0 = time.time()
+
+        plate_directories = await self.list_plate_directories()
+
+        logger.info(
+            f"[REINDEX] found {len(plate_directories)} plate directories"
+            f" in {str(self.__visits_directory)}"
+            f" in {'%0.3f' % (time.time() - time0)} seconds"
+        )
+
+        plate_count = 0
+        well_count = 0
+        skipped_plates: List[str] = []
+        pending_well_models: List[CrystalWellModel] = []
+
+        for index in range(0, len(plate_directories), self.__plates_per_chunk):
+            chunk = plate_directories[index : index + self.__plates_per_chunk]
+
+            plates, skipped = await self.__find_plates(chunk)
+            skipped_plates.extend(skipped)
+
+            crystal_well_models = await self.__make_well_models(plates)
+            plate_count += len(plates)
+            well_count += len(crystal_well_models)
+
+            pending_well_models.extend(crystal_well_models)
+            while len(pending_well_models) >= self.__wells_per_upsert:
+                await self.__xchembku.upsert_crystal_wells(
+                    pending_well_models[0 : self.__wells_per_upsert]
+                )
+                pending_well_models = pending_well_models[self.__wells_per_upsert :]
+
+        if len(pending_well_models) > 0:
+            await self.__xchembku.upsert_crystal_wells(pending_well_models)
+
+        seconds = time.time() - time0
+
+        logger.info(
+            f"[REINDEX] reindexed {well_count} wells on {plate_count} plates"
+            f" in {'%0.3f' % seconds} seconds, skipped {len(skipped_plates)} plates"
+        )
+
+        return {
+            "plate_count": plate_count,
+            "well_count": well_count,
+            "skipped_plates": skipped_plates,
+            "seconds": seconds,
+            "wells_per_second": well_count / seconds if seconds > 0 else 0.0,
+        }
+
+    # ----------------------------------------------------------------------------------------
+    async def list_plate_directories(self) -> List[Path]:
+        """
+        All the plate directories in the visits, sorted by name.
+        """
+
+        proposal_directories = await self.__executors.run_in_thread(
+            _list_proposal_directories, self.__visits_directory
+        )
+
+        listings = await asyncio.gather(
+            *[
+                self.__executors.run_in_thread(
+                    _list_visit_plate_directories,
+                    proposal_directory,
+                    self.__visit_plates_subdirectory,
+                )
+                for proposal_directory in proposal_directories
+            ]
+        )
+
+        plate_directories = [
+            plate_directory for listing in listings for plate_directory in listing
+        ]
+        plate_directories.sort(key=lambda plate_directory: plate_directory.name)
+
+        return plate_directories
+
+    # ----------------------------------------------------------------------------------------
+    async def __find_plates(
+        self, plate_directories: List[Path]
+    ) -> Tuple[List[Tuple[Path, CrystalPlateModel]], List[str]]:
+        """
+        Find or inject the plate records of a chunk of plate directories.
+
+        Returns:
+            Tuple: the plate directories with their plate models,
+                and the names of those skipped because their plate is in error
+        """
+
+        crystal_plate_models = await self.__plate_injector.find_or_inject_barcodes(
+            [plate_directory.name[0:4] for plate_directory in plate_directories],
+            str(self.__visits_directory),
+        )
+
+        plates: List[Tuple[Path, CrystalPlateModel]] = []
+        skipped: List[str] = []
+        stem_crystal_plate_models: List[CrystalPlateModel] = []
+        for plate_directory in plate_directories:
+            crystal_plate_model = crystal_plate_models[plate_directory.name[0:4]]
+            if crystal_plate_model.error is not None:
+                logger.warning(
+                    f"[REINDEX] skipping plate directory {str(plate_directory)}"
+                    f" because {crystal_plate_model.error}"
+                )
+                skipped.append(plate_directory.name)
+                continue
+
+            # Record where the plate was collected from, as the collector does.
+            if crystal_plate_model.rockminer_collected_stem is None:
+                crystal_plate_model.rockminer_collected_stem = plate_directory.stem
+                stem_crystal_plate_models.append(crystal_plate_model)
+
+            plates.append((plate_directory, crystal_plate_model))
+
+        if len(stem_crystal_plate_models) > 0:
+            await self.__xchembku.upsert_crystal_plates(
+                stem_crystal_plate_models, "reindex rockminer_collected_stem"
+            )
+
+        return plates, skipped
+
+    # ----------------------------------------------------------------------------------------
+    async def __make_well_models(
+        self, plates: List[Tuple[Path, CrystalPlateModel]]
+    ) -> List[CrystalWellModel]:
+        """
+        Make the well models of a chunk of plates, probing all their images in one batch.
+        """
+
+        image_name_lists = await asyncio.gather(
+            *[
+                self.__executors.run_in_thread(_list_image_names, plate_directory)
+                for plate_directory, _ in plates
+            ]
+        )
+
+        filenames = [
+            plate_directory / image_name
+            for (plate_directory, _), image_names in zip(plates, image_name_lists)
+            for image_name in image_names
+        ]
+
+        probe_results = iter(
+            await probe_image_sizes_parallel(self.__executors, filenames)
+        )
+
+        crystal_well_models: List[CrystalWellModel] = []
+        for (plate_directory, crystal_plate_model), image_names in zip(
+            plates, image_name_lists
+        ):
+            crystal_plate_object = CrystalPlateObjects().build_object(
+                {"type": crystal_plate_model.thing_type}
+            )
+            for image_name in image_names:
+                width, height, error = next(probe_results)
+                crystal_well_models.append(
+                    CrystalWellModel(
+                        position=crystal_plate_object.normalize_subwell_name(
+                            Path(image_name).stem
+                        ),
+                        filename=str(plate_directory / image_name),
+                        crystal_plate_uuid=crystal_plate_model.uuid,
+                        error=error,
+                        width=width,
+                        height=height,
+                    )
+                )
+
+        return crystal_well_models
+
+
+# ------------------------------------------------------------------------------------------
+async def reindex_visits(type_specific_tbd: Dict) -> Dict:
+    """
+    Reindex the visits of a DirectPoll collector without running the collector.
+
+    Opens its own connections to xchembku and Formulatrix, as given in the collector's settings.
+
+    Args:
+        type_specific_tbd (Dict): the DirectPoll collector's settings
+
+    Returns:
+        Dict: the report from Reindexer.run()
+    """
+
+    s = "reindex collector type_specific_tbd"
+
+    xchembku_client_context = XchembkuDatafaceClientContext(
+        require(s, type_specific_tbd, "xchembku_dataface_specification")
+    )
+
+    executors = Executors(type_specific_tbd.get("executors_specification"))
+
+    async with xchembku_client_context:
+        async with FtrixClientContext(
+            require(s, type_specific_tbd, "ftrix_client_specification")
+        ) as ftrix_client:
+            xchembku = xchembku_client_context.get_interface()
+            reindexer = Reindexer(
+                require(s, type_specific_tbd, "visits_directory"),
+                require(s, type_specific_tbd, "visit_plates_subdirectory"),
+                xchembku,
+                PlateInjector(ftrix_client, xchembku),
+                executors,
+                type_specific_tbd.get("reindex_specification"),
+            )
+            try:
+                return await reindexer.run()
+            finally:
+                executors.shutdown()
@@ -0,0 +1,259 @@
+import contextlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+# Counters, gauges and latencies for the metrics endpoint.
+from rockingester_lib.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+
+class Stages:
+    # Finding the plate model in the cache, xchembku or Formulatrix.
+    FIND_BARCODE = "find_barcode"
+    # The parts of finding the barcode, timed by the plate injector.
+    FETCH_XCHEMBKU_PLATE = "fetch_xchembku_plate"
+    QUERY_FTRIX = "query_ftrix"
+    INJECT_PLATE = "inject_plate"
+    # Recording in xchembku where the plate is collected from.
+    RECORD_STEM = "record_stem"
+    # Listing and stat of the images in the plate directory.
+    SCAN = "scan"
+    # Reading the image sizes and making the well models.
+    INGEST_WELLS = "ingest_wells"
+    # Upserting the well models into xchembku.
+    UPSERT_WELLS = "upsert_wells"
+    # Copying the images to the visit.
+    COPY = "copy"
+
+
+# Stages which are timed inside another stage, so are not counted again in the busy time.
+NESTED_STAGES = (Stages.FETCH_XCHEMBKU_PLATE, Stages.QUERY_FTRIX, Stages.INJECT_PLATE)
+
+
+# ------------------------------------------------------------------------------------------
+@contextlib.contextmanager
+def span(plate_timer: Optional["PlateTimer"], stage: str) -> Iterator[None]:
+    """
+    Time the enclosed block as a stage of the plate, or do nothing if there is no plate timer.
+    """
+
+    if plate_timer is None:
+        yield
+        return
+
+    with plate_timer.span(stage):
+        yield
+
+
+class PlateTimer:
+    """
+    Time spent in each stage of ingesting one plate.
+
+    A plate may be scraped many times before it is finished,
+    so the time of each stage is summed over all the scrapes.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(self, plate_name: str):
+        self.__plate_name = plate_name
+        self.__created_time = time.time()
+        self.__scrape_count = 0
+        self.__seconds: Dict[str, float] = {}
+
+    # ----------------------------------------------------------------------------------------
+    def plate_name(self) -> str:
+        return self.__plate_name
+
+    # ----------------------------------------------------------------------------------------
+    def count_scrape(self) -> None:
+        self.__scrape_count += 1
+
+    # ----------------------------------------------------------------------------------------
+    @contextlib.contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """
+        Time the enclosed block, adding it to the stage, even if it raises.
+        """
+
+        time0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - time0)
+
+    # ----------------------------------------------------------------------------------------
+    def add(self, stage: str, seconds: float) -> None:
+        self.__seconds[stage] = self.__seconds.get(stage, 0.0) + seconds
+
+    # ----------------------------------------------------------------------------------------
+    def stages(self) -> Dict[str, float]:
+        return dict(self.__seconds)
+
+    # ----------------------------------------------------------------------------------------
+    def summary(self, state: str) -> Dict:
+        """
+        The plate's timings, suitable for logging or writing to the trace file.
+
+        The busy time is the sum of the outermost stages, see NESTED_STAGES.
+        """
+
+        return {
+            "plate_name": self.__plate_name,
+            "state": state,
+            "finished_on": time.time(),
+            "elapsed_seconds": time.time() - self.__created_time,
+            "scrape_count": self.__scrape_count,
+            "busy_seconds": sum(
+                seconds
+                for stage, seconds in self.__seconds.items()
+                if stage not in NESTED_STAGES
+            ),
+            "stages": self.stages(),
+        }
+
+
+class StageTimings:
+    """
+    Plate timers of the plates being ingested, and rolling histograms of each stage.
+
+    When a plate is finished, a single summary line of its stage timings is logged,
+    each stage is recorded in its histogram,
+    and, if a trace filename is configured, the summary is appended to it as a json line.
+
+    The histograms are latency recorders kept in the metrics, named stage_<stage>,
+    so their percentiles are over the most recent plates.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    def __init__(
+        self, specification: Optional[Dict] = None, metrics: Optional[Metrics] = None
+    ):
+        """
+        Constructor.
+
+        Args:
+            specification (Optional[Dict]): may contain
+                "trace_filename", file to append each finished plate's timings to, as json lines.
+            metrics (Optional[Metrics]): where to keep the histograms, a new one if not given.
+        """
+
+        if specification is None:
+            specification = {}
+
+        self.__trace_filename = specification.get("trace_filename")
+
+        if metrics is None:
+            metrics = Metrics()
+        self.__metrics = metrics
+
+        self.__plate_timers: Dict[str, PlateTimer] = {}
+
+        # Summaries may be written from several executor threads.
+        self.__lock = threading.Lock()
+
+    # ----------------------------------------------------------------------------------------
+    def plate_timer(self, plate_name: str) -> PlateTimer:
+        """
+        The timer of the plate, started if it is not being timed yet.
+        """
+
+        plate_timer = self.__plate_timers.get(plate_name)
+        if plate_timer is None:
+            plate_timer = PlateTimer(plate_name)
+            self.__plate_timers[plate_name] = plate_timer
+
+        return plate_timer
+
+    # ----------------------------------------------------------------------------------------
+    def discard(self, plate_name: str) -> None:
+        """
+        Stop timing a plate without reporting it, for example when its directory has gone.
+        """
+
+        self.__plate_timers.pop(plate_name, None)
+
+    # ----------------------------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.__plate_timers)
+
+    # ----------------------------------------------------------------------------------------
+    def finish(self, plate_name: str, state: str) -> Optional[Dict]:
+        """
+        Blocking report of a finished plate's timings, if it was being timed.
+
+        Returns:
+            Optional[Dict]: the plate's summary, or None if it was not being timed
+        """
+
+        plate_timer = self.__plate_timers.pop(plate_name, None)
+        if plate_timer is None:
+            return None
+
+        summary = plate_timer.summary(state)
+
+        for stage, seconds in summary["stages"].items():
+            self.__metrics.latency_recorder(f"stage_{stage}").record(seconds)
+
+        stages = " ".join(
+            f"{stage}={'%0.3f' % seconds}"
+            for stage, seconds in summary["stages"].items()
+        )
+        logger.info(
+            f"[PLATETIME] plate {plate_name} {state}"
+            f" elapsed={'%0.3f' % summary['elapsed_seconds']}"
+            f" busy={'%0.3f' % summary['busy_seconds']}"
+            f" scrapes={summary['scrape_count']} {stages}"
+        )
+
+        if self.__trace_filename is not None:
+            self.__write_trace(summary)
+
+        return summary
+
+    # ----------------------------------------------------------------------------------------
+    def histograms(self) -> Dict[str, Dict]:
+        """
+        Report of each stage's histogram, keyed by stage.
+        """
+
+        histograms = {}
+        for name in self.__metrics.latency_recorder_names():
+            if name.startswith("stage_"):
+                histograms[name[len("stage_") :]] = self.__metrics.latency_recorder(
+                    name
+                ).report()
+
+        return histograms
+
+    # ----------------------------------------------------------------------------------------
+    def dump_histograms(self) -> None:
+        """
+        Blocking append of the stage histograms to the trace file, if one is configured.
+        """
+
+        if self.__trace_filename is None:
+            return
+
+        self.__write_trace({"dumped_on": time.time(), "histograms": self.histograms()})
+
+    # ----------------------------------------------------------------------------------------
+    def __write_trace(self, record: Dict) -> None:
+        trace_filename = self.__trace_filename
+        if trace_filename is None:
+            return
+
+        try:
+            with self.__lock:
+                Path(trace_filename).parent.mkdir(parents=True, exist_ok=True)
+                with open(trace_filename, "a") as stream:
+                    stream.write(json.dumps(record) + "\n")
+        except Exception as exception:
+            # The trace is only for looking at later, so don't stop the ingest over it.
+            logger.warning(
+                f"[PLATETIME] unable to write trace file {trace_filename}: {exception}"
+            )
@@ -0,0 +1,133 @@
+import io
+import logging
+from pathlib import Path
+
+from dls_utilpack.visit import get_xchem_subdirectory
+
+# Ingests a backlog of plates as fast as possible.
+from rockingester_lib.backfill import Backfill
+
+# Object able to talk to the formulatrix database.
+from rockingester_lib.ftrix_client import FtrixClientContext
+
+# Generator of the SQLite stand-in for the Formulatrix database.
+from rockingester_lib.ftrix_sqlite import generate
+
+# Something writing plate directories like a Rockmaker imager does.
+from rockingester_lib.imager_simulator import ImagerSimulator
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestBackfill:
+    """
+    Test the backfill.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        BackfillTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class BackfillTester(Base):
+    """
+    Test a backlog of plates is ingested, and a second run resumes from the checkpoint.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        output_directory = Path(output_directory)
+        visits_directory = output_directory / "visits"
+        plates_directory = output_directory / "SubwellImages"
+
+        # Formulatrix stand-in, and the visit of each plate.
+        ftrix_filename = str(output_directory / "ftrix.sqlite")
+        summary = generate(ftrix_filename, 20)
+        barcodes = summary["xchem_barcodes"][0:6]
+        ftrix_client_specification = {
+            "mssql": {"server": "sqlite", "database": ftrix_filename}
+        }
+        async with FtrixClientContext(ftrix_client_specification) as ftrix_client:
+            records = await ftrix_client.query_barcodes(barcodes)
+        for record in records.values():
+            visit_directory = visits_directory / get_xchem_subdirectory(
+                record["formulatrix__experiment__name"]
+            )
+            visit_directory.mkdir(parents=True, exist_ok=True)
+
+        type_specific_tbd = {
+            "plates_directories": [str(plates_directory)],
+            "visits_directory": str(visits_directory),
+            "visit_plates_subdirectory": "processing/rockingester",
+            "max_wait_seconds": 60.0,
+            "xchembku_dataface_specification": {
+                "type": "xchembku_lib.xchembku_datafaces.direct",
+                "database": {
+                    "type": "dls_normsql.aiosqlite",
+                    "filename": str(output_directory / "xchembku.sqlite"),
+                    "log_level": "WARNING",
+                },
+            },
+            "ftrix_client_specification": ftrix_client_specification,
+        }
+
+        checkpoint_filename = str(output_directory / "backfill_journal.sqlite")
+
+        # The backlog.
+        await self.__write_plates(plates_directory, barcodes[0:5])
+
+        progress_stream = io.StringIO()
+        report = await Backfill(
+            type_specific_tbd,
+            {
+                "workers": 2,
+                "lookup_batch": 2,
+                "checkpoint_filename": checkpoint_filename,
+                "progress_stream": progress_stream,
+            },
+        ).run()
+        logger.debug(f"backfill report {report}")
+
+        assert report["plate_count"] == 5
+        assert report["already_finished_count"] == 0
+        assert report["ingested_count"] == 5
+        assert report["well_count"] == 5 * 288
+        assert report["failed_count"] == 0
+        assert report["plates_per_minute"] > 0
+        assert "5/5 plates" in progress_stream.getvalue()
+
+        copied = list(visits_directory.glob("*/*/processing/rockingester/*/*.jpg"))
+        assert len(copied) == 5 * 288
+
+        # One more plate arrives, and only that one is ingested on the next run.
+        await self.__write_plates(plates_directory, barcodes[5:6])
+
+        report = await Backfill(
+            type_specific_tbd,
+            {"checkpoint_filename": checkpoint_filename},
+        ).run()
+
+        assert report["plate_count"] == 6
+        assert report["already_finished_count"] == 5
+        assert report["ingested_count"] == 1
+
+    # ----------------------------------------------------------------------------------------
+    async def __write_plates(self, plates_directory, barcodes):
+        await ImagerSimulator(
+            {
+                "plates_directory": str(plates_directory),
+                "barcodes": barcodes,
+                "plates_per_minute": 6000.0,
+                "image_bytes": 1024,
+            }
+        ).run()
@@ -3,6 +3,7 @@ import logging
 import time
 from pathlib import Path
 
+import aiohttp
 from dls_utilpack.visit import get_xchem_subdirectory
 
 # Things xchembku provides.
@@ -12,6 +13,7 @@ from xchembku_api.models.crystal_plate_filter_model import CrystalPlateFilterMod
 from xchembku_lib.datafaces.context import Context as XchembkuDatafaceServerContext
 
 # Client context creator.
+from rockingester_api.collectors.collectors import rockingester_collectors_get_default
 from rockingester_api.collectors.context import Context as CollectorClientContext
 
 # Server context creator.
@@ -51,6 +53,20 @@ class TestCollectorServiceSqlite:
         CollectorTester().main(constants, configuration_file, output_directory)
 
 
+# ----------------------------------------------------------------------------------------
+class TestCollectorServiceInotifySqlite:
+    """
+    Test inotify-driven collector interface through network interface.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/service_inotify_sqlite.yaml"
+
+        CollectorTester().main(constants, configuration_file, output_directory)
+
+
 # ----------------------------------------------------------------------------------------
 class TestCollectorServiceMysql:
     """
@@ -116,6 +132,9 @@ class CollectorTester(Base):
         collector_client_context = CollectorClientContext(collector_specification)
 
         # Remember the collector specification so we can assert some things later.
+        self.__collector_client_url = collector_specification["type_specific_tbd"][
+            "aiohttp_specification"
+        ]["client"]
         self.__visits_directory = Path(multiconf_dict["visits_directory"])
         self.__visit_plates_subdirectory = Path(
             multiconf_dict["visit_plates_subdirectory"]
@@ -286,6 +305,23 @@ class CollectorTester(Base):
             count == scrapable_image_count
         ), f"ingested_directory images {str(rockingester_directory)}"
 
+        # The metrics count the ingested plate, through protocolj and for Prometheus to scrape.
+        metrics = await rockingester_collectors_get_default().report_metrics()
+        assert "rockingester_plates_ingested_total 1.0" in metrics
+        assert (
+            f"rockingester_wells_ingested_total {float(scrapable_image_count)}"
+            in metrics
+        )
+        async with aiohttp.ClientSession() as session:
+            async with session.get(
+                f"{self.__collector_client_url}/metrics"
+            ) as response:
+                assert response.status == 200
+                text = await response.text()
+        assert "# TYPE rockingester_tick_seconds summary" in text
+        assert "rockingester_xchembku_call_seconds_count" in text
+        assert "rockingester_stage_copy_seconds_count 1" in text
+
     # ----------------------------------------------------------------------------------------
 
     async def __run_part2(self, scrapable_image_count, constants, output_directory):
@@ -299,6 +335,13 @@ class CollectorTester(Base):
 
         assert len(records) == scrapable_image_count, "images after restarting scraper"
 
+        # Reindexing the visits through the service finds the same wells without duplicating them.
+        report = await rockingester_collectors_get_default().reindex()
+        assert report["plate_count"] == 1
+        assert report["well_count"] == scrapable_image_count
+        records = await xchembku.fetch_crystal_wells_filenames()
+        assert len(records) == scrapable_image_count, "images after reindexing"
+
     # ----------------------------------------------------------------------------------------
 
     def __subwell_filename(self, barcode, index):
@@ -0,0 +1,92 @@
+import logging
+import sqlite3
+import threading
+
+import pytest
+
+# Pool of reusable database connections.
+from rockingester_lib.connection_pool import ConnectionPool
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestConnectionPool:
+    """
+    Test the connection pool.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        ConnectionPoolTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class ConnectionPoolTester(Base):
+    """
+    Test reuse, the maximum size, health checks and replacement of broken connections.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        def factory():
+            return sqlite3.connect(":memory:", check_same_thread=False)
+
+        connection_pool = ConnectionPool(
+            factory,
+            {"max_size": 2, "acquire_timeout_seconds": 0.2, "health_check_seconds": 0},
+        )
+
+        # Connections are reused.
+        with connection_pool.connection() as connection1:
+            connection1.execute("SELECT 1")
+        with connection_pool.connection() as connection2:
+            pass
+        assert connection2 is connection1
+        assert connection_pool.created_count() == 1
+
+        # No more than max_size at once.
+        connection1 = connection_pool.acquire()
+        connection2 = connection_pool.acquire()
+        assert connection_pool.size() == 2
+        with pytest.raises(TimeoutError):
+            connection_pool.acquire()
+
+        # A waiting acquire gets the connection when it is released.
+        acquired = []
+        thread = threading.Thread(
+            target=lambda: acquired.append(connection_pool.acquire())
+        )
+        thread.start()
+        connection_pool.release(connection2)
+        thread.join()
+        assert acquired == [connection2]
+        connection_pool.release(connection2)
+
+        # A connection which fails its health check is replaced.
+        connection2.close()
+        connection3 = connection_pool.acquire()
+        assert connection3 is not connection2
+        assert connection_pool.created_count() == 3
+        connection_pool.release(connection3)
+
+        # An error while using a connection means it isn't reused.
+        with pytest.raises(sqlite3.OperationalError):
+            with connection_pool.connection() as connection4:
+                connection4.execute("SELECT nonsense FROM nowhere")
+        assert connection_pool.size() == 1
+
+        # Closing the pool closes connections as they come back.
+        connection_pool.close()
+        connection_pool.release(connection1)
+        assert connection_pool.size() == 0
+        with pytest.raises(RuntimeError):
+            connection_pool.acquire()
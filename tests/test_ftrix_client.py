@@ -1,3 +1,4 @@
+import copy
 import logging
 
 from rockingester_lib.ftrix_client import FtrixClientContext
@@ -56,3 +57,98 @@ class FtrixClientTester(Base):
 
         record = await ftrix_client.query_barcode("zz00")
         assert record is None
+
+        # Each query has its time recorded.
+        report = ftrix_client.latency_recorder().report()
+        assert report["count"] == 2
+        assert report["error_count"] == 0
+        assert report["max_seconds"] >= report["p50_seconds"]
+
+        # Many barcodes in one query, those not found are left out.
+        records = await ftrix_client.query_barcodes(["98ab", "98ad", "zz00"])
+        assert sorted(records.keys()) == ["98ab", "98ad"]
+        assert records["98ad"]["formulatrix__plate__id"] == 11
+
+        # The single barcode query is still there for older callers.
+        record = await ftrix_client.query_barcode_dummy("98ad")
+        assert record["formulatrix__plate__id"] == 11
+
+
+# ----------------------------------------------------------------------------------------
+class TestFtrixClientMirror:
+    """
+    The ftrix client class with a local mirror of the plates.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        FtrixClientMirrorTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class FtrixClientMirrorTester(Base):
+    """
+    Test lookups are served from the mirror, and fall back to the database.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        # Get the multiconf from the testing configuration yaml.
+        multiconf = self.get_multiconf()
+
+        # Load the multiconf into a dict.
+        multiconf_dict = await multiconf.load()
+
+        # Enable the mirror, but don't let the background sync interfere.
+        ftrix_client_specification = copy.deepcopy(
+            multiconf_dict["ftrix_client_specification"]
+        )
+        ftrix_client_specification["mirror_specification"] = {
+            "sync_seconds": 3600,
+            "batch_size": 1,
+        }
+
+        ftrix_client_context = FtrixClientContext(ftrix_client_specification)
+
+        async with ftrix_client_context as ftrix_client:
+            await self.__run_the_test(ftrix_client, ftrix_client_specification)
+
+    # ----------------------------------------------------------------------------------------
+
+    async def __run_the_test(self, ftrix_client, ftrix_client_specification):
+        """ """
+
+        mirror = ftrix_client.mirror()
+
+        # Batches of one, so more than one query is needed.
+        count = await ftrix_client.sync_mirror(is_full=True)
+        assert count == 2
+        assert len(mirror) == 2
+        assert mirror.high_water_id() == 11
+        assert mirror.is_synced()
+
+        # Found in the mirror, so the database is not queried.
+        records = await ftrix_client.query_barcodes(["98ab", "98ad"])
+        assert sorted(records.keys()) == ["98ab", "98ad"]
+        assert ftrix_client.latency_recorder().report()["count"] == 0
+
+        # Add a plate to the database after the sync.
+        mssql = ftrix_client_specification["mssql"]
+        mssql[mssql["database"]].append([12, "98ae", "cm00001-1_new", "SWISSci_3Drop"])
+
+        # Not in the mirror, so looked up in the database and kept.
+        record = await ftrix_client.query_barcode("98ae")
+        assert record["formulatrix__plate__id"] == 12
+        assert ftrix_client.latency_recorder().report()["count"] == 1
+        assert len(mirror) == 3
+
+        # Live lookups don't move the high-water mark, the next sync does.
+        assert mirror.high_water_id() == 11
+        count = await ftrix_client.sync_mirror()
+        assert count == 1
+        assert mirror.high_water_id() == 12
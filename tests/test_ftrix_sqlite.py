@@ -0,0 +1,83 @@
+import logging
+from pathlib import Path
+
+from rockingester_lib.ftrix_client import FtrixClientContext
+
+# Generator of the SQLite stand-in for the Formulatrix database.
+from rockingester_lib.ftrix_sqlite import generate
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestFtrixSqlite:
+    """
+    The ftrix client against the SQLite stand-in.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        FtrixSqliteTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class FtrixSqliteTester(Base):
+    """
+    Test the real query finds generated plates.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        filename = str(Path(output_directory) / "ftrix_stand_in.sqlite")
+
+        summary = generate(filename, 5000, seed=1)
+        assert summary["plate_count"] == 5000
+        assert 0 < summary["xchem_plate_count"] < 5000
+
+        ftrix_client_specification = {
+            "mssql": {"server": "sqlite", "database": filename},
+            "query_chunk_size": 64,
+            "mirror_specification": {"sync_seconds": 3600, "batch_size": 1000},
+        }
+
+        ftrix_client_context = FtrixClientContext(ftrix_client_specification)
+
+        async with ftrix_client_context as ftrix_client:
+            await self.__run_the_test(ftrix_client, summary)
+
+    # ----------------------------------------------------------------------------------------
+
+    async def __run_the_test(self, ftrix_client, summary):
+        """ """
+
+        xchem_barcodes = summary["xchem_barcodes"]
+
+        # Barcodes compare case-insensitively, as in RockMaker.
+        record = await ftrix_client.query_barcode(xchem_barcodes[0].upper())
+        assert record["barcode"] == xchem_barcodes[0]
+        assert record["formulatrix__experiment__name"].endswith("_generated")
+        assert record["plate_type"] in ["SWISSci_3Drop", "SWISSci_3drop"]
+
+        # Many barcodes, in several chunks, plus some not made at all.
+        barcodes = xchem_barcodes[0:300] + ["!!!!", "####"]
+        records = await ftrix_client.query_barcodes(barcodes)
+        assert sorted(records.keys()) == sorted(xchem_barcodes[0:300])
+
+        # Plates outside XChem, or of other plate types, are never found.
+        all_records = await ftrix_client.query_plates_after(0, 10000)
+        assert len(all_records) == summary["xchem_plate_count"]
+        ids = [record["formulatrix__plate__id"] for record in all_records]
+        assert ids == sorted(ids)
+
+        # The mirror syncs in batches.
+        count = await ftrix_client.sync_mirror(is_full=True)
+        assert count == summary["xchem_plate_count"]
+        assert ftrix_client.mirror().high_water_id() == ids[-1]
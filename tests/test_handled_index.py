@@ -0,0 +1,56 @@
+import logging
+
+# Set of plates which have been finished with.
+from rockingester_lib.handled_index import HandledIndex
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestHandledIndex:
+    """
+    Test the handled index.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        HandledIndexTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class HandledIndexTester(Base):
+    """
+    Test membership and pruning in each mode.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        for mode in ["set", "hashed"]:
+            handled_index = HandledIndex({"mode": mode})
+
+            names = [f"98{i:02x}_2023-04-06_RI1000-0276-3drop" for i in range(100)]
+            handled_index.update(names[:50])
+            handled_index.add(names[50])
+            assert len(handled_index) == 51, mode
+
+            for name in names[:51]:
+                assert name in handled_index, (mode, name)
+            for name in names[51:]:
+                assert name not in handled_index, (mode, name)
+
+            handled_index.discard(names[50])
+            assert names[50] not in handled_index, mode
+
+            # Keep only the names still on disk.
+            assert handled_index.retain(names[40:]) == 40, mode
+            assert len(handled_index) == 10, mode
+            assert names[0] not in handled_index, mode
+            assert names[45] in handled_index, mode
@@ -0,0 +1,89 @@
+import logging
+from pathlib import Path
+
+from PIL import Image
+
+# Pools for running blocking work off the event loop.
+from rockingester_lib.executors import Executors
+
+# Fast image width/height reading.
+from rockingester_lib.image_probe import probe_image_size, probe_image_sizes_parallel
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestImageProbe:
+    """
+    Test the image dimension prober.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        ImageProbeTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class ImageProbeTester(Base):
+    """
+    Test reading image sizes from headers, with PIL fallback and errors.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        output_directory = Path(output_directory)
+
+        # Images in the formats which are read from their headers, plus one which falls back to PIL.
+        expected = {
+            "baseline.jpg": ((123, 45), {"format": "JPEG"}),
+            "progressive.jpg": ((67, 89), {"format": "JPEG", "progressive": True}),
+            "rgb.png": ((320, 240), {"format": "PNG"}),
+            "fallback.gif": ((11, 22), {"format": "GIF"}),
+        }
+        for name, (size, save_kwargs) in expected.items():
+            image = Image.new("RGB", size)
+            image.save(output_directory / name, **save_kwargs)
+
+        # A JPEG with an EXIF segment before the frame.
+        image = Image.new("RGB", (640, 480))
+        exif = Image.Exif()
+        exif[0x010E] = "x" * 1000
+        image.save(output_directory / "exif.jpg", format="JPEG", exif=exif)
+        expected["exif.jpg"] = ((640, 480), {})
+
+        for name, (size, _) in expected.items():
+            assert probe_image_size(output_directory / name) == size, name
+
+        # An empty file, like the ones the collector tests write.
+        (output_directory / "empty.jpg").write_bytes(b"")
+
+        executors = Executors({"thread_workers": 3})
+        try:
+            filenames = [output_directory / name for name in expected.keys()]
+            filenames.append(output_directory / "empty.jpg")
+            filenames.append(output_directory / "missing.jpg")
+
+            results = await probe_image_sizes_parallel(executors, filenames)
+        finally:
+            executors.shutdown()
+
+        assert len(results) == len(filenames)
+        for name, result in zip(expected.keys(), results):
+            assert result == (*expected[name][0], None), name
+
+        # Errors are reported in the result, not raised.
+        width, height, error = results[-2]
+        assert width is None and height is None
+        assert "cannot identify image file" in error
+
+        width, height, error = results[-1]
+        assert width is None and height is None
+        assert "No such file" in error
@@ -0,0 +1,136 @@
+import logging
+from pathlib import Path
+
+import pytest
+
+# Pretend Rockmaker imager.
+from rockingester_lib.imager_simulator import ImagerSimulator
+
+# Measures ingest speed with simulated imagers.
+from rockingester_lib.ingest_benchmark import IngestBenchmark
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestIngestBenchmark:
+    """
+    Test the ingest benchmark.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        IngestBenchmarkTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class IngestBenchmarkTester(Base):
+    """
+    Test a small benchmark ingests every plate and reports on it.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        specification = {
+            "directory": str(Path(output_directory) / "benchmark"),
+            "plate_count": 2,
+            "imager_count": 2,
+            "timeout_seconds": 30.0,
+            "imager_specification": {
+                "plates_per_minute": 120.0,
+                "image_bytes": 1024,
+            },
+            "collector_settings": {"tick_seconds": 0.5},
+        }
+
+        report = await IngestBenchmark(specification).run()
+
+        logger.debug(f"benchmark report {report}")
+
+        assert report["plate_count"] == 4
+        assert report["ingested_count"] == 4
+        assert report["plates_per_minute"] > 0
+        assert report["latency_p95_seconds"] >= report["latency_p50_seconds"]
+        assert report["peak_rss_megabytes"] > 0
+
+        # The images were copied to the visits.
+        copied = list(
+            (Path(output_directory) / "benchmark" / "visits").glob(
+                "*/*/processing/rockingester/*/*.jpg"
+            )
+        )
+        assert len(copied) == 4 * 288
+
+
+# ----------------------------------------------------------------------------------------
+class TestImagerSimulator:
+    """
+    Test the imager simulator.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        ImagerSimulatorTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class ImagerSimulatorTester(Base):
+    """
+    Test the plates take the configured plate types in turn.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        plates_directory = Path(output_directory) / "SubwellImages"
+
+        imager = ImagerSimulator(
+            {
+                "plates_directory": str(plates_directory),
+                "barcodes": ["98ab", "98ac", "98ad"],
+                "plates_per_minute": 6000.0,
+                "plate_types": ["3drop", "2drop"],
+                "image_bytes": 1024,
+            }
+        )
+
+        await imager.run()
+
+        assert imager.plate_names() == [
+            "98ab_2023-04-06_RI1000-0276-3drop",
+            "98ac_2023-04-06_RI1000-0276-2drop",
+            "98ad_2023-04-06_RI1000-0276-3drop",
+        ]
+
+        image_counts = imager.image_counts()
+        assert image_counts["98ac_2023-04-06_RI1000-0276-2drop"] == 192
+        for plate_name, image_count in image_counts.items():
+            assert (
+                len(list((plates_directory / plate_name).glob("*.jpg"))) == image_count
+            )
+
+        # The last well of a 2drop plate.
+        assert (
+            plates_directory / "98ac_2023-04-06_RI1000-0276-2drop" / "98ac_12H_2.jpg"
+        ).is_file()
+
+        with pytest.raises(RuntimeError):
+            ImagerSimulator(
+                {
+                    "plates_directory": str(plates_directory),
+                    "barcodes": [],
+                    "plate_types": ["4drop"],
+                }
+            )
@@ -0,0 +1,127 @@
+import logging
+from pathlib import Path
+
+import pytest
+
+# Collector which polls the plates directories.
+from rockingester_lib.collectors.direct_poll import DirectPoll
+
+# On-disk record of each plate's ingestion state.
+from rockingester_lib.ingest_journal import IngestJournal, JournalStates
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestIngestJournal:
+    """
+    Test the ingest journal.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        IngestJournalTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class IngestJournalTester(Base):
+    """
+    Test plate states are written and read back by a later journal on the same file.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        filename = str(Path(output_directory) / "journal" / "journal.sqlite")
+
+        ingest_journal = IngestJournal(filename)
+        assert ingest_journal.open() == {}
+        try:
+            assert ingest_journal.record("98ab_1", JournalStates.SEEN)
+            assert ingest_journal.record("98ab_1", JournalStates.WAITING)
+            # Same state again doesn't count as a change.
+            assert not ingest_journal.record("98ab_1", JournalStates.WAITING)
+            assert ingest_journal.state("98ab_1") == JournalStates.WAITING
+
+            ingest_journal.record("98ac_1", JournalStates.UPSERTED)
+            ingest_journal.record("98ac_1", JournalStates.COPIED)
+            ingest_journal.record("98ad_1", JournalStates.ERROR, "bad visit")
+            ingest_journal.record_cursor("/plates", "98ac_1")
+            ingest_journal.record_checksums(
+                "98ac_1",
+                {
+                    "98ac_01A_1.jpg": {
+                        "byte_count": 100,
+                        "algorithm": "blake2b",
+                        "digest": "aa",
+                    },
+                    "98ac_02A_1.jpg": {
+                        "byte_count": 200,
+                        "algorithm": "blake2b",
+                        "digest": "bb",
+                    },
+                },
+            )
+            # Finished plates are not kept in memory.
+            assert ingest_journal.state("98ac_1") is None
+            assert ingest_journal.state("98ad_1") is None
+        finally:
+            ingest_journal.close()
+
+        # A new journal, like after a restart, loads all the states.
+        ingest_journal = IngestJournal(filename)
+        try:
+            assert ingest_journal.open() == {
+                "98ab_1": JournalStates.WAITING,
+                "98ac_1": JournalStates.COPIED,
+                "98ad_1": JournalStates.ERROR,
+            }
+            assert ingest_journal.state("98ab_1") == JournalStates.WAITING
+            assert ingest_journal.state("98ac_1") is None
+            assert ingest_journal.cursor("/plates") == "98ac_1"
+            assert ingest_journal.cursor("/other") is None
+            checksums = ingest_journal.checksums("98ac_1")
+            assert sorted(checksums.keys()) == ["98ac_01A_1.jpg", "98ac_02A_1.jpg"]
+            assert checksums["98ac_02A_1.jpg"] == {
+                "byte_count": 200,
+                "algorithm": "blake2b",
+                "digest": "bb",
+            }
+            assert ingest_journal.checksums("98ab_1") == {}
+        finally:
+            ingest_journal.close()
+
+        # Without a filename, states are only kept in memory.
+        ingest_journal = IngestJournal()
+        assert ingest_journal.open() == {}
+        ingest_journal.record("98ab_1", JournalStates.SEEN)
+        assert ingest_journal.state("98ab_1") == JournalStates.SEEN
+        ingest_journal.record_checksums(
+            "98ab_1",
+            {"a.jpg": {"byte_count": 1, "algorithm": "blake2b", "digest": "cc"}},
+        )
+        assert ingest_journal.checksums("98ab_1") == {}
+        ingest_journal.close()
+
+        # So checksums are never made for nothing, they need a journal file.
+        with pytest.raises(RuntimeError, match="no journal_filename"):
+            DirectPoll(
+                {
+                    "type": "rockingester_lib.collectors.direct_poll",
+                    "type_specific_tbd": {
+                        "plates_directories": [str(output_directory)],
+                        "visits_directory": str(output_directory),
+                        "visit_plates_subdirectory": "processing/rockingester",
+                        "max_wait_seconds": 0.0,
+                        "plate_copier_specification": {"checksum": True},
+                        "ftrix_client_specification": {"type": "dummy"},
+                    },
+                }
+            )
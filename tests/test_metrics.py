@@ -0,0 +1,83 @@
+import logging
+
+# Counters, gauges and latencies for the metrics endpoint.
+from rockingester_lib.metrics import Metrics, TimedProxy
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestMetrics:
+    """
+    Test the metrics.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        MetricsTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class Dataface:
+    """
+    Something with coroutine methods for the proxy to time.
+    """
+
+    async def fetch(self, value):
+        return value
+
+    async def fail(self):
+        raise RuntimeError("failed on purpose")
+
+    def name(self):
+        return "dataface"
+
+
+# ----------------------------------------------------------------------------------------
+class MetricsTester(Base):
+    """
+    Test the Prometheus text rendering, and timing calls through the proxy.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        metrics = Metrics()
+        metrics.describe("plates_ingested", "Plates whose images were all copied.")
+
+        metrics.increment("plates_ingested")
+        metrics.increment("plates_ingested", 2)
+        metrics.set_gauge("pending_plates", 5)
+        assert metrics.counter("plates_ingested") == 3.0
+        assert metrics.gauge("pending_plates") == 5
+
+        # Calls through the proxy are timed, errors included.
+        proxy = TimedProxy(Dataface(), metrics.latency_recorder("dataface_call"))
+        assert await proxy.fetch(7) == 7
+        try:
+            await proxy.fail()
+            raise AssertionError("expected the call to fail")
+        except RuntimeError:
+            pass
+        # Plain methods are passed through untimed.
+        assert proxy.name() == "dataface"
+
+        text = metrics.render()
+        logger.debug(f"metrics\n{text}")
+
+        lines = text.splitlines()
+        assert "# HELP rockingester_plates_ingested_total" in text
+        assert "# TYPE rockingester_plates_ingested_total counter" in lines
+        assert "rockingester_plates_ingested_total 3.0" in lines
+        assert "# TYPE rockingester_pending_plates gauge" in lines
+        assert "rockingester_pending_plates 5" in lines
+        assert "# TYPE rockingester_dataface_call_seconds summary" in lines
+        assert "rockingester_dataface_call_seconds_count 2" in lines
+        assert "rockingester_dataface_call_errors_total 1" in lines
@@ -0,0 +1,72 @@
+import logging
+
+# Barcodes not found in Formulatrix, with when to look again.
+from rockingester_lib.negative_cache import NegativeCache
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestNegativeCache:
+    """
+    Test the negative cache.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        NegativeCacheTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class NegativeCacheTester(Base):
+    """
+    Test the backoff grows and is capped.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        negative_cache = NegativeCache(
+            {"initial_seconds": 10.0, "max_seconds": 35.0, "backoff_factor": 2.0}
+        )
+
+        # Unknown barcodes are always due.
+        assert "98ab" not in negative_cache
+        assert negative_cache.next_check_time("98ab") is None
+        assert negative_cache.is_due("98ab", now=0.0)
+
+        # Each miss doubles the wait, up to the maximum.
+        assert negative_cache.record_miss("98ab", now=100.0) == 110.0
+        assert not negative_cache.is_due("98ab", now=109.0)
+        assert negative_cache.is_due("98ab", now=110.0)
+        assert negative_cache.record_miss("98ab", now=110.0) == 130.0
+        assert negative_cache.record_miss("98ab", now=130.0) == 165.0
+        assert negative_cache.record_miss("98ab", now=165.0) == 200.0
+        assert negative_cache.next_check_time("98ab") == 200.0
+        assert len(negative_cache) == 1
+
+        # Once found, the barcode is forgotten.
+        negative_cache.discard("98ab")
+        assert "98ab" not in negative_cache
+        assert negative_cache.is_due("98ab", now=0.0)
+        assert len(negative_cache) == 0
+
+        # After enough misses, or long enough since the first, the barcode is given up on.
+        negative_cache = NegativeCache(
+            {"initial_seconds": 10.0, "max_misses": 3, "max_age_seconds": 100.0}
+        )
+        assert negative_cache.record_miss("98ab", now=0.0) == 10.0
+        assert negative_cache.record_miss("98ab", now=10.0) == 30.0
+        assert negative_cache.record_miss("98ab", now=30.0) is None
+        assert "98ab" not in negative_cache
+
+        assert negative_cache.record_miss("98ac", now=0.0) == 10.0
+        assert negative_cache.record_miss("98ac", now=100.0) is None
+        assert "98ac" not in negative_cache
@@ -0,0 +1,236 @@
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import pytest
+
+# Parallel copier of plate directories.
+from rockingester_lib.plate_copier import (
+    Methods,
+    PlateCopier,
+    Transfers,
+    copy_file,
+    copy_file_hashed,
+    partial_filename,
+    staging_directory,
+)
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestPlateCopier:
+    """
+    Test the plate copier.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        PlateCopierTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class PlateCopierTester(Base):
+    """
+    Test copying a plate directory in parallel, and each single-file copy method.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        output_directory = Path(output_directory)
+
+        plate_directory = output_directory / "98ab_2023-04-06_RI1000-0276-3drop"
+        plate_directory.mkdir()
+
+        contents = {}
+        for i in range(12):
+            name = f"98ab_{i + 1:02d}A_1.jpg"
+            contents[name] = os.urandom(i * 10000)
+            (plate_directory / name).write_bytes(contents[name])
+
+        plate_copier = PlateCopier({"workers": 4})
+        try:
+            target = output_directory / "visit" / plate_directory.name
+            report = plate_copier.copy_tree(plate_directory, target)
+
+            assert report["file_count"] == len(contents)
+            assert report["byte_count"] == sum(len(data) for data in contents.values())
+            assert sum(report["methods"].values()) == len(contents)
+            # Checksums are off unless asked for.
+            assert "checksums" not in report
+
+            for name, data in contents.items():
+                assert (target / name).read_bytes() == data, name
+                assert (target / name).stat().st_mtime == pytest.approx(
+                    (plate_directory / name).stat().st_mtime
+                )
+
+            # Like copytree, the target must not already exist.
+            with pytest.raises(FileExistsError):
+                plate_copier.copy_tree(plate_directory, target)
+
+            # Copying some files into a target which may already exist.
+            names = sorted(contents.keys())
+            target = output_directory / "streamed" / plate_directory.name
+            report = plate_copier.copy_files(plate_directory, names[:5], target)
+            assert report["file_count"] == 5
+            report = plate_copier.copy_files(plate_directory, names[5:], target)
+            assert report["file_count"] == len(names) - 5
+            assert sorted(os.listdir(target)) == names
+            for name, data in contents.items():
+                assert (target / name).read_bytes() == data, name
+
+            # A staged copy which died part way, with some files done and one cut short.
+            target = output_directory / "staged" / plate_directory.name
+            staging = staging_directory(target)
+            staging.mkdir(parents=True)
+            for name in names[:4]:
+                (staging / name).write_bytes(contents[name])
+            (staging / names[4]).write_bytes(contents[names[4]][:100])
+
+            report = plate_copier.copy_tree_staged(plate_directory, target)
+            assert report["resumed_count"] == 4
+            assert report["file_count"] == len(names) - 4
+            assert not staging.exists()
+            assert sorted(os.listdir(target)) == names
+            for name, data in contents.items():
+                assert (target / name).read_bytes() == data, name
+
+            # Once in place, the target is not copied over.
+            with pytest.raises(FileExistsError):
+                plate_copier.copy_tree_staged(plate_directory, target)
+        finally:
+            plate_copier.shutdown()
+
+        # Hardlinking shares the data, leaving the plate directory as it was.
+        plate_copier = PlateCopier({"transfer": Transfers.HARDLINK})
+        try:
+            target = output_directory / "hardlinked" / plate_directory.name
+            report = plate_copier.copy_tree_staged(plate_directory, target)
+            assert report["methods"] == {Transfers.HARDLINK: len(contents)}
+            for name, data in contents.items():
+                assert (target / name).read_bytes() == data, name
+                assert (target / name).stat().st_ino == (
+                    plate_directory / name
+                ).stat().st_ino
+        finally:
+            plate_copier.shutdown()
+
+        # Renaming moves the whole plate directory, or its files one by one as they are ready.
+        renamed_directory = output_directory / "98ab_2023-04-06_RI1000-0277-3drop"
+        plate_copier = PlateCopier({"transfer": Transfers.RENAME})
+        try:
+            target = output_directory / "renamed" / plate_directory.name
+            target.parent.mkdir()
+            report = plate_copier.copy_tree_staged(
+                self.__make_copy(plate_directory, renamed_directory), target
+            )
+            assert report["file_count"] == len(contents)
+            assert report["methods"] == {Transfers.RENAME: len(contents)}
+            assert not renamed_directory.exists()
+            assert sorted(os.listdir(target)) == sorted(contents.keys())
+
+            names = sorted(contents.keys())
+            target = output_directory / "renamed_streamed" / plate_directory.name
+            self.__make_copy(plate_directory, renamed_directory)
+            plate_copier.copy_files(renamed_directory, names[:5], target)
+            assert sorted(os.listdir(renamed_directory)) == names[5:]
+            plate_copier.copy_files(renamed_directory, names[5:], target)
+            plate_copier.release_source(renamed_directory)
+            assert not renamed_directory.exists()
+            for name, data in contents.items():
+                assert (target / name).read_bytes() == data, name
+
+            # A process died with one image renamed to a partial file and another partly copied.
+            target = output_directory / "renamed_recovered" / plate_directory.name
+            target.mkdir(parents=True)
+            self.__make_copy(plate_directory, renamed_directory)
+            os.rename(renamed_directory / names[0], partial_filename(target / names[0]))
+            partial_filename(target / names[1]).write_bytes(contents[names[1]][:100])
+            assert plate_copier.recover_partials(renamed_directory, target) == [
+                names[0]
+            ]
+            assert sorted(os.listdir(target)) == names[:1]
+            plate_copier.copy_files(renamed_directory, names[1:], target)
+            for name, data in contents.items():
+                assert (target / name).read_bytes() == data, name
+        finally:
+            plate_copier.shutdown()
+
+        with pytest.raises(RuntimeError):
+            PlateCopier({"transfer": "teleport"})
+
+        # Checksums are made on the way, including of files resumed from an earlier staged copy.
+        digests = {
+            name: hashlib.blake2b(data).hexdigest() for name, data in contents.items()
+        }
+        plate_copier = PlateCopier({"checksum": True})
+        try:
+            names = sorted(contents.keys())
+            target = output_directory / "checksummed" / plate_directory.name
+            staging = staging_directory(target)
+            staging.mkdir(parents=True)
+            for name in names[:3]:
+                (staging / name).write_bytes(contents[name])
+
+            report = plate_copier.copy_tree_staged(plate_directory, target)
+            assert report["resumed_count"] == 3
+            assert report["methods"] == {Methods.BUFFERED: len(names) - 3}
+            assert sorted(report["checksums"].keys()) == names
+            for name, checksum in report["checksums"].items():
+                assert checksum["digest"] == digests[name], name
+                assert checksum["byte_count"] == len(contents[name]), name
+                assert checksum["algorithm"] == "blake2b"
+                assert (target / name).read_bytes() == contents[name], name
+        finally:
+            plate_copier.shutdown()
+
+        # Streamed copies are checksummed too.
+        plate_copier = PlateCopier({"checksum": True})
+        try:
+            target = output_directory / "checksummed_streamed" / plate_directory.name
+            report = plate_copier.copy_files(plate_directory, names[:2], target)
+            assert {
+                name: checksum["digest"]
+                for name, checksum in report["checksums"].items()
+            } == {name: digests[name] for name in names[:2]}
+        finally:
+            plate_copier.shutdown()
+
+        # Checksums can't be had with the transfers and methods which don't copy through Python.
+        for transfer in [Transfers.HARDLINK, Transfers.RENAME, Transfers.REFLINK]:
+            with pytest.raises(RuntimeError):
+                PlateCopier({"transfer": transfer, "checksum": True})
+        with pytest.raises(RuntimeError):
+            PlateCopier({"method": Methods.SENDFILE, "checksum": True})
+
+        # Each explicit method, except reflink which needs a filesystem supporting it.
+        source = plate_directory / "98ab_12A_1.jpg"
+        for method in [Methods.COPY_FILE_RANGE, Methods.SENDFILE, Methods.BUFFERED]:
+            destination = output_directory / f"{method}.jpg"
+            size, used_method = copy_file(source, destination, method)
+            assert used_method == method
+            assert size == len(contents[source.name])
+            assert destination.read_bytes() == contents[source.name]
+
+        destination = output_directory / "hashed.jpg"
+        size, digest = copy_file_hashed(source, destination)
+        assert size == len(contents[source.name])
+        assert digest == hashlib.blake2b(contents[source.name]).hexdigest()
+        assert destination.read_bytes() == contents[source.name]
+
+    # ----------------------------------------------------------------------------------------
+    def __make_copy(self, source_directory: Path, target_directory: Path) -> Path:
+        target_directory.mkdir()
+        for path in source_directory.iterdir():
+            (target_directory / path.name).write_bytes(path.read_bytes())
+        return target_directory
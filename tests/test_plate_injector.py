@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from pathlib import Path
 
@@ -5,11 +6,18 @@ from dls_utilpack.visit import get_xchem_subdirectory
 
 # Things xchembku provides.
 from xchembku_api.datafaces.context import Context as XchembkuDatafaceClientContext
+from xchembku_api.models.crystal_plate_filter_model import CrystalPlateFilterModel
 from xchembku_lib.datafaces.context import Context as XchembkuDatafaceServerContext
 
 # Object able to talk to the formulatrix database.
 from rockingester_lib.ftrix_client import FtrixClientContext
 
+# Barcodes not found in Formulatrix, with when to look again.
+from rockingester_lib.negative_cache import NegativeCache
+
+# Cache of plate models so waiting plates don't cost a database round trip.
+from rockingester_lib.plate_cache import PlateCache
+
 # Object which can inject new xchembku plate records discovered while looking in subwell images.
 from rockingester_lib.plate_injector import PlateInjector
 
@@ -99,6 +107,16 @@ class PlateInjectorTester(Base):
                     await self.__run_the_test(
                         ftrix_client, xchembku_client_context.interface
                     )
+                    await self.__run_the_negative_test(
+                        ftrix_client,
+                        xchembku_client_context.interface,
+                        ftrix_client_specification,
+                    )
+                    await self.__run_the_concurrent_test(
+                        ftrix_client,
+                        xchembku_client_context.interface,
+                        ftrix_client_specification,
+                    )
 
     # ----------------------------------------------------------------------------------------
 
@@ -146,3 +164,178 @@ class PlateInjectorTester(Base):
 
         assert crytal_plate_model.barcode == barcode
         assert crytal_plate_model.error is None
+
+        # ----------------------------
+        # With a plate cache, the second lookup should not need the database.
+        plate_cache = PlateCache({"max_entries": 10, "ttl_seconds": 60.0})
+        plate_injector = PlateInjector(ftrix_client, xchembku_client, plate_cache)
+
+        crytal_plate_model = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert plate_cache.hit_count() == 0
+
+        crytal_plate_model2 = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert plate_cache.hit_count() == 1
+        assert crytal_plate_model.uuid == crytal_plate_model2.uuid
+
+        # After invalidation, the plate comes from the database again.
+        plate_cache.invalidate(barcode)
+        crytal_plate_model2 = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert plate_cache.hit_count() == 1
+        assert crytal_plate_model.uuid == crytal_plate_model2.uuid
+
+        # ----------------------------
+        # Many barcodes at once, the new ones needing just one ftrix query.
+        plate_injector = PlateInjector(ftrix_client, xchembku_client)
+        query_count = ftrix_client.latency_recorder().report()["count"]
+
+        crystal_plate_models = await plate_injector.find_or_inject_barcodes(
+            ["98ab", "98ax", "zzaa", "zzbb", "zzcc", "zzbb"], self.__visits_directory
+        )
+
+        assert ftrix_client.latency_recorder().report()["count"] == query_count + 1
+        assert list(crystal_plate_models.keys()) == [
+            "98ab",
+            "98ax",
+            "zzaa",
+            "zzbb",
+            "zzcc",
+        ]
+        assert crystal_plate_models["98ab"].uuid == crytal_plate_model.uuid
+        assert crystal_plate_models["98ab"].error is None
+        assert "does not conform" in crystal_plate_models["98ax"].error
+        assert "not found" in crystal_plate_models["zzbb"].error
+        assert "not found" in crystal_plate_models["zzcc"].error
+
+        # The new ones were injected.
+        crytal_plate_model2 = await plate_injector.find_or_inject_barcode(
+            "zzcc", self.__visits_directory
+        )
+        assert crytal_plate_model2.uuid == crystal_plate_models["zzcc"].uuid
+
+    # ----------------------------------------------------------------------------------------
+
+    async def __run_the_negative_test(
+        self, ftrix_client, xchembku_client, ftrix_client_specification
+    ):
+        """
+        Barcodes not found in Formulatrix are looked up again later instead of injected.
+        """
+
+        barcode = "zzdd"
+
+        # ----------------------------
+        # While backing off, Formulatrix is not asked again.
+        negative_cache = NegativeCache({"initial_seconds": 60.0})
+        plate_injector = PlateInjector(
+            ftrix_client, xchembku_client, negative_cache=negative_cache
+        )
+        query_count = ftrix_client.latency_recorder().report()["count"]
+
+        crytal_plate_model = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert "not found" in crytal_plate_model.error
+        assert plate_injector.next_check_time(barcode) is not None
+        assert ftrix_client.latency_recorder().report()["count"] == query_count + 1
+
+        crytal_plate_model = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert "not found" in crytal_plate_model.error
+        assert ftrix_client.latency_recorder().report()["count"] == query_count + 1
+
+        # It was not injected into xchembku.
+        crystal_plate_models = await xchembku_client.fetch_crystal_plates(
+            CrystalPlateFilterModel(barcode=barcode)
+        )
+        assert len(crystal_plate_models) == 0
+
+        # ----------------------------
+        # With no wait, the barcode is found once it has been registered in Formulatrix.
+        negative_cache = NegativeCache({"initial_seconds": 0.0})
+        plate_injector = PlateInjector(
+            ftrix_client, xchembku_client, negative_cache=negative_cache
+        )
+
+        crytal_plate_model = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert "not found" in crytal_plate_model.error
+
+        mssql = ftrix_client_specification["mssql"]
+        mssql[mssql["database"]].append([3, barcode, "cm00001-1_late", "SWISSci_3Drop"])
+
+        crytal_plate_model = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert crytal_plate_model.error is None
+        assert plate_injector.next_check_time(barcode) is None
+
+        crystal_plate_models = await xchembku_client.fetch_crystal_plates(
+            CrystalPlateFilterModel(barcode=barcode)
+        )
+        assert len(crystal_plate_models) == 1
+
+        # ----------------------------
+        # A barcode which is never registered is given up on and inserted with the error.
+        barcode = "zzff"
+        negative_cache = NegativeCache({"initial_seconds": 0.0, "max_misses": 2})
+        plate_injector = PlateInjector(
+            ftrix_client, xchembku_client, negative_cache=negative_cache
+        )
+
+        crytal_plate_model = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert "not found" in crytal_plate_model.error
+        assert plate_injector.next_check_time(barcode) is not None
+
+        crytal_plate_model = await plate_injector.find_or_inject_barcode(
+            barcode, self.__visits_directory
+        )
+        assert "not found" in crytal_plate_model.error
+        assert plate_injector.next_check_time(barcode) is None
+
+        crystal_plate_models = await xchembku_client.fetch_crystal_plates(
+            CrystalPlateFilterModel(barcode=barcode)
+        )
+        assert len(crystal_plate_models) == 1
+        assert crystal_plate_models[0].uuid == crytal_plate_model.uuid
+
+    # ----------------------------------------------------------------------------------------
+
+    async def __run_the_concurrent_test(
+        self, ftrix_client, xchembku_client, ftrix_client_specification
+    ):
+        """
+        Tasks finding the same new barcode at the same time all get the plate which was stored.
+        """
+
+        barcode = "zzee"
+
+        mssql = ftrix_client_specification["mssql"]
+        mssql[mssql["database"]].append([4, barcode, "cm00001-1_race", "SWISSci_3Drop"])
+
+        # No plate cache, so nothing but the lock stops each task injecting its own plate.
+        plate_injector = PlateInjector(ftrix_client, xchembku_client)
+
+        crystal_plate_models = await asyncio.gather(
+            *[
+                plate_injector.find_or_inject_barcode(barcode, self.__visits_directory)
+                for _ in range(4)
+            ]
+        )
+
+        stored_crystal_plate_models = await xchembku_client.fetch_crystal_plates(
+            CrystalPlateFilterModel(barcode=barcode)
+        )
+        assert len(stored_crystal_plate_models) == 1
+        for crystal_plate_model in crystal_plate_models:
+            assert crystal_plate_model.error is None
+            assert crystal_plate_model.uuid == stored_crystal_plate_models[0].uuid
@@ -0,0 +1,82 @@
+import logging
+from pathlib import Path
+
+# Queue of plates ordered by when each is next due.
+from rockingester_lib.plate_scheduler import PlateScheduler, estimate_completion_time
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestPlateScheduler:
+    """
+    Test the plate scheduler.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        PlateSchedulerTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class PlateSchedulerTester(Base):
+    """
+    Test ordering, bringing forward and discarding of plates, and the completion estimate.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        plate_a = Path("98aa_2023-04-06_RI1000-0276-3drop")
+        plate_b = Path("98ab_2023-04-06_RI1000-0276-3drop")
+        plate_c = Path("98ac_2023-04-06_RI1000-0276-3drop")
+
+        plate_scheduler = PlateScheduler()
+        assert plate_scheduler.next_due_time() is None
+
+        plate_scheduler.schedule(plate_c, 30.0)
+        plate_scheduler.schedule(plate_a, 10.0)
+        plate_scheduler.schedule(plate_b, 10.0)
+        assert len(plate_scheduler) == 3
+        assert plate_scheduler.next_due_time() == 10.0
+
+        # Same due time comes out in the order scheduled.
+        assert plate_scheduler.pop_due(5.0) == []
+        assert plate_scheduler.pop_due(10.0, limit=1) == [plate_a]
+        assert plate_scheduler.pop_due(10.0) == [plate_b]
+        assert plate_a not in plate_scheduler
+
+        # Scheduling later doesn't postpone, scheduling sooner brings forward.
+        plate_scheduler.schedule(plate_c, 40.0)
+        assert plate_scheduler.due_time(plate_c) == 30.0
+        plate_scheduler.schedule(plate_c, 20.0)
+        assert plate_scheduler.due_time(plate_c) == 20.0
+        assert plate_scheduler.next_due_time() == 20.0
+        assert plate_scheduler.pop_due(100.0) == [plate_c]
+        assert len(plate_scheduler) == 0
+
+        # Discarded plates never come out, even from stale heap entries.
+        plate_scheduler.schedule(plate_a, 50.0)
+        plate_scheduler.schedule(plate_b, 60.0)
+        plate_scheduler.discard(plate_a)
+        assert plate_scheduler.next_due_time() == 60.0
+        assert plate_scheduler.pop_due(100.0) == [plate_b]
+
+        # Images arriving every 10 seconds, 3 so far out of 5.
+        assert estimate_completion_time([100.0, 110.0, 120.0], 5, 1000.0, 0.0) == 140.0
+
+        # Estimate is clamped to the deadline and to the earliest time.
+        assert estimate_completion_time([100.0, 110.0, 120.0], 5, 130.0, 0.0) == 130.0
+        assert (
+            estimate_completion_time([100.0, 110.0, 120.0], 5, 1000.0, 150.0) == 150.0
+        )
+
+        # Too few images to know a rate means waiting for the deadline.
+        assert estimate_completion_time([100.0], 5, 1000.0, 0.0) == 1000.0
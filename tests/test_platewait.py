@@ -1,4 +1,5 @@
 import asyncio
+import hashlib
 import logging
 import time
 from pathlib import Path
@@ -17,6 +18,9 @@ from rockingester_api.collectors.context import Context as CollectorClientContex
 # Server context creator.
 from rockingester_lib.collectors.context import Context as CollectorServerContext
 
+# Local record of each plate's ingestion, where the checksums are kept.
+from rockingester_lib.ingest_journal import IngestJournal
+
 # Base class for the tester.
 from tests.base import Base
 
@@ -37,6 +41,34 @@ class TestPlatewaitDirectMysql:
         PlatewaitTester().main(constants, configuration_file, output_directory)
 
 
+# ----------------------------------------------------------------------------------------
+class TestPlatewaitStreamingDirectSqlite:
+    """
+    Test collector interface by direct call, ingesting wells as they arrive.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_streaming_sqlite.yaml"
+
+        PlatewaitTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class TestPlatewaitStreamingRenameDirectSqlite:
+    """
+    Test collector interface by direct call, renaming wells into the visit as they arrive.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_streaming_rename_sqlite.yaml"
+
+        PlatewaitTester().main(constants, configuration_file, output_directory)
+
+
 # ----------------------------------------------------------------------------------------
 class TestPlatewaitServiceSqlite:
     """
@@ -109,6 +141,17 @@ class PlatewaitTester(Base):
         self.__visit_plates_subdirectory = Path(
             multiconf_dict["visit_plates_subdirectory"]
         )
+        self.__ingest_mode = collector_specification["type_specific_tbd"].get(
+            "ingest_mode", "plate"
+        )
+        plate_copier_specification = collector_specification["type_specific_tbd"].get(
+            "plate_copier_specification", {}
+        )
+        self.__transfer = plate_copier_specification.get("transfer", "copy")
+        self.__is_checksummed = plate_copier_specification.get("checksum", False)
+        self.__journal_filename = collector_specification["type_specific_tbd"].get(
+            "journal_filename"
+        )
 
         scrapable_image_count = 4
 
@@ -186,9 +229,24 @@ class PlatewaitTester(Base):
         assert crystal_well_models[0].position == "A01a"
         assert crystal_well_models[-1].position == "A02a"
 
-        # The first "scrapable" plate directory should still exist.
-        count = sum(1 for _ in plate_directory1.glob("*") if _.is_file())
-        assert count == scrapable_image_count, "first (scrapable) plate_directory"
+        # When streaming, the plate is marked complete only after the max wait.
+        if self.__ingest_mode == "streaming":
+            complete_marker = (
+                rockingester_directory / f".{plate_directory1.name}.complete"
+            )
+            while not complete_marker.is_file():
+                if time.time() - time0 > timeout:
+                    raise RuntimeError(
+                        f"plate not marked complete within {timeout} seconds"
+                    )
+                await asyncio.sleep(0.5)
+
+        # The first "scrapable" plate directory should still exist, unless its images were renamed.
+        if self.__transfer == "rename":
+            assert not plate_directory1.exists(), "first (scrapable) plate_directory"
+        else:
+            count = sum(1 for _ in plate_directory1.glob("*") if _.is_file())
+            assert count == scrapable_image_count, "first (scrapable) plate_directory"
 
         # We should have ingested the first barcode.
         count = sum(1 for _ in rockingester_directory.glob("*") if _.is_dir())
@@ -202,6 +260,21 @@ class PlatewaitTester(Base):
             count == scrapable_image_count
         ), f"ingested_directory images {str(rockingester_directory)}"
 
+        # The checksum of each image copied should be in the journal.
+        if self.__is_checksummed and self.__journal_filename is not None:
+            ingest_journal = IngestJournal(self.__journal_filename)
+            ingest_journal.open()
+            try:
+                checksums = ingest_journal.checksums(plate_directory1.name)
+            finally:
+                ingest_journal.close()
+            assert len(checksums) == scrapable_image_count, "checksums"
+            for filename, checksum in checksums.items():
+                data = (
+                    rockingester_directory / plate_directory1.name / filename
+                ).read_bytes()
+                assert checksum["digest"] == hashlib.blake2b(data).hexdigest(), filename
+
     # ----------------------------------------------------------------------------------------
 
     def __subwell_filename(self, barcode, index):
@@ -0,0 +1,123 @@
+import logging
+from pathlib import Path
+
+# Things xchembku provides.
+from xchembku_api.datafaces.context import Context as XchembkuDatafaceClientContext
+from xchembku_api.datafaces.datafaces import xchembku_datafaces_get_default
+from xchembku_api.models.crystal_plate_filter_model import CrystalPlateFilterModel
+
+# Something writing plate directories like a Rockmaker imager does.
+from rockingester_lib.imager_simulator import make_jpeg_bytes, subwell_filename
+
+# Rebuilds xchembku records from the plates already in the visits.
+from rockingester_lib.reindexer import reindex_visits
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestReindexer:
+    """
+    Test reindexing the visits.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        ReindexerTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class ReindexerTester(Base):
+    """
+    Test the xchembku records are rebuilt from plates already copied to a visit,
+    and that reindexing again doesn't duplicate them.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        # Get the multiconf from the testing configuration yaml.
+        multiconf = self.get_multiconf()
+
+        # Load the multiconf into a dict.
+        multiconf_dict = await multiconf.load()
+
+        # Use xchembku directly, without starting its server.
+        type_specific_tbd = multiconf_dict["rockingester_collector_specification"][
+            "type_specific_tbd"
+        ]
+        type_specific_tbd["xchembku_dataface_specification"] = multiconf_dict[
+            "xchembku_dataface_specification_direct"
+        ]
+        type_specific_tbd["reindex_specification"] = {
+            "plates_per_chunk": 1,
+            "wells_per_upsert": 100,
+        }
+
+        plates_directory = (
+            Path(multiconf_dict["visits_directory"])
+            / "cm00001"
+            / "cm00001-1"
+            / multiconf_dict["visit_plates_subdirectory"]
+        )
+
+        # A plate copied by the collector before the database was wiped.
+        image_count = 288
+        image_bytes = make_jpeg_bytes(640, 480, 1024)
+        plate_directory = plates_directory / "98ab_2023-04-06_RI1000-0276-3drop"
+        plate_directory.mkdir(parents=True)
+        for index in range(image_count):
+            (plate_directory / subwell_filename("98ab", index)).write_bytes(image_bytes)
+
+        # A plate whose barcode is not in Formulatrix.
+        (plates_directory / "98zz_2023-04-06_RI1000-0276-3drop").mkdir()
+
+        # An unfinished staged copy, which is not reindexed.
+        staging = plates_directory / ".98ac_2023-04-06_RI1000-0276-3drop.staging"
+        staging.mkdir()
+        (staging / subwell_filename("98ac", 0)).write_bytes(image_bytes)
+
+        report = await reindex_visits(type_specific_tbd)
+        logger.debug(f"reindex report {report}")
+
+        assert report["plate_count"] == 1
+        assert report["well_count"] == image_count
+        assert report["skipped_plates"] == ["98zz_2023-04-06_RI1000-0276-3drop"]
+
+        # Again, which finds the records already there.
+        report = await reindex_visits(type_specific_tbd)
+        assert report["well_count"] == image_count
+
+        async with XchembkuDatafaceClientContext(
+            type_specific_tbd["xchembku_dataface_specification"]
+        ):
+            xchembku = xchembku_datafaces_get_default()
+
+            crystal_plate_models = await xchembku.fetch_crystal_plates(
+                CrystalPlateFilterModel(barcode="98ab")
+            )
+            assert len(crystal_plate_models) == 1
+            assert crystal_plate_models[0].visit == "cm00001-1"
+            assert (
+                crystal_plate_models[0].rockminer_collected_stem == plate_directory.stem
+            )
+
+            crystal_well_models = await xchembku.fetch_crystal_wells_filenames()
+            assert len(crystal_well_models) == image_count
+            assert crystal_well_models[0].position == "A01a"
+            assert crystal_well_models[0].filename == str(
+                plate_directory / subwell_filename("98ab", 0)
+            )
+
+            # The image sizes were probed.
+            records = await xchembku.query(
+                "SELECT DISTINCT width, height FROM crystal_wells"
+            )
+            assert records == [{"width": 640, "height": 480}]
@@ -0,0 +1,106 @@
+import json
+import logging
+import time
+
+# Counters, gauges and latencies for the metrics endpoint.
+from rockingester_lib.metrics import Metrics
+
+# Time spent in each stage of ingesting a plate.
+from rockingester_lib.stage_timer import Stages, StageTimings, span
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestStageTimer:
+    """
+    Test the per-plate stage timings.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        StageTimerTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class StageTimerTester(Base):
+    """
+    Test stages are summed over scrapes, reported once, and written to the trace file.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        trace_filename = f"{output_directory}/stage_trace.jsonl"
+
+        metrics = Metrics()
+        stage_timings = StageTimings({"trace_filename": trace_filename}, metrics)
+
+        # Two scrapes of the same plate.
+        for _ in range(2):
+            plate_timer = stage_timings.plate_timer("98ab_2023-04-06_RI1000-0276-3drop")
+            plate_timer.count_scrape()
+            with plate_timer.span(Stages.SCAN):
+                time.sleep(0.01)
+
+        # A stage which raises is still timed.
+        try:
+            with span(plate_timer, Stages.COPY):
+                raise RuntimeError("failed on purpose")
+        except RuntimeError:
+            pass
+
+        # No plate timer, nothing timed.
+        with span(None, Stages.COPY):
+            pass
+
+        assert len(stage_timings) == 1
+        assert plate_timer.stages()[Stages.SCAN] >= 0.02
+
+        summary = stage_timings.finish("98ab_2023-04-06_RI1000-0276-3drop", "copied")
+        assert summary["scrape_count"] == 2
+        assert set(summary["stages"].keys()) == {Stages.SCAN, Stages.COPY}
+        assert len(stage_timings) == 0
+
+        # Plates not being timed are not reported.
+        assert (
+            stage_timings.finish("98ab_2023-04-06_RI1000-0276-3drop", "copied") is None
+        )
+
+        # Each stage is in its histogram.
+        histograms = stage_timings.histograms()
+        assert histograms[Stages.SCAN]["count"] == 1
+        assert histograms[Stages.COPY]["count"] == 1
+        assert "rockingester_stage_scan_seconds_count 1" in metrics.render()
+
+        stage_timings.dump_histograms()
+
+        with open(trace_filename, "r") as stream:
+            records = [json.loads(line) for line in stream]
+        assert len(records) == 2
+        assert records[0]["plate_name"] == "98ab_2023-04-06_RI1000-0276-3drop"
+        assert records[0]["stages"][Stages.SCAN] >= 0.02
+        assert records[1]["histograms"][Stages.SCAN]["count"] == 1
+
+        # The injector's stages are inside finding the barcode, so are not busy time twice over.
+        plate_timer = stage_timings.plate_timer("98ac_2023-04-06_RI1000-0276-3drop")
+        with plate_timer.span(Stages.FIND_BARCODE):
+            with plate_timer.span(Stages.FETCH_XCHEMBKU_PLATE):
+                time.sleep(0.01)
+            with plate_timer.span(Stages.QUERY_FTRIX):
+                time.sleep(0.01)
+            with span(plate_timer, Stages.INJECT_PLATE):
+                time.sleep(0.01)
+
+        summary = stage_timings.finish("98ac_2023-04-06_RI1000-0276-3drop", "copied")
+        stages = summary["stages"]
+        assert stages[Stages.FIND_BARCODE] >= 0.03
+        assert summary["busy_seconds"] == stages[Stages.FIND_BARCODE]
+        assert summary["busy_seconds"] < sum(stages.values())
@@ -0,0 +1,234 @@
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from dls_utilpack.visit import get_xchem_subdirectory
+
+# Things which make the collector.
+from rockingester_lib.collectors.collectors import Collectors
+
+# Collector types.
+from rockingester_lib.collectors.constants import Types
+
+# Object able to talk to the formulatrix database.
+from rockingester_lib.ftrix_client import FtrixClientContext
+
+# Generator of the SQLite stand-in for the Formulatrix database.
+from rockingester_lib.ftrix_sqlite import generate
+
+# Something writing plate directories like a Rockmaker imager does.
+from rockingester_lib.imager_simulator import ImagerSimulator
+
+# Hidden name of a file on its way into the visit.
+from rockingester_lib.plate_copier import partial_filename
+
+# Base class for the tester.
+from tests.base import Base
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------------------------------------------------------------------------
+class TestStreamingRecovery:
+    """
+    Test streaming recovers images left part way into the visit.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        StreamingRecoveryTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+class TestStreamingWait:
+    """
+    Test the streaming wait runs from when the images arrived, not when they were renamed away.
+    """
+
+    def test(self, constants, logging_setup, output_directory):
+
+        # Configuration file to use.
+        configuration_file = "tests/configurations/direct_sqlite.yaml"
+
+        StreamingWaitTester().main(constants, configuration_file, output_directory)
+
+
+# ----------------------------------------------------------------------------------------
+async def _make_plate(output_directory: Path, image_count: Optional[int]):
+    """
+    Make a plate directory and the visit it goes to.
+
+    Returns:
+        the plate directory, its target in the visit, and the Formulatrix client specification
+    """
+
+    visits_directory = output_directory / "visits"
+    plates_directory = output_directory / "SubwellImages"
+
+    # Formulatrix stand-in, and the visit of the plate.
+    ftrix_filename = str(output_directory / "ftrix.sqlite")
+    summary = generate(ftrix_filename, 4)
+    barcode = summary["xchem_barcodes"][0]
+    ftrix_client_specification = {
+        "mssql": {"server": "sqlite", "database": ftrix_filename}
+    }
+    async with FtrixClientContext(ftrix_client_specification) as ftrix_client:
+        records = await ftrix_client.query_barcodes([barcode])
+    visit_directory = visits_directory / get_xchem_subdirectory(
+        records[barcode]["formulatrix__experiment__name"]
+    )
+    visit_directory.mkdir(parents=True)
+
+    imager_simulator = ImagerSimulator(
+        {
+            "plates_directory": str(plates_directory),
+            "barcodes": [barcode],
+            "plates_per_minute": 6000.0,
+            "image_count": image_count,
+            "image_bytes": 1024,
+        }
+    )
+    await imager_simulator.run()
+    plate_name = imager_simulator.plate_names()[0]
+
+    return (
+        plates_directory / plate_name,
+        visit_directory / "processing/rockingester" / plate_name,
+        ftrix_client_specification,
+    )
+
+
+# ----------------------------------------------------------------------------------------
+def _build_collector(
+    output_directory: Path,
+    plate_directory: Path,
+    ftrix_client_specification: dict,
+    max_wait_seconds: float,
+):
+    """
+    Build a streaming collector which renames the images into the visit.
+    """
+
+    return Collectors().build_object(
+        {
+            "type": Types.DIRECT_POLL,
+            "type_specific_tbd": {
+                "plates_directories": [str(plate_directory.parent)],
+                "visits_directory": str(output_directory / "visits"),
+                "visit_plates_subdirectory": "processing/rockingester",
+                "ingest_mode": "streaming",
+                "stable_seconds": 0.0,
+                "max_wait_seconds": max_wait_seconds,
+                "plate_copier_specification": {"transfer": "rename"},
+                "xchembku_dataface_specification": {
+                    "type": "xchembku_lib.xchembku_datafaces.direct",
+                    "database": {
+                        "type": "dls_normsql.aiosqlite",
+                        "filename": str(output_directory / "xchembku.sqlite"),
+                        "log_level": "WARNING",
+                    },
+                },
+                "ftrix_client_specification": ftrix_client_specification,
+            },
+        }
+    )
+
+
+# ----------------------------------------------------------------------------------------
+class StreamingRecoveryTester(Base):
+    """
+    Test an image renamed to a partial file by a process which died is renamed into place on restart.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        output_directory = Path(output_directory)
+
+        plate_directory, target, ftrix_client_specification = await _make_plate(
+            output_directory, None
+        )
+        plate_name = plate_directory.name
+
+        # A process died after renaming an image to its partial file in the visit.
+        target.mkdir(parents=True)
+        names = sorted(os.listdir(plate_directory))
+        data = (plate_directory / names[0]).read_bytes()
+        os.rename(plate_directory / names[0], partial_filename(target / names[0]))
+
+        collector = _build_collector(
+            output_directory, plate_directory, ftrix_client_specification, 0.0
+        )
+
+        await collector.connect()
+        try:
+            assert await collector.scrape_plate_directory(plate_directory) is None
+        finally:
+            await collector.deactivate()
+
+        # The image is back under its own name, with all the others.
+        assert sorted(os.listdir(target)) == names
+        assert (target.parent / f".{plate_name}.complete").is_file()
+        assert (target / names[0]).read_bytes() == data
+        assert not plate_directory.exists()
+
+
+# ----------------------------------------------------------------------------------------
+class StreamingWaitTester(Base):
+    """
+    Test a restarted collector waits from when the renamed images arrived.
+    """
+
+    # ----------------------------------------------------------------------------------------
+    async def _main_coroutine(self, constants, output_directory):
+        """ """
+
+        output_directory = Path(output_directory)
+
+        # Only some of the plate's images have arrived.
+        plate_directory, target, ftrix_client_specification = await _make_plate(
+            output_directory, 10
+        )
+
+        max_wait_seconds = 60.0
+
+        # The images are renamed into the visit, but the rest are still to be waited for.
+        collector = _build_collector(
+            output_directory,
+            plate_directory,
+            ftrix_client_specification,
+            max_wait_seconds,
+        )
+        await collector.connect()
+        try:
+            assert await collector.scrape_plate_directory(plate_directory) is not None
+        finally:
+            await collector.deactivate()
+        assert len(os.listdir(plate_directory)) == 0
+        assert len(os.listdir(target)) == 10
+
+        # The images arrived longer ago than the maximum wait,
+        # though the plate directory changed just now when they were renamed out of it.
+        arrival_time = time.time() - 2 * max_wait_seconds
+        for name in os.listdir(target):
+            os.utime(target / name, (arrival_time, arrival_time))
+
+        # A restarted collector gives up waiting.
+        collector = _build_collector(
+            output_directory,
+            plate_directory,
+            ftrix_client_specification,
+            max_wait_seconds,
+        )
+        await collector.connect()
+        try:
+            assert await collector.scrape_plate_directory(plate_directory) is None
+        finally:
+            await collector.deactivate()
+        assert (target.parent / f".{target.name}.complete").is_file()